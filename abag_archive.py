@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+abag_archive.py
+Indexed single file archive of rendered bag patterns
+Copyright (C) 2014 Samuel Hodges <octerman@gmail.com>
+
+This program is free software: you can redistribute it and/or modify it
+under the terms of the GNU General Public License as published by the
+Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along
+with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+A catalogue of patterns is kept in one file instead of one SVG file per
+pattern. Every pattern is rendered, compressed on its own with zlib and
+appended to the archive as soon as it is made, so only the index is kept
+in memory while writing. The index is written last, as an open addressing
+hash table keyed by a hash of the pattern options. Reading maps the file
+into memory and finds a pattern by probing the table, the cost of a lookup
+does not depend on the size of the catalogue and only the pattern asked
+for is decompressed.
+
+Layout of the file, all numbers big endian:
+
+    header   magic, entry count, index offset, slot count
+    entries  options as JSON (u16 length first) then the zlib data
+    index    slot count slots of key, entry offset, zlib size, SVG size
+
+With --threads the patterns are compressed on background threads while
+the next ones are rendered (see abag_svgz), the archive comes out the same.
+With --svgzDir the catalogue is written as one .svgz file per pattern
+instead, named by the hex of its key and listed in index.json.
+
+Usage:
+    python abag_archive.py --radii=10,20,30 --segmentCounts=4,8 \\
+        --output=catalogue.abag
+    python abag_archive.py --read=catalogue.abag --radius=20 --segments=8
+    python abag_archive.py --radii=10,20,30 --svgzDir=catalogue --threads=2
+"""
+import hashlib
+import io
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+from itertools import product
+from optparse import OptionParser
+from abag_model import PatternModel
+from abag_cutlist import PATTERN_OPTIONS, add_pattern_options
+from abag_svgz import Compressor, write_catalogue
+from abag_tile import write_sheet
+
+MAGIC = b'ABAGARC1'
+_header = struct.Struct('>8sQQQ')
+_slot = struct.Struct('>16sQII')
+_length = struct.Struct('>H')
+
+# Pattern options making up the key of an entry, with their types and
+# defaults
+_types = {'int': int, 'float': float}
+PARAMS = tuple((dest, _types[kind], default)
+               for name, kind, dest, default, text in PATTERN_OPTIONS)
+
+
+def pattern_params(params=None, **kwargs):
+    """
+    The full set of pattern options, missing ones set to their defaults and
+    every value of its option's type, so equal patterns get equal keys.
+    """
+    given = dict(params or {}, **kwargs)
+    unknown = set(given) - set(dest for dest, kind, default in PARAMS)
+    if unknown:
+        raise ValueError("Unknown pattern options: %s" %
+                       ', '.join(sorted(unknown)))
+    return dict((dest, kind(given.get(dest, default)))
+                for dest, kind, default in PARAMS)
+
+
+def pattern_key(params):
+    """The 16 byte index key of a set of pattern options"""
+    text = json.dumps(pattern_params(params), sort_keys=True)
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+def render_pattern(params):
+    """The laid out pattern for a set of pattern options as SVG bytes"""
+    p = pattern_params(params)
+    seams = dict((k, p['seam' + k.title()])
+                 for k in ('inner', 'outer', 'end', 'other'))
+    model = PatternModel.from_dimensions(p['radius'], p['segments'],
+                                         p['seams'], p['zipperStrapJoin'],
+                                         p['zipperHeight'], p['zipperTop'],
+                                         p['zipperBottom'], seams)
+    fh = io.StringIO()
+    write_sheet(fh, model, title='Radius %g cm, %i segments' %
+                (p['radius'], p['segments']))
+    return fh.getvalue().encode('utf-8')
+
+
+class ArchiveWriter(object):
+    """
+    Write an archive entry by entry. Adding the same options again replaces
+    the entry in the index.
+
+    @param threads Threads compressing in the background, 0 for none
+    """
+
+    def __init__(self, filename, level=6, threads=0):
+        self.level = level
+        self.compressor = Compressor(self._pack, threads)
+        self.fh = open(filename, 'wb')
+        self.fh.write(_header.pack(MAGIC, 0, 0, 0))
+        self.index = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.index)
+
+    def _pack(self, data):
+        return zlib.compress(data, self.level)
+
+    def add(self, params, data):
+        """Append the SVG bytes data rendered for params"""
+        params = pattern_params(params)
+        for done in self.compressor.put(params, data):
+            self._append(*done)
+
+    def _append(self, params, data, packed):
+        meta = json.dumps(params, sort_keys=True).encode('utf-8')
+        offset = self.fh.tell()
+        self.fh.write(_length.pack(len(meta)))
+        self.fh.write(meta)
+        self.fh.write(packed)
+        self.index[pattern_key(params)] = (offset, len(packed), len(data))
+
+    def report(self):
+        return self.compressor.report()
+
+    def close(self):
+        if self.fh.closed:
+            return
+        for done in self.compressor.finish():
+            self._append(*done)
+        slots = 8
+        while slots < 2 * len(self.index):
+            slots *= 2
+        table = bytearray(slots * _slot.size)
+        mask = slots - 1
+        for key, (offset, size, raw) in self.index.items():
+            i = _home(key) & mask
+            while _slot.unpack_from(table, i * _slot.size)[1]:
+                i = (i + 1) & mask
+            _slot.pack_into(table, i * _slot.size, key, offset, size, raw)
+        index_offset = self.fh.tell()
+        self.fh.write(table)
+        self.fh.seek(0)
+        self.fh.write(_header.pack(MAGIC, len(self.index), index_offset,
+                                   slots))
+        self.fh.close()
+
+
+def _home(key):
+    return struct.unpack('>Q', key[:8])[0]
+
+
+class Archive(object):
+    """A pattern archive mapped into memory for reading"""
+
+    def __init__(self, filename):
+        with open(filename, 'rb') as fh:
+            self.map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, self.index_offset, self.slots = \
+            _header.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            self.map.close()
+            raise ValueError("%s is not a pattern archive" % filename)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.map.close()
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, params):
+        return self._find(pattern_key(params)) is not None
+
+    def __getitem__(self, params):
+        found = self._find(pattern_key(params))
+        if found is None:
+            raise KeyError(params)
+        return self._data(*found)
+
+    def get(self, params, default=None):
+        try:
+            return self[params]
+        except KeyError:
+            return default
+
+    def _find(self, key):
+        """(entry offset, zlib size) of key, None when it is not there"""
+        mask = self.slots - 1
+        i = _home(key) & mask
+        for n in range(self.slots):
+            k, offset, size, raw = _slot.unpack_from(
+                self.map, self.index_offset + i * _slot.size)
+            if not offset:
+                return None
+            if k == key:
+                return offset, size
+            i = (i + 1) & mask
+        return None
+
+    def _data(self, offset, size):
+        n = _length.unpack_from(self.map, offset)[0]
+        start = offset + _length.size + n
+        return zlib.decompress(self.map[start:start + size])
+
+    def __iter__(self):
+        """The options of every entry, in the order they were written"""
+        entries = []
+        for i in range(self.slots):
+            k, offset, size, raw = _slot.unpack_from(
+                self.map, self.index_offset + i * _slot.size)
+            if offset:
+                entries.append(offset)
+        for offset in sorted(entries):
+            n = _length.unpack_from(self.map, offset)[0]
+            start = offset + _length.size
+            yield json.loads(self.map[start:start + n].decode('utf-8'))
+
+
+def write_archive(filename, param_sets, level=6, threads=0):
+    """
+    Render the pattern for every set of options and write them to an
+    archive, one at a time.
+
+    @return the number of entries
+    """
+    with ArchiveWriter(filename, level, threads) as writer:
+        for params in param_sets:
+            writer.add(params, render_pattern(params))
+    return len(writer)
+
+
+def write_svgz(directory, param_sets, level=6, threads=0):
+    """
+    Render the pattern for every set of options as directory/<key>.svgz,
+    with index.json listing the file of every set of options.
+
+    @return the abag_svgz.SvgzWriter, closed
+    """
+    index = []
+
+    def items():
+        for params in param_sets:
+            params = pattern_params(params)
+            name = pattern_key(params).hex()
+            index.append({'file': name + '.svgz', 'params': params})
+            yield name, render_pattern(params)
+
+    writer = write_catalogue(directory, items(), level, threads)
+    with open(os.path.join(directory, 'index.json'), 'w') as fh:
+        json.dump(index, fh, indent=1, sort_keys=True)
+    return writer
+
+
+def _list(kind, text):
+    return [kind(v) for v in text.split(',') if v.strip()]
+
+
+def main(argv=None):
+    parser = OptionParser(usage="usage: %prog [options]")
+    add_pattern_options(parser, (
+        ("--radii", "string", "radii", "",
+            "Comma separated radii of the catalogue, --radius if empty"),
+        ("--segmentCounts", "string", "segmentCounts", "",
+            "Comma separated segment counts, --segments if empty"),
+        ("--level", "int", "level", 6, "zlib compression level"),
+        ("--threads", "int", "threads", 0,
+            "Threads compressing while the next patterns are rendered"),
+        ("--output", "string", "output", "catalogue.abag",
+            "Archive to write"),
+        ("--svgzDir", "string", "svgzDir", "",
+            "Write one .svgz file per pattern to this folder instead"),
+        ("--read", "string", "read", "",
+            "Print the pattern for the options from this archive instead")
+    ))
+    o, args = parser.parse_args(argv)
+
+    params = dict((dest, getattr(o, dest)) for dest, kind, default in PARAMS)
+    if o.read:
+        with Archive(o.read) as archive:
+            data = archive.get(params)
+        if data is None:
+            sys.stderr.write("No pattern for these options in %s\n" % o.read)
+            return 1
+        sys.stdout.buffer.write(data)
+        return 0
+
+    radii = _list(float, o.radii) or [o.radius]
+    counts = _list(int, o.segmentCounts) or [o.segments]
+    param_sets = (dict(params, radius=r, segments=s)
+                  for r, s in product(radii, counts))
+    if o.svgzDir:
+        writer = write_svgz(o.svgzDir, param_sets, o.level, o.threads)
+    else:
+        with ArchiveWriter(o.output, o.level, o.threads) as writer:
+            for params in param_sets:
+                writer.add(params, render_pattern(params))
+    sys.stdout.write(writer.report())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+#!/usr/bin/env python3
 """
 abag_bagpat.py
 The original Ananabag pattern generator inkscape extension
@@ -18,14 +18,19 @@ You should have received a copy of the GNU General Public License along
 with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 import inkex
+import json
+import os
 import re
-from simplestyle import formatStyle
-from simplepath import formatPath
+import tempfile
 from math import pi, degrees
 from random import randint
-from types import DictType, TupleType, StringType
-from abag_utils import circle, ellipse_id, point_on_circle, make_dome_data,\
-                        DomePiece, Piece, Path, Vector2
+from abag_utils import arc_edge, circle, circle_path, ellipse_id, format_path,\
+                        iter_segment_data, make_dome_data, make_zipper_data,\
+                        segment_thickness, DomePiece, DomeSeamPiece,\
+                        RectPattern, RectSeamPattern
+from abag_cutlist import seam_allowances, write_model_cut_list
+from abag_fragment import FragmentEffect
+import abag_nodes as nodes
 
 
 def svg_add_text(node, x, y, text):
@@ -37,17 +42,12 @@ def svg_add_text(node, x, y, text):
         'font-style': 'normal',
         'fill': '#000'
     }
-    el = inkex.etree.SubElement(node, inkex.addNS('text', 'svg'))
-    el.set('style', formatStyle(style))
-    el.set('x', str(x))
-    el.set('y', str(y))
-    el.text = text
+    nodes.node(node, nodes.TEXT, (('style', nodes.style(style)),
+                                  ('x', str(x)), ('y', str(y))), text)
 
 
 def svg_add_tspan(node, text, style):
-    el = inkex.etree.SubElement(node, inkex.addNS('tspan', 'svg'))
-    el.set('style', formatStyle(style))
-    el.text = text
+    nodes.node(node, nodes.TSPAN, (('style', nodes.style(style)),), text)
 
 
 def piece_get_text_arch(p):
@@ -55,283 +55,190 @@ def piece_get_text_arch(p):
     return r, 0, p.angle
 
 
-def make_zipper_data(radius, thickness, join_w, zip_h, top_h, bottom_h):
-        """
-        Calculate dimensions and points for each piece, top, bottom and joiner.
-        @return List List of dics where keys are the name of each piece
-        """
-        c = 2 * pi * radius
-        length = c - join_w
-        data = {
-            'BodyStrip': {'label': 'B1', 'd': (c, thickness)},
-            'ZipTop': {'label': 'Z1', 'd': (length, top_h)},
-            'ZipBottom': {'label': 'Z2', 'd': (length, bottom_h)},
-            'ZipJoin': {'label': 'Z3', 'd': (join_w, top_h + zip_h + bottom_h)},
-        }
-        return data
-
-
-class RectPattern(Piece):
-    """Rectangular pattern piece class"""
-
-    def __init__(self, width, height, label='', name=''):
-        super(RectPattern, self).__init__(label, name)
-        self.width = width
-        self.height = height
-
-    def _build_path(self):
-        w = self.width
-        h = self.height
-        sx, sy = self.start_loc
-
-        p = Path()
-        p.M(sx, sy)
-        p.l(w, 0.0)
-        p.l(0.0, h)
-        p.l(-w, 0.0)
-        p.l(0.0, -h)
-        p.z()
-
-        self._path = p
-
-
-class RectSeamPattern(RectPattern):
-
-    left = 0
-    right = 0
-    top = 0
-    bottom = 0
-
-    def __init__(self, width, height, label='', name='', seams={}):
-        super(RectSeamPattern, self).__init__(width, height, label, name)
-        self._set_seams(seams)
-
-    @classmethod
-    def from_rect(cls, rect, seams={}):
-        label = "%sS" % rect.label
-        name = "%s Seam" % rect.name
-
-        new = cls(rect.width, rect.height, label, name, seams)
-        new.start_loc = rect.start_loc
-        return new
-
-    def _build_path(self):
-        ls = self.left
-        rs = self.right
-        ts = self.top
-        bs = self.bottom
-        sx, sy = self.start_loc
-
-        # adjest for the seams
-        sx -= ls
-        sy -= bs
-        w = self.width + rs + ls
-        h = self.height + ts + bs
-
-        p = Path()
-        p.M(sx, sy)
-        p.l(w, 0.0)
-        p.l(0.0, h)
-        p.l(-w, 0.0)
-        p.l(0.0, -h)
-        p.z()
-
-        self._path = p
-
-    def _set_seams(self, seams):
-        #inkex.debug(type(seams))
-        if type(seams) is DictType:
-            if 'top' in seams:
-                self.top = seams['top']
-            if 'right' in seams:
-                self.right = seams['right']
-            if 'bottom' in seams:
-                self.bottom = seams['bottom']
-            if 'left' in seams:
-                self.left = seams['left']
-        else:
-            self.top = self.right = self.bottom = self.left = seams
-    set_seams = _set_seams
-
-
-class DomeSeamPiece(DomePiece):
-
-    outer = 0
-    inner = 0
-    end = 0
-
-    def __init__(self, _id, angle, radius, thickness, **kwargs):
-        super(DomeSeamPiece, self).__init__(_id, angle, radius, thickness)
-        self._set_seams(kwargs)
-
-    @classmethod
-    def from_dome_piece(cls, piece):
-        pid = piece.id
-        angle = piece.angle
-        radius = piece.radius
-        thickness = piece.thickness
-
-        new = cls(pid, angle, radius, thickness)
-        new.start_loc = piece.start_loc
-        return new
-
-    def _build_path(self):
-        # Draw the dome piece including the seams, which includes the end part.
-        # The end part(cap) is a rectangle appened to the end of each circular
-        # segment.
-        cx, cy = self.start_loc
-        angle = self.angle
-        r1 = self.outer_radius
-        r2 = self.inner_radius
-        s1 = self.outer
-        s2 = self.inner
-        s3 = self.end
-        laf, sf, laf2, sf2 = self.get_arch_flags(self.angle)
-
-        r1 += s1
-        r2 -= s2
-
-        sx = cx + r1
-        sy = cy
-
-        # Draw flow, start with the outer arc, first end seam, inner arch, then
-        # final end seam and close the path.
-
-        # FIXME: For some reason the top piece only gets one set of end seams
-
-        p = Path()
-        p.M(sx, sy)
-
-        # Outer arch
-        x, y = point_on_circle(r1, angle)
-        ex = cx + x
-        ey = cy + y
-        p.A(r1, r1, 0, laf, sf, ex, ey)
-
-        # First end seam
-        x, y = point_on_circle(r2, angle)
-        v = Vector2.from_points((ex, ey), (cx + x, cy + y))
-        vp = v.perpendicular()
-        vp.set_length(s3)
-
-        p.l(-vp.x, -vp.y)
-        p.l(v.x, v.y)
-        p.l(vp.x, vp.y)
-
-        # Inner arch
-        ex = cx + r2
-        ey = cy
-        p.A(r2, r2, 0, laf2, sf2, ex, ey)
-
-        # Second end seam
-        v = Vector2.from_points((ex, ey), (sx, sy))
-        vp = v.perpendicular()
-        vp.set_length(s3)
-
-        p.l(-vp.x, -vp.y)
-        p.l(v.x, v.y)
-        p.l(vp.x, vp.y)
-        p.z()
-
-        self._path = p
-
-    def _set_seams(self, seams):
-        if type(seams) is DictType:
-            if 'outer' in seams:
-                self.outer = seams['outer']
-            if 'inner' in seams:
-                self.inner = seams['inner']
-            if 'end' in seams:
-                self.end = seams['end']
-        else:
-            self.outer = self.inner = self.end = seams
-    set_seams = _set_seams
+def segment_paths(job):
+    """
+    Build and format the cut and seam path data of one dome segment. Module
+    level so the work can be sent to a worker process.
 
+    @param job Tuple of (id, angle, radius, thickness, (cx, cy), seams, ...),
+               the seams are a dict for DomeSeamPiece.set_seams or None
+    @return (cut_d, seam_d) where seam_d is None without seams, both are
+            None for the top cone which is drawn as a circle
+    """
+    i, angle, r, thickness, center, seams = job[:6]
+    if i == 1:
+        return None, None
+    piece = DomePiece(i, angle, r, thickness)
+    piece.set_start_loc(*center)
+    seam_d = None
+    if seams:
+        seam = DomeSeamPiece.from_dome_piece(piece)
+        seam.set_seams(seams)
+        seam_d = format_path(seam.path)
+    return format_path(piece.path), seam_d
+
+
+def segment_job(job):
+    """(job, segment_paths(job)), the job comes back with its result"""
+    return job, segment_paths(job)
+
+
+class PreviewCache(object):
+    """
+    Preview path data kept on disk between runs of the effect, Inkscape
+    starts a new process for every live preview update. Only the most
+    recently used entries are kept.
+    """
 
-class Abagpat(inkex.Effect):
+    size = 32
+
+    def __init__(self, filename):
+        self.filename = filename
+        try:
+            with open(filename) as fh:
+                self._entries = json.load(fh)
+        except (OSError, ValueError):
+            self._entries = []
+
+    def get(self, key):
+        for k, val in self._entries:
+            if k == key:
+                return val
+        return None
+
+    def put(self, key, val):
+        entries = [e for e in self._entries if e[0] != key]
+        entries.append([key, val])
+        self._entries = entries[-self.size:]
+        try:
+            with open(self.filename, 'w') as fh:
+                json.dump(self._entries, fh)
+        except OSError:
+            pass
+
+
+class Abagpat(FragmentEffect):
     """
     Example Inkscape effect rendering to render a pattern to make a dome from
     """
     def __init__(self):
         """
         Constructor.
-        Defines all the variable for the script
         """
-        inkex.Effect.__init__(self)
+        FragmentEffect.__init__(self)
 
         self._lines = []
+        # (label, path) pairs waiting to be merged in compound path mode
+        self._compound = {'cut': [], 'seam': []}
+        self._labels_group = None
 
-        self.OptionParser.add_option("--tab", action="store", type="string",
-            dest="tab", default="object")
+    def add_arguments(self, pars):
+        """
+        Defines all the variable for the script
+        """
+        FragmentEffect.add_arguments(self, pars)
+        pars.add_argument("--tab", type=str, dest="tab", default="object")
 
         options = (
             # Common options
-            ("--radius", "store", "float", "radius", "10.0",
+            ("--radius", float, "radius", 10.0,
                 "What is the radius"),
-            ("--segments", "store", "int", "segments", "4",
+            ("--capacity", float, "capacity", 0.0,
+                "Capacity in litres, sets the radius when above 0"),
+            ("--segments", int, "segments", 4,
                 "How many segments to make the dome"),
-            ("--seams", "store", "int", "seams", "1",
+            ("--seams", int, "seams", 1,
                 "How many seams per segment"),
-            ("--showSegData", "store", "inkbool", "showSegData", "false",
+            ("--showSegData", inkex.Boolean, "showSegData", False,
                 "Show segment data table?"),
-            ("--showSegLabel", "store", "inkbool", "showSegLabel", "true",
+            ("--showSegLabel", inkex.Boolean, "showSegLabel", True,
                 "SHow segment labels?"),
             # Zipper options
-            ("--zipperTop", "store", "float", "zipperTop", "1.0",
+            ("--zipperTop", float, "zipperTop", 1.0,
                 "Width of piece above zipper"),
-            ("--zipperBottom", "store", "float", "zipperBottom", "1.0",
+            ("--zipperBottom", float, "zipperBottom", 1.0,
                 "Width of piece under the zipper"),
-            ("--zipperStrapJoin", "store", "float", "zipperStrapJoin", "1.0",
+            ("--zipperStrapJoin", float, "zipperStrapJoin", 1.0,
                 "Width of the join, must be greater than the webbing"),
-            ("--zipperHeight", "store", "float", "zipperHeight", "1.0",
+            ("--zipperHeight", float, "zipperHeight", 1.0,
                 "Height of the zipper"),
+            ("--maxStripLength", float, "maxStripLength", 0.0,
+                "Longest strip panel that can be cut, 0 to never split"),
             # Seam options
-            ("--addSeamAllowence", "store", "inkbool", "addSeams", "false",
+            ("--addSeamAllowence", inkex.Boolean, "addSeams", False,
                 "Add seams allowence in?"),
-            ("--seamAllowenceInner", "store", "float", "seamInner", "0.0",
+            ("--seamAllowenceInner", float, "seamInner", 0.0,
                 "Seam allowence for the inner seam"),
-            ("--seamAllowenceEnd", "store", "float", "seamEnd", "0.0",
+            ("--seamAllowenceEnd", float, "seamEnd", 0.0,
                 "Seam allowence for the ends of each segment"),
-            ("--seamAllowenceOuter", "store", "float", "seamOuter", "0.0",
+            ("--seamAllowenceOuter", float, "seamOuter", 0.0,
                 "Seam allowence for the outer seam"),
-            ("--seamAllowenceOther", "store", "float", "seamOther", "0.0",
+            ("--seamAllowenceOther", float, "seamOther", 0.0,
                 "Seam allowence for the other seams"),
+            ("--seamAllowenceJoin", float, "seamJoin", 1.0,
+                "Seam allowence on both sides of a strip join"),
             # Rendering options
-            #("--topCone", "store", "inkbool", "topCone", "false",
+            #("--topCone", inkex.Boolean, "topCone", False,
                 #"Render the top cone as a circle?"),
-            ("--onlyRender", "store", "inkbool", "onlyRender", "false",
+            ("--onlyRender", inkex.Boolean, "onlyRender", False,
                 "Render only some segments?"),
-            ("--renderSegmentsFrom", "store", "int", "rendSegsFrom", "20",
+            ("--renderSegmentsFrom", int, "rendSegsFrom", 20,
                 "Render segments from:"),
-            ("--renderSegmentsTo", "store", "int", "rendSegsTo", "20",
-                "Render segments to:")
+            ("--renderSegmentsTo", int, "rendSegsTo", 20,
+                "Render segments to:"),
+            ("--compoundPaths", inkex.Boolean, "compoundPaths", False,
+                "Merge all cut lines and all seam lines into single paths? "
+                "The segments are not labelled, the paths' descriptions "
+                "name them"),
+            ("--workers", int, "workers", 0,
+                "Worker processes used to build the pieces, 0 for none"),
+            ("--arcPaths", inkex.Boolean, "arcPaths", False,
+                "Write the path data of circles and arcs up front"),
+            ("--sodipodiArcs", inkex.Boolean, "sodipodiArcs", True,
+                "Keep circles and arcs editable as Inkscape arcs"),
+            ("--preview", inkex.Boolean, "preview", False,
+                "Render only the cut outlines, for a fast live preview"),
+            ("--previewCache", str, "previewCache",
+                os.path.join(tempfile.gettempdir(), 'abag_preview.json'),
+                "File to keep preview data in between runs"),
+            # Notch options
+            ("--notches", int, "notches", 0,
+                "Notches along each sewn edge of a piece, 0 for none"),
+            ("--notchSize", float, "notchSize", 0.5,
+                "Length of the notches without seam allowence"),
+            # Export options
+            ("--cutListFile", str, "cutListFile", "",
+                "Also write the cut list to this .json or .csv file"),
+            ("--notchFile", str, "notchFile", "",
+                "Also write the notches as DXF points to this file"),
+            ("--tileDir", str, "tileDir", "",
+                "Also write the pattern as printable pages to this folder"),
+            ("--tilePaper", str, "tilePaper", "a4",
+                "Paper size of the pages, a4 or letter"),
+            ("--thumbnailFile", str, "thumbnailFile", "",
+                "Also write a PNG thumbnail of the pattern to this file")
         )
 
-        for oLongName, oAction, oType, oDest, oDefault, oHelp in options:
-            self.OptionParser.add_option(oLongName, action="store", type=oType,
-                    dest=oDest, default=oDefault, help=oHelp)
+        for oLongName, oType, oDest, oDefault, oHelp in options:
+            pars.add_argument(oLongName, type=oType, dest=oDest,
+                              default=oDefault, help=oHelp)
 
     def add_info_lines(self, lines):
-        t = type(lines)
-        if t is TupleType:
+        if isinstance(lines, tuple):
             self._lines.extend(lines)
-        elif t is StringType:
+        elif isinstance(lines, str):
             self._lines.append(lines)
 
     def write_info_lines(self):
-        se = inkex.etree.SubElement
         s = {'font-size': '12px', 'font-weight': 'normal'}
-        fs = formatStyle(s)
-        n = se(self.current_layer, inkex.addNS('text', 'svg'), {'style': fs})
-        lattr = {'style': fs, inkex.addNS('role', 'sodipodi'): 'line'}
+        fs = nodes.style(s)
+        n = nodes.node(self.current_layer, nodes.TEXT, (('style', fs),))
+        lattr = (('style', fs), (nodes.ROLE, 'line'))
 
         s['font-size'] = '16px'
         s['font-weight'] = 'bold'
 
-        hattr = {
-            'style': formatStyle(s),
-            inkex.addNS('role', 'sodipodi'): 'line'
-        }
+        hattr = (('style', nodes.style(s)), (nodes.ROLE, 'line'))
 
         for l in self._lines:
             if l.startswith('$'):
@@ -339,7 +246,177 @@ class Abagpat(inkex.Effect):
                 l = l.lstrip('$')
             else:
                 attr = lattr
-            se(n, inkex.addNS('tspan', 'svg'), attr).text = l
+            nodes.node(n, nodes.TSPAN, attr, l)
+
+    def piece_group(self, label):
+        """
+        Return the group to render a piece into. In compound path mode all
+        pieces share one group which only holds the labels of the strips,
+        the segment labels are left out so the number of elements does not
+        grow with the segment count.
+        """
+        if not self.options.compoundPaths:
+            return nodes.node(self.current_layer, nodes.GROUP,
+                              ((nodes.LABEL, label),))
+        if self._labels_group is None:
+            self._labels_group = nodes.node(self.current_layer, nodes.GROUP,
+                                            ((nodes.LABEL, 'Labels'),))
+        return self._labels_group
+
+    def add_piece_path(self, grp, d, label, kind, attr):
+        """
+        Render the formatted path data of a piece, kind is either 'cut' or
+        'seam'
+        """
+        if self.options.compoundPaths:
+            self._compound[kind].append((label, d))
+        else:
+            attr['d'] = d
+            nodes.node(grp, nodes.PATH, attr)
+
+    def write_compound_paths(self, attr):
+        """
+        Write one path per kind holding every queued piece as a subpath. The
+        <desc> maps each subpath, in order, back to its piece label.
+        """
+        names = {'cut': 'Cut lines', 'seam': 'Seam lines'}
+        attr = dict(attr)
+        for kind in ('cut', 'seam'):
+            pieces = self._compound[kind]
+            if not pieces:
+                continue
+            attr['d'] = ''.join(d for label, d in pieces)
+            attr[nodes.LABEL] = names[kind]
+            node = nodes.node(self.current_layer, nodes.PATH, attr)
+            nodes.node(node, nodes.DESC, text='\n'.join(
+                "%i %s" % (i, label) for i, (label, d) in enumerate(pieces)))
+            self._compound[kind] = []
+
+    def imap_pieces(self, func, jobs, count):
+        """
+        Yield func(job) for each of the count jobs as they are needed, spread
+        over --workers processes when there are enough jobs. The results keep
+        the order of the jobs so the nodes are always merged into the
+        document in segment order.
+        """
+        workers = self.options.workers
+        if workers < 2 or count < 2 * workers:
+            for job in jobs:
+                yield func(job)
+            return
+        # The pool reads the jobs from its own thread, they are all made
+        # here first so nothing else is run on that thread
+        jobs = list(jobs)
+        import multiprocessing
+        pool = multiprocessing.Pool(workers)
+        try:
+            for result in pool.imap(func, jobs,
+                                    max(1, count // (workers * 4))):
+                yield result
+        finally:
+            pool.close()
+            pool.join()
+
+    def segment_range(self):
+        """
+        The first and last segment to render, all of them unless
+        --onlyRender is set.
+        """
+        o = self.options
+        if not o.onlyRender:
+            return 1, o.segments
+        first = max(1, min(o.rendSegsFrom, o.rendSegsTo))
+        last = min(o.segments, max(o.rendSegsFrom, o.rendSegsTo))
+        return first, last
+
+    def segment_pipeline(self, first, last, thickness, seams):
+        """
+        Yield (job, (cut_d, seam_d)) for the segments first to last. The ring
+        data, the jobs and the path data are all produced one segment at a
+        time, so only the segments asked for cost anything.
+
+        @param thickness Thickness of the segments in pixels
+        @param seams Seam allowances in pixels for DomeSeamPiece or None
+        """
+        o = self.options
+        center = self.view_center
+
+        def jobs():
+            rings = iter_segment_data(o.radius, o.segments, first, last)
+            for i, angle, radius in rings:
+                r = self.svg.unittouu(str(radius) + "cm")
+                yield (i, angle / o.seams, r, thickness, center, seams, radius)
+
+        count = max(0, last - first + 1)
+        return self.imap_pieces(segment_job, jobs(), count)
+
+    def zipper_notch_edges(self, key, rect, start=0.0):
+        """
+        The notched edges of a zipper or body strip. The bottom of the body
+        strip is sewn to the rim of the dome and its top to the top zipper
+        strip and the join. The top and bottom zipper strips meet over the
+        zipper.
+
+        @param start Where rect starts along its strip when the strip is cut
+                     as panels
+        """
+        o = self.options
+        size = self.svg.unittouu(str(o.notchSize) + 'cm')
+        c = self.svg.unittouu(str(2 * pi * o.radius) + 'cm')
+        n = o.seams
+        if key == 'BodyStrip':
+            return [rect.notch_edge('bottom', size, c, n, start),
+                    rect.notch_edge('top', size, c, n, start)]
+        elif key == 'ZipTop':
+            return [rect.notch_edge('top', size, c, n, start),
+                    rect.notch_edge('bottom', size, c, n, start)]
+        elif key == 'ZipBottom':
+            return [rect.notch_edge('top', size, c, n, start)]
+        elif key == 'ZipJoin':
+            join = self.svg.unittouu(str(o.zipperStrapJoin) + 'cm')
+            return [rect.notch_edge('top', size, c, n, c - join + start)]
+        return []
+
+    def strip_panels(self, zipdata):
+        """
+        Plan the panels of every zipper and body strip longer than
+        --maxStripLength together, joins go on the notch marks.
+
+        @return dict of key: ((start, end), ...) in cm along the strip
+        """
+        from abag_strips import mark_step, panel_bounds, plan_joins
+        o = self.options
+        keys = sorted(zipdata)
+        length = [zipdata[key]['d'][0] for key in keys]
+        other = o.seamOther if o.addSeams else 0.0
+        join = o.seamJoin if o.addSeams else 0.0
+        offset = [2 * pi * o.radius - o.zipperStrapJoin if key == 'ZipJoin'
+                  else 0.0 for key in keys]
+        count, joins = plan_joins(length, o.maxStripLength, join, other,
+                                  other, mark_step(o.radius, o.seams,
+                                                   o.notches), offset)
+        starts, ends = panel_bounds(length, count, joins)
+        return dict((key, tuple(zip(starts[i, :count[i]].tolist(),
+                                    ends[i, :count[i]].tolist())))
+                    for i, key in enumerate(keys))
+
+    def write_notches(self, edges, attr):
+        """Place every notch in one go and render them as a single path"""
+        from abag_notch import notch_marks, tick_path, write_dxf
+        o = self.options
+        points, ends = notch_marks(edges, o.notches)
+        attr = dict(attr)
+        attr['d'] = tick_path(points, ends)
+        attr[nodes.LABEL] = 'Notches'
+        nodes.node(self.current_layer, nodes.PATH, attr)
+        if o.notchFile:
+            with open(o.notchFile, 'w') as fh:
+                write_dxf(fh, points, self.svg.unittouu('1cm'))
+
+    def arc_options(self):
+        """Keyword arguments for the circle and ellipse helpers"""
+        o = self.options
+        return {'precompute': o.arcPaths, 'sodipodi': o.sodipodiArcs}
 
     def write_dome_piece_label(self, radius, thickness, node, order):
         #thickness = self.options.thickness
@@ -347,21 +424,81 @@ class Abagpat(inkex.Effect):
         startend = (0, 2 * pi)
         nid = 'text_path' + str(order) + str(randint(1, 50000))
 
-        ellipse_id((r, r), self.view_center, node, nid, startend)
+        ellipse_id((r, r), self.view_center, node, nid, startend,
+                   **self.arc_options())
         # Create text element
-        attr = {
-            'style': formatStyle({'font-size': str(int(thickness / 8))})
-        }
-        t = inkex.etree.Element(inkex.addNS('text', 'svg'), attr)
-        tp = inkex.etree.SubElement(t, inkex.addNS('textPath', 'svg'))
+        nodes.text_path(node, nid,
+                        "S%i - dome radius %.1fcm" % (order,
+                                                      self.options.radius),
+                        nodes.style({'font-size': str(int(thickness / 8))}),
+                        str(25 // self.options.segments) + "%")
+
+    def preview_path_data(self):
+        """
+        Path data of every cut outline, with two decimal places. No seams,
+        labels or info table.
+        """
+        o = self.options
+        cx, cy = self.view_center
+        domedata, thickness = make_dome_data(o.radius, o.segments)
+        thicknessPx = self.svg.unittouu(str(thickness) + "cm")
+        cm = self.svg.unittouu('1cm')
 
-        tp.set(inkex.addNS('href', 'xlink'), "#" + nid)
-        tp.set('startOffset', str(25 / self.options.segments) + "%")
-        tp.text = "S%i - dome radius %.1fcm" % (order, self.options.radius)
+        d = []
+        zipdata = make_zipper_data(o.radius, thickness,
+                                    o.zipperStrapJoin, o.zipperHeight,
+                                    o.zipperTop, o.zipperBottom)
+        for key, val in sorted(zipdata.items()):
+            w, h = val['d']
+            rect = RectPattern(w * cm, h * cm)
+            rect.set_start_loc(200, 200)
+            d.append(format_path(rect.path, 2))
+
+        for i in range(1, len(domedata) + 1):
+            angle, radius = domedata[i]
+            angle = angle / o.seams
+            r = radius * cm
+            if i == 1:
+                p = circle_path((r * angle) / (2 * pi), cx, cy)
+            else:
+                piece = DomePiece(i, angle, r, thicknessPx)
+                piece.set_start_loc(cx, cy)
+                p = piece.path
+            d.append(format_path(p, 2))
+        return ''.join(d)
 
-        node.append(t)
+    def render_preview(self):
+        # Only needs the plain pieces, numpy and the seam offsetting are
+        # never imported on this path.
+        o = self.options
+        cx, cy = self.view_center
+        # The document scale too, the same pattern is other path data in a
+        # document with other user units
+        key = repr((o.radius, o.segments, o.seams, o.zipperStrapJoin,
+                    o.zipperHeight, o.zipperTop, o.zipperBottom,
+                    round(cx, 2), round(cy, 2),
+                    round(self.svg.unittouu('1cm'), 6)))
+        cache = PreviewCache(o.previewCache)
+        d = cache.get(key)
+        if d is None:
+            d = self.preview_path_data()
+            cache.put(key, d)
+
+        style = {'stroke': '#000000', 'stroke-width': '1.0px', 'fill': 'none'}
+        nodes.path(self.current_layer, d, nodes.style(style), 'Preview')
 
     def effect(self):
+        o = self.options
+        if o.capacity > 0:
+            from abag_capacity import radius_for_capacity
+            o.radius = radius_for_capacity(o.capacity, o.segments,
+                                           o.zipperHeight, o.zipperTop,
+                                           o.zipperBottom)
+
+        if self.options.preview:
+            self.render_preview()
+            return
+
         # a short hand
         so = self.options
         o = self.options
@@ -373,20 +510,16 @@ class Abagpat(inkex.Effect):
         cx, cy = self.view_center
         # Put in in the centre of the current view
         #center = self.view_center
-        domedata, thickness = make_dome_data(o.radius, o.segments)
-        #segData = data_dict
+        thickness = segment_thickness(o.radius, o.segments)
 
         # change radius(cm) into pixels
-        #r_px = inkex.unittouu(str(o.radius) + 'cm')
-        thicknessPx = inkex.unittouu(str(thickness) + "cm")
+        thicknessPx = self.svg.unittouu(str(thickness) + "cm")
 
         # change seams from cm to pixels
-        seamInner = inkex.unittouu(str(o.seamInner) + "cm")
-        seamOuter = inkex.unittouu(str(o.seamOuter) + "cm")
-        seamEnd = inkex.unittouu(str(o.seamEnd) + "cm")
-        seamOther = inkex.unittouu(str(so.seamOther) + 'cm')
-
-        SubElement = inkex.etree.SubElement
+        seamInner = self.svg.unittouu(str(o.seamInner) + "cm")
+        seamOuter = self.svg.unittouu(str(o.seamOuter) + "cm")
+        seamEnd = self.svg.unittouu(str(o.seamEnd) + "cm")
+        seamOther = self.svg.unittouu(str(so.seamOther) + 'cm')
 
         #inkex.debug(type(seamOther))
 
@@ -399,7 +532,7 @@ class Abagpat(inkex.Effect):
 
         #lineStyle = line_style
         #defaultStyle = lineStyle
-        attr = {'style': formatStyle(line_style)}
+        attr = {'style': nodes.style(line_style)}
         #defaultAttr = attr
 
         self.add_info_lines(
@@ -407,9 +540,15 @@ class Abagpat(inkex.Effect):
             "Total segments: %i" % o.segments,
             "Radius of dome: %.1fcm" % (o.radius),
             "Segment thickness: %.3fcm" % (thickness),
-            "rendering line thickness: %.3f" % (inkex.uutounit(0.5, 'cm')),
-            " ")
+            "rendering line thickness: %.3f" % (self.svg.uutounit(0.5, 'cm')))
         )
+        # Only shown with the data table, so it is only worked out for it
+        if so.showSegData:
+            from abag_capacity import capacity
+            self.add_info_lines("Capacity: %.1f litres" % capacity(
+                o.radius, o.segments, o.zipperHeight, o.zipperTop,
+                o.zipperBottom))
+        self.add_info_lines(" ")
 
         if o.addSeams:
             self.add_info_lines(
@@ -420,90 +559,128 @@ class Abagpat(inkex.Effect):
                 "Other seams: %.1fcm" % (o.seamOther),
                 " ")
             )
-        # zipper and body strip
-        zipdata = make_zipper_data(o.radius, thickness,
-                                    o.zipperStrapJoin, o.zipperHeight,
-                                    o.zipperTop, o.zipperBottom)
+        # zipper and body strip, left out when only re-cutting segments
+        zipdata = {}
+        if not o.onlyRender:
+            zipdata = make_zipper_data(o.radius, thickness,
+                                        o.zipperStrapJoin, o.zipperHeight,
+                                        o.zipperTop, o.zipperBottom)
         regex = re.compile("([a-z])([A-Z])")
-        for key, val in zipdata.iteritems():
+        notch_edges = []
+        panels = {}
+        if zipdata and o.maxStripLength > 0:
+            panels = self.strip_panels(zipdata)
+        for key, val in zipdata.items():
             w, h = val['d']
             x1, y1 = (200, 200)
 
-            wpx = inkex.unittouu(str(w) + 'cm')
-            hpx = inkex.unittouu(str(h) + 'cm')
-            label = val['label']
-            name = regex.sub('\g<1> \g<2>', key)
-
-            rect = RectPattern(wpx, hpx, label, name)
-            rect.set_start_loc(x1, y1)
-
-            grp = SubElement(self.current_layer, 'g',
-                {inkex.addNS('label', 'inkscape'): key})
-
-            attr['d'] = formatPath(rect.path)
-            SubElement(grp, inkex.addNS('path', 'svg'), attr)
-
-            if o.addSeams:
-                seam = RectSeamPattern.from_rect(rect)
-                seam.set_seams(seamOther)
-
-                if seam.label.startswith('Z1'):
-                    seam.bottom = 0
-                elif seam.label.startswith('Z2'):
-                    seam.top = 0
-
-                attr['d'] = formatPath(seam.path)
-                SubElement(grp, inkex.addNS('path', 'svg'), attr)
+            hpx = self.svg.unittouu(str(h) + 'cm')
+            grp = self.piece_group(key)
+            # (start, end) of each panel along the strip, cm
+            spans = panels.get(key, ((0.0, w),))
+            joinPx = self.svg.unittouu(str(o.seamJoin) + 'cm') \
+                if o.addSeams else 0.0
+            gap = self.svg.unittouu('1cm') + 2 * joinPx
+
+            for k, (start, end) in enumerate(spans):
+                label = val['label']
+                name = regex.sub(r'\g<1> \g<2>', key)
+                if len(spans) > 1:
+                    from abag_strips import panel_label
+                    label, name = panel_label(label, name, k, len(spans))
+                    w = end - start
+                startPx = self.svg.unittouu(str(start) + 'cm')
+                wpx = self.svg.unittouu(str(w) + 'cm')
+
+                rect = RectPattern(wpx, hpx, label, name)
+                # Panels in strip order, apart by their join seams
+                rect.set_start_loc(x1 + startPx + k * gap, y1)
+
+                self.add_piece_path(grp, format_path(rect.path), label,
+                                    'cut', attr)
 
-            # add labels to rendered piece
-            svg_add_text(grp, 212, y1 + (rect.height / 4),
-                                    "%s (%s)" % (rect.name, rect.label))
-
-            self.add_info_lines(
-                ("$" + rect.name + " (" + rect.label + ")",
-                "Width: %.3fcm" % (w),
-                "Height: %.3fcm" % (h))
-            )
+                if o.addSeams:
+                    seam = RectSeamPattern.from_rect(rect)
+                    seam.set_seams(seamOther)
+
+                    if seam.label.startswith('Z1'):
+                        seam.bottom = 0
+                    elif seam.label.startswith('Z2'):
+                        seam.top = 0
+                    if k > 0:
+                        seam.left = joinPx
+                    if k < len(spans) - 1:
+                        seam.right = joinPx
+
+                    self.add_piece_path(grp, format_path(seam.path), label,
+                                        'seam', attr)
+
+                if o.notches:
+                    notched = seam if o.addSeams else rect
+                    notch_edges.extend(self.zipper_notch_edges(key, notched,
+                                                               startPx))
+
+                # add labels to rendered piece
+                svg_add_text(grp, 212 + rect.start_loc[0] - x1,
+                             y1 + (rect.height / 4),
+                             "%s (%s)" % (rect.name, rect.label))
+
+                self.add_info_lines(
+                    ("$" + rect.name + " (" + rect.label + ")",
+                    "Width: %.3fcm" % (w),
+                    "Height: %.3fcm" % (h))
+                )
 
         #return
 
-        # loop through the data_dict making each segment in turn using the data
-        # OPTIMIZE: Should use enumerate here
-        for i in xrange(1, len(domedata) + 1):
+        # the segments asked for, each one computed, built (possibly in
+        # parallel) and added to the document in turn
+        seams = None
+        if o.addSeams:
+            seams = {'outer': seamOuter, 'inner': seamInner, 'end': seamEnd}
+        first, last = self.segment_range()
+        segments = self.segment_pipeline(first, last, thicknessPx, seams)
+        for job, (cut, seam) in segments:
+            i, angle, r = job[:3]
+            radius = job[6]
             # create a group to put this pattern in
-            grp = SubElement(self.current_layer, 'g',
-                        {inkex.addNS('label', 'inkscape'): "Segment " + str(i)})
-            #get the data we need from the dictionary
-            angle, radius = domedata[i]
-            angle = angle / o.seams
-            r = inkex.unittouu(str(radius) + "cm")
+            grp = self.piece_group("Segment " + str(i))
+            label = "S%i" % i
 
             if i == 1:
                 # adjust top cone to be a flat circle using pixel units
                 r = (r * angle) / (2 * pi)
                 angle = 2 * pi
-                circle(r, cx, cy, grp, line_style)
-                if o.addSeams:
-                    circle(r + seamOuter, cx, cy, grp, line_style)
+                if o.compoundPaths:
+                    self.add_piece_path(grp, format_path(circle_path(r, cx, cy)),
+                                        label, 'cut', attr)
+                    if o.addSeams:
+                        d = format_path(circle_path(r + seamOuter, cx, cy))
+                        self.add_piece_path(grp, d, label, 'seam', attr)
+                else:
+                    arcs = self.arc_options()
+                    circle(r, cx, cy, grp, line_style, **arcs)
+                    if o.addSeams:
+                        circle(r + seamOuter, cx, cy, grp, line_style, **arcs)
+                if o.notches:
+                    depth = seamOuter if o.addSeams and seamOuter else \
+                        -self.svg.unittouu(str(o.notchSize) + 'cm')
+                    notch_edges.append(arc_edge(cx, cy, r, 1, depth,
+                                                2 * pi * r))
             else:
-                piece = DomePiece(i, angle, r, thicknessPx)
-                piece.set_start_loc(cx, cy)
-
-                attr['d'] = formatPath(piece.path)
-                SubElement(grp, inkex.addNS('path', 'svg'), attr)
-
-                if o.addSeams:
-                    # set all the seams
-                    seam = DomeSeamPiece.from_dome_piece(piece)
-                    seam.set_seams({
-                        'outer': seamOuter,
-                        'inner': seamInner,
-                        'end': seamEnd
-                    })
-                    attr['d'] = formatPath(seam.path)
-                    SubElement(grp, inkex.addNS('path', 'svg'), attr)
-
-            if o.showSegLabel:
+                self.add_piece_path(grp, cut, label, 'cut', attr)
+                if seam:
+                    self.add_piece_path(grp, seam, label, 'seam', attr)
+                if o.notches:
+                    piece = DomeSeamPiece(i, angle, r, thicknessPx,
+                                          **(seams or {}))
+                    piece.start_loc = (cx, cy)
+                    notch_edges.extend(piece.notch_edges(
+                        self.svg.unittouu(str(o.notchSize) + 'cm')))
+
+            # Each label is an arc and a text, the compound paths' <desc>
+            # names the segments instead
+            if o.showSegLabel and not o.compoundPaths:
                 self.write_dome_piece_label(r, thicknessPx, grp, i)
 
             self.add_info_lines(
@@ -513,10 +690,56 @@ class Abagpat(inkex.Effect):
                 'Angle: %.4f' % degrees(angle))
             )
 
+        if notch_edges:
+            self.write_notches(notch_edges, attr)
+
+        if o.compoundPaths:
+            self.write_compound_paths(attr)
+
         #self.addInfoLines(lines)
         if so.showSegData:
-            self.writeInfoLines()
+            self.write_info_lines()
+
+        if so.cutListFile:
+            self.write_cut_list(so.cutListFile)
 
+        if so.tileDir:
+            self.write_tiles(so.tileDir)
 
-d = Abagpat()
-d.affect()
+        if so.thumbnailFile:
+            self.write_thumbnail(so.thumbnailFile)
+
+    def pattern_model(self):
+        """The PatternModel of the options, strips cut as panels"""
+        from abag_model import PatternModel
+        o = self.options
+        seams = None
+        if o.addSeams:
+            seams = seam_allowances(o)
+        model = PatternModel.from_dimensions(o.radius, o.segments, o.seams,
+                                             o.zipperStrapJoin, o.zipperHeight,
+                                             o.zipperTop, o.zipperBottom, seams)
+        if o.maxStripLength > 0:
+            from abag_strips import mark_step, split_strips
+            model = split_strips(model, o.maxStripLength,
+                                 o.seamJoin if o.addSeams else 0.0,
+                                 mark_step(o.radius, o.seams, o.notches))
+        return model
+
+    def write_cut_list(self, filename):
+        fmt = 'csv' if filename.lower().endswith('.csv') else 'json'
+        with open(filename, 'w', newline='') as fh:
+            write_model_cut_list(fh, fmt, self.pattern_model())
+
+    def write_tiles(self, directory):
+        from abag_tile import write_tiles
+        write_tiles(self.pattern_model(), directory, self.options.tilePaper)
+
+    def write_thumbnail(self, filename):
+        from abag_raster import write_thumbnail
+        write_thumbnail(filename, self.pattern_model())
+
+
+if __name__ == '__main__':
+    d = Abagpat()
+    d.run()
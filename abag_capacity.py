@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+abag_capacity.py
+Capacity of the assembled bag and the dome radius for a given capacity
+Copyright (C) 2014 Samuel Hodges <octerman@gmail.com>
+
+This program is free software: you can redistribute it and/or modify it
+under the terms of the GNU General Public License as published by the
+Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along
+with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+The bag is the dome of cone rings on top of a straight wall as wide as the
+dome, as high as the body strip and the zipper pieces sewn on top of each
+other. The dome is rebuilt from the flat pieces as in abag_mesh and its
+volume is the sum of the frustums between the ring edges. Every length of
+the dome pieces grows with the radius, so the dome and the body strip only
+need working out once per segment count, for a radius of 1:
+
+    V(r) = (dome + pi * strip) * r^3 + pi * zipper * r^2
+
+with strip the body strip height and zipper the height of the zipper
+pieces. V only grows with r, the radii for a whole list of capacities are
+found together with Newton's method on numpy arrays.
+
+Capacities are in litres, lengths in cm.
+
+Usage:
+    python abag_capacity.py --segments=8 --capacity=5,10,20
+"""
+import sys
+from math import pi
+from optparse import OptionParser
+import numpy as np
+from abag_mesh import ring_profile
+from abag_utils import make_zipper_data, segment_thickness
+from abag_cutlist import add_pattern_options
+
+# cm^3 in a litre
+LITRE = 1000.0
+
+
+def dome_volume(radius, segments):
+    """Volume in cm^3 under the assembled dome, down to its rim"""
+    rho, z, mismatch = ring_profile(radius, segments)
+    h = z[:-1] - z[1:]
+    r1 = rho[:-1]
+    r2 = rho[1:]
+    return float(np.sum(pi * h / 3 * (r1 * r1 + r1 * r2 + r2 * r2)))
+
+
+def coefficients(segments, zip_h=1.0, top_h=1.0, bottom_h=1.0):
+    """
+    (a, b) with the capacity in cm^3 a * r^3 + b * r^2 for a radius r
+
+    @return tuple of floats
+    """
+    data = make_zipper_data(1.0, segment_thickness(1.0, segments), 0.0,
+                            zip_h, top_h, bottom_h)
+    # The body strip grows with the radius, the zipper pieces do not
+    strip = data['BodyStrip']['d'][1]
+    zipper = data['ZipJoin']['d'][1]
+    return dome_volume(1.0, segments) + pi * strip, pi * zipper
+
+
+def capacity(radius, segments, zip_h=1.0, top_h=1.0, bottom_h=1.0):
+    """
+    Capacity in litres of the bags with the given dome radii.
+
+    @param radius float or array of radii in cm
+    @return float or array like radius
+    """
+    a, b = coefficients(segments, zip_h, top_h, bottom_h)
+    r = np.asarray(radius, dtype=float)
+    return (a * r + b) * r * r / LITRE
+
+
+def radius_for_capacity(litres, segments, zip_h=1.0, top_h=1.0,
+                        bottom_h=1.0, tolerance=1e-9, iterations=50):
+    """
+    The dome radius giving each capacity.
+
+    @param litres float or array of capacities
+    @return float or array of radii in cm, nan where the capacity is not
+            above 0
+    """
+    a, b = coefficients(segments, zip_h, top_h, bottom_h)
+    v = np.asarray(litres, dtype=float) * LITRE
+    valid = v > 0
+    v = np.where(valid, v, 1.0)
+    # Without the zipper the root is the cube root, the zipper only adds
+    # volume so this starts above the root. V is convex for r > 0, Newton
+    # steps from there come down to the root without overshooting it.
+    r = np.cbrt(v / a)
+    for i in range(iterations):
+        step = ((a * r + b) * r * r - v) / ((3 * a * r + 2 * b) * r)
+        r = r - step
+        if np.all(np.abs(step) <= tolerance * r):
+            break
+    r = np.where(valid, r, np.nan)
+    if r.ndim == 0:
+        return float(r)
+    return r
+
+
+def main(argv=None):
+    parser = OptionParser(usage="usage: %prog [options]")
+    add_pattern_options(parser, (
+        ("--capacity", "string", "capacity", "",
+            "Comma separated capacities in litres, the capacity of --radius "
+            "is printed if empty"),
+    ))
+    o, args = parser.parse_args(argv)
+
+    shape = (o.segments, o.zipperHeight, o.zipperTop, o.zipperBottom)
+    if not o.capacity:
+        sys.stdout.write("%.3f litres\n" % capacity(o.radius, *shape))
+        return 0
+    litres = [float(v) for v in o.capacity.split(',') if v.strip()]
+    radii = radius_for_capacity(litres, *shape)
+    for v, r in zip(litres, radii.tolist()):
+        if r == r:
+            sys.stdout.write("%g litres: radius %.3fcm\n" % (v, r))
+        else:
+            sys.stdout.write("%g litres: no radius\n" % v)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+abag_cutlist.py
+Machine readable cut list for the Ananabag bag pattern
+Copyright (C) 2014 Samuel Hodges <octerman@gmail.com>
+
+This program is free software: you can redistribute it and/or modify it
+under the terms of the GNU General Public License as published by the
+Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along
+with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+The cut list is calculated in bulk from a PatternModel, no SVG is
+rendered. All lengths are in cm, areas in cm^2 and angles in degrees.
+
+Usage:
+    python abag_cutlist.py --radius=10 --segments=4 --format=csv > cut.csv
+"""
+import csv
+import json
+import sys
+from optparse import OptionParser
+from abag_model import PatternModel
+
+FIELDS = (
+    'label', 'name', 'kind', 'quantity',
+    'outer_radius', 'inner_radius', 'angle', 'width', 'height',
+    'seam_outer', 'seam_inner', 'seam_end',
+    'seam_top', 'seam_right', 'seam_bottom', 'seam_left',
+    'area', 'cut_area', 'cut_length'
+)
+
+
+def cut_list(radius, segments, seams=1, join_w=1.0, zip_h=1.0, top_h=1.0,
+             bottom_h=1.0, seam_allowances=None):
+    """
+    Yield every piece of the bag pattern, zipper strips first then the dome
+    segments, as dictionaries keyed by FIELDS.
+
+    @param seam_allowances dict with 'inner', 'outer', 'end' and 'other' in cm,
+                           or None for no seam allowance
+    """
+    model = PatternModel.from_dimensions(radius, segments, seams, join_w,
+                                         zip_h, top_h, bottom_h,
+                                         seam_allowances)
+    return model_cut_list(model)
+
+
+def model_cut_list(model):
+    """Yield every piece of a PatternModel as a dictionary keyed by FIELDS"""
+    for row in model.rows():
+        yield _row(row)
+
+
+def _row(values):
+    row = dict.fromkeys(FIELDS, None)
+    row.update(values)
+    return row
+
+
+def write_json(rows, fh):
+    """Stream rows to fh as a JSON array, one piece per line."""
+    fh.write('[')
+    sep = '\n'
+    for row in rows:
+        fh.write(sep)
+        fh.write(json.dumps(row, sort_keys=True))
+        sep = ',\n'
+    fh.write('\n]\n')
+
+
+def write_csv(rows, fh):
+    """Stream rows to fh as CSV with a header line."""
+    writer = csv.DictWriter(fh, FIELDS, lineterminator='\n')
+    writer.writerow(dict(zip(FIELDS, FIELDS)))
+    for row in rows:
+        writer.writerow(row)
+
+WRITERS = {
+    'json': write_json,
+    'csv': write_csv
+}
+
+
+def write_cut_list(fh, fmt, *args, **kwargs):
+    WRITERS[fmt](cut_list(*args, **kwargs), fh)
+
+
+def write_model_cut_list(fh, fmt, model):
+    WRITERS[fmt](model_cut_list(model), fh)
+
+
+# Options of the pattern shared by the command line tools, the names match
+# the options of the Abagpat effect
+PATTERN_OPTIONS = (
+    ("--radius", "float", "radius", 10.0, "What is the radius"),
+    ("--segments", "int", "segments", 4,
+        "How many segments to make the dome"),
+    ("--seams", "int", "seams", 1, "How many seams per segment"),
+    ("--zipperTop", "float", "zipperTop", 1.0,
+        "Width of piece above zipper"),
+    ("--zipperBottom", "float", "zipperBottom", 1.0,
+        "Width of piece under the zipper"),
+    ("--zipperStrapJoin", "float", "zipperStrapJoin", 1.0,
+        "Width of the join, must be greater than the webbing"),
+    ("--zipperHeight", "float", "zipperHeight", 1.0,
+        "Height of the zipper"),
+    ("--seamAllowenceInner", "float", "seamInner", 0.0,
+        "Seam allowence for the inner seam"),
+    ("--seamAllowenceEnd", "float", "seamEnd", 0.0,
+        "Seam allowence for the ends of each segment"),
+    ("--seamAllowenceOuter", "float", "seamOuter", 0.0,
+        "Seam allowence for the outer seam"),
+    ("--seamAllowenceOther", "float", "seamOther", 0.0,
+        "Seam allowence for the other seams"),
+)
+
+
+def add_pattern_options(parser, options=(), choices=()):
+    """
+    Add PATTERN_OPTIONS and then options to an OptionParser, choices are the
+    values allowed for a 'choice' option.
+    """
+    for oLongName, oType, oDest, oDefault, oHelp in PATTERN_OPTIONS + options:
+        kwargs = {}
+        if oType == 'choice':
+            kwargs['choices'] = choices
+        parser.add_option(oLongName, action="store", type=oType, dest=oDest,
+                          default=oDefault, help=oHelp, **kwargs)
+
+
+def seam_allowances(o):
+    """The seam allowances dict from parsed pattern options"""
+    return {
+        'inner': o.seamInner,
+        'outer': o.seamOuter,
+        'end': o.seamEnd,
+        'other': o.seamOther
+    }
+
+
+def main(argv=None):
+    parser = OptionParser(usage="usage: %prog [options]")
+    add_pattern_options(parser, (
+        ("--format", "choice", "format", "json", "Output format, json or csv"),
+        ("--output", "string", "output", "-", "Output file, - for stdout")
+    ), sorted(WRITERS))
+    o, args = parser.parse_args(argv)
+
+    if o.output == '-':
+        fh = sys.stdout
+    else:
+        fh = open(o.output, 'w')
+    try:
+        write_cut_list(fh, o.format, o.radius, o.segments, o.seams,
+                       o.zipperStrapJoin, o.zipperHeight, o.zipperTop,
+                       o.zipperBottom, seam_allowances(o))
+    finally:
+        if fh is not sys.stdout:
+            fh.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+#!/usr/bin/env python3
 """
 abag_domepat.py
 The original Ananabag dome template generator Inkscape extensions
@@ -18,11 +18,11 @@ You should have received a copy of the GNU General Public License along
 with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 import inkex
-from simplestyle import formatStyle
-from simplepath import formatPath
 from math import pi, cos, sin
 from random import randint
-from abag_utils import ellipse_id, point_on_circle, Path
+from abag_utils import ellipse_id, format_path, point_on_circle, Path
+from abag_fragment import FragmentEffect
+import abag_nodes as nodes
 
 
 def get_segment_data(radius, segments):
@@ -51,25 +51,27 @@ def get_segment_data(radius, segments):
     return data, thickness
 
 
-class Domepat(inkex.Effect):
+class Domepat(FragmentEffect):
     """
     Example Inkscape effect rendering to render a pattern to make a dome from
     """
-    def __init__(self):
+    def add_arguments(self, pars):
         """
-        Constructor.
         Defines all the variable for the script
         """
-        inkex.Effect.__init__(self)
-        self.OptionParser.add_option("-r", "--radius", action="store",
-          type="float", dest="radius", default="10.0",
+        FragmentEffect.add_arguments(self, pars)
+        pars.add_argument("-r", "--radius", type=float, default=10.0,
           help="What is the Radius")
-        self.OptionParser.add_option("-s", "--segments", action="store",
-          type="int", dest="segments", default="4",
+        pars.add_argument("-s", "--segments", type=int, default=4,
           help="How many semgents to make the dome shape from")
-        self.OptionParser.add_option("-e", "--seams", action="store",
-          type="int", dest="seams", default="1",
+        pars.add_argument("-e", "--seams", type=int, default=1,
           help="How many seams per segment")
+        pars.add_argument("--height", type=float, default=0.0,
+          help="Height of the dome, 0 for a hemisphere")
+        pars.add_argument("--arcPaths", type=inkex.Boolean, default=False,
+          help="Write the path data of the label arcs up front")
+        pars.add_argument("--sodipodiArcs", type=inkex.Boolean, default=True,
+          help="Keep the label arcs editable as Inkscape arcs")
 
     def effect(self):
         o = self.options
@@ -78,31 +80,33 @@ class Domepat(inkex.Effect):
         seams = o.seams
         cx, cy = center = self.view_center
 
-        # data is a dict object
-        data, thickness = get_segment_data(o.radius, seg)
-
-        #change radius(cm) into pixels
-        thickness_px = inkex.unittouu(str(thickness) + "cm")
+        # data is a dict object of <segment>: (angle, radius, thickness)
+        if o.height and o.height != o.radius:
+            from abag_profile import ellipsoid, make_profile_data
+            data = make_profile_data(ellipsoid(o.radius, o.height), seg)
+        else:
+            data, thickness = get_segment_data(o.radius, seg)
+            for key in data:
+                data[key] += (thickness,)
 
         # use the same style info for all lines and arcs
         style = {'stroke': '#000000', 'stroke-width': '1.0px', 'fill': 'none'}
-        sattr = {'style': formatStyle(style), 'd': '', 'id': ''}
-
-        style = {'text-align': 'right', 'font-size': str(int(thickness_px / 8))}
-        iattr = {'style': formatStyle(style)}
+        sattr = {'style': nodes.style(style), 'd': '', 'id': ''}
 
         # loop through the data making each segment in turn using the data
         #for i in range(1, len(data) + 1):
         for key in data:
             i = key
             # create a group to put this pattern in
-            attrs = {inkex.addNS('label', 'inkscape'): 'segment_%d' % key}
-            grp = inkex.etree.SubElement(self.current_layer, 'g', attrs)
+            grp = nodes.node(self.current_layer, nodes.GROUP,
+                             ((nodes.LABEL, 'segment_%d' % key),))
 
             #get the data we need from the dictionary
-            angle, radius = data[key]
+            angle, radius, thickness = data[key]
             angle = angle / seams
-            r1 = inkex.unittouu(str(radius) + "cm")
+            r1 = self.svg.unittouu(str(radius) + "cm")
+            #change thickness(cm) into pixels
+            thickness_px = self.svg.unittouu(str(thickness) + "cm")
             r2 = r1 - thickness_px
 
             #piece = DomePiece(key, angle, r1, thickness_px)
@@ -139,32 +143,28 @@ class Domepat(inkex.Effect):
             path.L(sx, sy)
             path.Z()
 
-            sattr['d'] = formatPath(path)
+            sattr['d'] = format_path(path)
             sattr['id'] = 'dome_piece_path' + str(i) + str(randint(1, 50000))
 
-            inkex.etree.SubElement(grp, inkex.addNS('path', 'svg'), sattr)
+            nodes.node(grp, nodes.PATH, sattr)
 
             # draw arc to put the text along
             # FIXME: use a better UUID generator
             nid = "info_label_path" + str(i) + str(randint(1, 50000))
 
             r3 = r1 - (thickness_px / 3)
-            ellipse_id((r3, r3), center, grp, nid, (0, angle))
-
-            text = inkex.etree.Element(inkex.addNS('text', 'svg'), iattr)
-            textpath = inkex.etree.SubElement(text,
-                                            inkex.addNS('textPath', 'svg'))
-            textpath.set(inkex.addNS('href', 'xlink'), "#" + nid)
-            textpath.set('startOffset', str(25 / seg) + "%")
+            ellipse_id((r3, r3), center, grp, nid, (0, angle),
+                       precompute=o.arcPaths, sodipodi=o.sodipodiArcs)
 
+            style = {'text-align': 'right',
+                     'font-size': str(int(thickness_px / 8))}
             s = "S:%i-[Rcm:%.1f,Sg:,%i,Se:%i, Th:%.2f]"
             s = s % (i, o.radius, seg, seams, thickness)
-            textpath.text = s
-
-            # append it to the main group
-            grp.append(text)
+            nodes.text_path(grp, nid, s, nodes.style(style),
+                            str(25 // seg) + "%")
 
 
-d = Domepat()
-d.affect()
+if __name__ == '__main__':
+    d = Domepat()
+    d.run()
 
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+abag_fragment.py
+Append-only output for abag-inkex effects
+Copyright (C) 2014 Samuel Hodges <octerman@gmail.com>
+
+This program is free software: you can redistribute it and/or modify it
+under the terms of the GNU General Public License as published by the
+Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along
+with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+With --fragment the host document is never parsed into a tree. Only the
+root tag and the sodipodi:namedview are read to find the current layer and
+the view centre, the effect renders into an empty layer and the serialised
+fragment is spliced into the original bytes just before the end of the
+current layer. Everything else passes through untouched.
+
+The effect itself runs on a small stand-in document with the host's
+viewport and view, so units and the view centre come out the same as with
+the whole document.
+
+Output to a file named .svgz is written compressed, and --svgzFile also
+writes a compressed copy of the output. The copy is compressed on a
+background thread while the plain output goes to Inkscape.
+"""
+import io
+import re
+import inkex
+from abag_svgz import is_svgz, SvgzWriter
+
+# A tag, or a comment, CDATA section or processing instruction to skip.
+# Quoted attribute values may contain '>'.
+_tag_re = re.compile(r'<(?:!--.*?-->|!\[CDATA\[.*?\]\]>|[?!][^>]*>|'
+                     r'(/?)([^\s/>]+)((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>)',
+                     re.S)
+_attr_re = re.compile(r'([^\s=]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+
+# Id of the stand-in layer the effect renders into
+LAYER_ID = 'abag-fragment-layer'
+
+# Prefixes the fragment is written with, the host root must declare them
+_prefixes = {
+    'xmlns': inkex.NSS['svg'],
+    'xmlns:inkscape': inkex.NSS['inkscape'],
+    'xmlns:sodipodi': inkex.NSS['sodipodi'],
+    'xmlns:xlink': inkex.NSS['xlink']
+}
+
+
+def _attrs(s):
+    return dict((m.group(1), m.group(2) if m.group(2) is not None
+                 else m.group(3)) for m in _attr_re.finditer(s))
+
+
+def _find_tag(data, name, pos=0):
+    """The first start tag called name at or after pos, or None"""
+    for m in _tag_re.finditer(data, pos):
+        if m.group(2) == name and not m.group(1):
+            return m
+    return None
+
+
+def _start_tag_with_id(data, nid):
+    """The start tag with the given id, found without scanning every tag"""
+    for quote in ('"', "'"):
+        needle = 'id=%s%s%s' % (quote, nid, quote)
+        i = data.find(needle)
+        while i != -1:
+            m = _tag_re.match(data, data.rfind('<', 0, i))
+            if m and m.group(2) and not m.group(1) and \
+                    _attrs(m.group(3)).get('id') == nid:
+                return m
+            i = data.find(needle, i + 1)
+    return None
+
+
+def _end_of(data, start):
+    """Position of the end tag closing the start tag match start"""
+    depth = 1
+    for m in _tag_re.finditer(data, start.end()):
+        if not m.group(2):
+            continue
+        if m.group(1):
+            depth -= 1
+            if not depth:
+                return m.start()
+        elif not m.group(3).rstrip().endswith('/'):
+            depth += 1
+    raise ValueError("No end tag for <%s>" % start.group(2))
+
+
+class HostDocument(object):
+    """
+    The parts of a serialised SVG document needed to append to its current
+    layer: the viewport, the view and where the new nodes go.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        root = _find_tag(data, 'svg')
+        if root is None:
+            raise ValueError("No <svg> root element")
+        rattrs = _attrs(root.group(3))
+        for key, uri in _prefixes.items():
+            if rattrs.get(key) != uri:
+                raise ValueError("Root does not declare %s" % key)
+        self.viewport = dict((k, rattrs[k]) for k in ('width', 'height',
+                                                      'viewBox') if k in rattrs)
+
+        layer = root
+        self.view = {}
+        i = data.find('<sodipodi:namedview', root.end())
+        nv = _tag_re.match(data, i) if i != -1 else None
+        if nv is not None:
+            nattrs = _attrs(nv.group(3))
+            lid = nattrs.get('inkscape:current-layer')
+            if lid:
+                layer = _start_tag_with_id(data, lid) or root
+            self.view = dict((k, nattrs[k]) for k in ('inkscape:cx',
+                                                      'inkscape:cy')
+                             if k in nattrs)
+
+        self._layer = layer
+        self.layer_tag = layer.group(2)
+        self.empty = layer.group(3).rstrip().endswith('/')
+
+    def stand_in(self):
+        """
+        An empty document with the same viewport and view as the host, and
+        a layer for the effect to render into, as bytes.
+        """
+        svg = inkex.etree.Element(inkex.addNS('svg', 'svg'), self.viewport,
+                                  nsmap={
+                                      None: inkex.NSS['svg'],
+                                      'inkscape': inkex.NSS['inkscape'],
+                                      'sodipodi': inkex.NSS['sodipodi'],
+                                      'xlink': inkex.NSS['xlink']
+                                  })
+        nv = inkex.etree.SubElement(svg, inkex.addNS('namedview', 'sodipodi'))
+        for key, val in self.view.items():
+            nv.set(inkex.addNS(key.split(':')[1], 'inkscape'), val)
+        nv.set(inkex.addNS('current-layer', 'inkscape'), LAYER_ID)
+        inkex.etree.SubElement(svg, inkex.addNS('g', 'svg'), {'id': LAYER_ID})
+        return inkex.etree.tostring(svg)
+
+    def insert(self, fragment):
+        """The host document with fragment appended to the current layer"""
+        data = self.data
+        m = self._layer
+        if not fragment:
+            return data
+        if self.empty:
+            head = data[:m.end()].rstrip('>').rstrip().rstrip('/')
+            return '%s>%s</%s>%s' % (head, fragment, self.layer_tag,
+                                     data[m.end():])
+        i = _end_of(data, m)
+        return data[:i] + fragment + data[i:]
+
+
+class FragmentEffect(inkex.EffectExtension):
+    """
+    An inkex.EffectExtension which, with --fragment, only emits the nodes it
+    creates and passes the rest of the host document through as bytes.
+
+    current_layer and view_center are set from the document before effect
+    is called.
+    """
+
+    def __init__(self):
+        super(FragmentEffect, self).__init__()
+        self.host = None
+        self.fragment = None
+        self.output_data = None
+        self.current_layer = None
+        self.view_center = (0.0, 0.0)
+
+    def add_arguments(self, pars):
+        pars.add_argument("--fragment", type=inkex.Boolean, default=False,
+            help="Append to the document without parsing it")
+        pars.add_argument("--svgzFile", type=str, default="",
+            help="Also write the document compressed to this .svgz file")
+        pars.add_argument("--svgzLevel", type=int, default=6,
+            help="Compression level of .svgz output, 1 to 9")
+
+    def load_raw(self):
+        self.host = None
+        if self.options.fragment:
+            stream = self.options.input_file
+            if isinstance(stream, str):
+                with open(stream, 'rb') as fh:
+                    data = fh.read()
+            else:
+                data = getattr(stream, 'buffer', stream).read()
+            # Bytes which are not UTF-8 still pass through unchanged
+            text = data.decode('utf-8', 'surrogateescape')
+            try:
+                self.host = HostDocument(text)
+            except ValueError:
+                # Not something we can splice into, parse it the usual way
+                self.document = self.load(io.BytesIO(data))
+            else:
+                self.document = self.load(io.BytesIO(self.host.stand_in()))
+        else:
+            super(FragmentEffect, self).load_raw()
+
+        self.current_layer = self.svg.get_current_layer()
+        center = self.svg.namedview.center
+        self.view_center = (center.x, center.y)
+
+    def save_raw(self, ret):
+        o = self.options
+        if self.host is None and not o.svgzFile and not is_svgz(o.output):
+            return super(FragmentEffect, self).save_raw(ret)
+
+        if self.host is None:
+            out = io.BytesIO()
+            self.save(out)
+            data = out.getvalue()
+        else:
+            self.fragment = self._serialize_layer()
+            self.output_data = self.host.insert(self.fragment)
+            data = self.output_data.encode('utf-8', 'surrogateescape')
+
+        with SvgzWriter(o.svgzLevel, threads=1) as writer:
+            if o.svgzFile:
+                writer.write(o.svgzFile, data)
+            if is_svgz(o.output):
+                writer.write(o.output, data)
+            elif isinstance(o.output, str):
+                with open(o.output, 'wb') as fh:
+                    fh.write(data)
+            else:
+                o.output.write(data)
+
+    def _serialize_layer(self):
+        """The serialised children of the stand in layer, no namespaces"""
+        if not len(self.current_layer):
+            return ''
+        s = inkex.etree.tostring(self.svg, encoding='unicode')
+        start = s.index('>', s.index('id="%s"' % LAYER_ID)) + 1
+        end = s.rindex('</g>')
+        return s[start:end]
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+abag_mesh.py
+3D mesh of the assembled dome, to check the flat pattern before cutting
+Copyright (C) 2014 Samuel Hodges <octerman@gmail.com>
+
+This program is free software: you can redistribute it and/or modify it
+under the terms of the GNU General Public License as published by the
+Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along
+with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Each flat piece from make_dome_data is rolled back up into the cone ring
+it was cut from: a sector of radius L and angle theta becomes a cone with
+base radius theta * L / (2 * pi). The rings are stacked from the equator
+up and the result is compared with the sphere the dome should have.
+
+Usage:
+    python abag_mesh.py --radius=10 --segments=8 --output=dome.stl
+"""
+import struct
+import sys
+from math import pi
+from optparse import OptionParser
+import numpy as np
+import abag_vec
+from abag_utils import make_dome_data
+
+# Rings of a smaller radius are taken for the apex
+_APEX = 1e-9
+
+
+def ring_profile(radius, segments):
+    """
+    The meridian of the assembled dome, rebuilt from the flat pieces.
+
+    @return (rho, z, mismatch) rho and z are the radius and height of the
+            segments + 1 ring edges from the top down, the equator is at
+            z = 0. mismatch is how much the inner edge of each piece differs
+            from the outer edge of the piece above it.
+    """
+    data, thickness = make_dome_data(radius, segments)
+    angle, length = np.array([data[i] for i in range(1, segments + 1)]).T
+
+    outer = angle * length / (2 * pi)
+    inner = angle * (length - thickness) / (2 * pi)
+    height = np.sqrt(np.maximum(thickness ** 2 - (outer - inner) ** 2, 0.0))
+
+    rho = np.concatenate(([inner[0]], outer))
+    # Heights of the ring edges counted back up from the equator
+    z = np.concatenate((np.cumsum(height[::-1])[::-1], [0.0]))
+    mismatch = np.abs(inner[1:] - outer[:-1])
+    return rho, z, mismatch
+
+
+def sphere_deviation(radius, rho, z):
+    """
+    Largest distance between the cone rings and the sphere, found from the
+    distance of each meridian segment to the centre.
+    """
+    p = np.column_stack((rho, z))
+    d = abag_vec.from_points(p[:-1], p[1:])
+    dd = abag_vec.dot(d, d)
+    dd[dd == 0] = 1.0
+    t = np.clip(-abag_vec.dot(p[:-1], d) / dd, 0.0, 1.0)
+    nearest = abag_vec.length(p[:-1] + d * t[:, None])
+    ends = abag_vec.length(p)
+    return max(np.abs(nearest - radius).max(), np.abs(ends - radius).max())
+
+
+def dome_mesh(rho, z, around=64):
+    """
+    Triangle mesh of the surface of revolution through the ring edges. A
+    first ring of no radius is the apex, one vertex joined to the next ring
+    by a fan of triangles.
+
+    @return (vertices, faces) float array (n, 3) and int array (m, 3)
+    """
+    apex = rho[0] < _APEX
+    if apex:
+        top = np.array([[0.0, 0.0, z[0]]])
+        rho = rho[1:]
+        z = z[1:]
+    rings = len(rho)
+    a = np.linspace(0, 2 * pi, around, endpoint=False)
+    vertices = np.empty((rings, around, 3))
+    vertices[:, :, 0] = rho[:, None] * np.cos(a)
+    vertices[:, :, 1] = rho[:, None] * np.sin(a)
+    vertices[:, :, 2] = z[:, None]
+
+    k, j = np.meshgrid(np.arange(rings - 1), np.arange(around),
+                       indexing='ij')
+    v00 = k * around + j
+    v01 = k * around + (j + 1) % around
+    v10 = v00 + around
+    v11 = v01 + around
+    faces = np.concatenate((
+        np.stack((v00, v11, v10), axis=-1).reshape(-1, 3),
+        np.stack((v00, v01, v11), axis=-1).reshape(-1, 3)))
+    vertices = vertices.reshape(-1, 3)
+    if apex:
+        j = np.arange(around)
+        fan = np.column_stack((np.full(around, -1), (j + 1) % around, j))
+        vertices = np.concatenate((top, vertices))
+        faces = np.concatenate((fan, faces)) + 1
+    return vertices, faces
+
+
+def write_obj(fh, vertices, faces):
+    fh.write(b"# abag-inkex dome mesh, units cm\n")
+    np.savetxt(fh, vertices, fmt='v %.6f %.6f %.6f')
+    np.savetxt(fh, faces + 1, fmt='f %d %d %d')
+
+
+def write_stl(fh, vertices, faces):
+    """Binary STL"""
+    tri = vertices[faces]
+    normals = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+    l = np.sqrt(np.einsum('ij,ij->i', normals, normals))
+    l[l == 0] = 1.0
+    normals /= l[:, None]
+
+    record = np.dtype([('normal', '<f4', (3,)), ('vertices', '<f4', (3, 3)),
+                       ('attr', '<u2')])
+    data = np.zeros(len(faces), dtype=record)
+    data['normal'] = normals
+    data['vertices'] = tri
+    fh.write(b'abag-inkex dome mesh'.ljust(80, b' '))
+    fh.write(struct.pack('<I', len(faces)))
+    fh.write(data.tobytes())
+
+WRITERS = {
+    'obj': write_obj,
+    'stl': write_stl
+}
+
+
+def main(argv=None):
+    parser = OptionParser(usage="usage: %prog [options]")
+    parser.add_option("--radius", action="store", type="float",
+        dest="radius", default=10.0, help="What is the radius")
+    parser.add_option("--segments", action="store", type="int",
+        dest="segments", default=4, help="How many segments to make the dome")
+    parser.add_option("--around", action="store", type="int",
+        dest="around", default=64, help="Vertices around each ring")
+    parser.add_option("--output", action="store", type="string",
+        dest="output", default="", help="Write a .stl or .obj mesh here")
+    o, args = parser.parse_args(argv)
+
+    rho, z, mismatch = ring_profile(o.radius, o.segments)
+    sys.stdout.write("Max deviation from sphere: %.4fcm\n" %
+                     sphere_deviation(o.radius, rho, z))
+    sys.stdout.write("Max ring edge mismatch: %.4fcm\n" %
+                     (mismatch.max() if len(mismatch) else 0.0))
+
+    if o.output:
+        vertices, faces = dome_mesh(rho, z, o.around)
+        fmt = 'obj' if o.output.lower().endswith('.obj') else 'stl'
+        with open(o.output, 'wb') as fh:
+            WRITERS[fmt](fh, vertices, faces)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+abag_model.py
+The whole bag pattern as columns of numpy arrays
+Copyright (C) 2014 Samuel Hodges <octerman@gmail.com>
+
+This program is free software: you can redistribute it and/or modify it
+under the terms of the GNU General Public License as published by the
+Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along
+with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+A PatternModel has one row per piece and one array per parameter, so
+areas, cut lengths, bounding boxes and placement are worked out for every
+piece at once. model[i] is a PieceView, a small object reading row i, which
+can build the matching DomePiece, RectPattern or seam piece when a path is
+needed.
+"""
+import re
+from math import pi
+import numpy as np
+from abag_utils import make_dome_data, make_zipper_data, circle_path, Piece,\
+                       DomePiece, DomeSeamPiece, RectPattern, RectSeamPattern
+
+CIRCLE, SECTOR, RECT = range(3)
+KINDS = ('circle', 'sector', 'rect')
+
+# Float columns, every length is in the units the model was built in
+FLOAT_COLUMNS = (
+    'outer_radius', 'inner_radius', 'angle', 'width', 'height',
+    'seam_outer', 'seam_inner', 'seam_end',
+    'seam_top', 'seam_right', 'seam_bottom', 'seam_left',
+    'x', 'y'
+)
+
+_name_re = re.compile("([a-z])([A-Z])")
+
+# Cut list fields used by each kind of piece, the rest are None
+_KIND_FIELDS = {
+    CIRCLE: ('outer_radius', 'inner_radius', 'angle', 'seam_outer'),
+    SECTOR: ('outer_radius', 'inner_radius', 'angle', 'seam_outer',
+             'seam_inner', 'seam_end'),
+    RECT: ('width', 'height', 'seam_top', 'seam_right', 'seam_bottom',
+           'seam_left'),
+}
+
+
+class PatternModel(object):
+    """
+    Struct of arrays holding every piece of a pattern. Angles are in
+    radians, x and y are the centre of circles and sectors and the start
+    corner of rectangles.
+    """
+
+    def __init__(self, size):
+        self.label = [''] * size
+        self.name = [''] * size
+        self.piece_id = np.zeros(size, dtype=np.int32)
+        self.kind = np.zeros(size, dtype=np.int8)
+        self.quantity = np.ones(size, dtype=np.int32)
+        for column in FLOAT_COLUMNS:
+            setattr(self, column, np.zeros(size))
+
+    def __len__(self):
+        return len(self.kind)
+
+    def __getitem__(self, i):
+        if not -len(self) <= i < len(self):
+            raise IndexError("piece index out of range")
+        return PieceView(self, i % len(self))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield PieceView(self, i)
+
+    @classmethod
+    def from_dimensions(cls, radius, segments, seams=1, join_w=1.0,
+                        zip_h=1.0, top_h=1.0, bottom_h=1.0,
+                        seam_allowances=None):
+        """
+        The bag pattern, zipper strips first then the dome segments, like
+        Abagpat.effect renders it. The first segment is a flat circle and
+        every other segment is a sector cut `seams` times.
+
+        @param seam_allowances dict with 'inner', 'outer', 'end' and 'other',
+                               or None for no seam allowance
+        """
+        sa = {'inner': 0, 'outer': 0, 'end': 0, 'other': 0}
+        if seam_allowances:
+            sa.update(seam_allowances)
+
+        domedata, thickness = make_dome_data(radius, segments)
+        zipdata = make_zipper_data(radius, thickness, join_w, zip_h, top_h,
+                                   bottom_h)
+        items = sorted(zipdata.items(), key=lambda kv: kv[1]['label'])
+        z = len(items)
+
+        model = cls(z + segments)
+        for i, (key, val) in enumerate(items):
+            model.label[i] = val['label']
+            model.name[i] = _name_re.sub(r'\g<1> \g<2>', key)
+        w, h = np.array([val['d'] for key, val in items], dtype=float).T
+        model.kind[:z] = RECT
+        model.width[:z] = w
+        model.height[:z] = h
+        model.seam_top[:z] = model.seam_right[:z] = sa['other']
+        model.seam_bottom[:z] = model.seam_left[:z] = sa['other']
+        # The zipper is sewn straight onto these edges
+        model.seam_bottom[model.label.index('Z1')] = 0
+        model.seam_top[model.label.index('Z2')] = 0
+
+        ids = np.arange(1, segments + 1)
+        angle, r1 = np.array([domedata[i] for i in ids.tolist()]).T
+        angle = angle / seams
+        d = slice(z, None)
+        model.label[d] = ['S%i' % i for i in ids.tolist()]
+        model.name[d] = ['Segment %i' % i for i in ids.tolist()]
+        model.piece_id[d] = ids
+        model.kind[d] = SECTOR
+        model.quantity[d] = seams
+        model.outer_radius[d] = r1
+        model.inner_radius[d] = r1 - thickness
+        model.angle[d] = angle
+        model.seam_outer[d] = sa['outer']
+        model.seam_inner[d] = sa['inner']
+        model.seam_end[d] = sa['end']
+
+        # The top cone is cut as a flat circle
+        model.kind[z] = CIRCLE
+        model.quantity[z] = 1
+        model.outer_radius[z] = (r1[0] * angle[0]) / (2 * pi)
+        model.inner_radius[z] = 0.0
+        model.angle[z] = 2 * pi
+        model.seam_inner[z] = model.seam_end[z] = 0
+        return model
+
+    def scaled(self, k):
+        """A copy with every length multiplied by k"""
+        new = PatternModel(0)
+        new.label = list(self.label)
+        new.name = list(self.name)
+        for column in ('piece_id', 'kind', 'quantity') + FLOAT_COLUMNS:
+            setattr(new, column, getattr(self, column).copy())
+        for column in FLOAT_COLUMNS:
+            if column != 'angle':
+                getattr(new, column)[:] *= k
+        return new
+
+    def mask(self, kind):
+        return self.kind == kind
+
+    @property
+    def thickness(self):
+        return np.where(self.kind == SECTOR,
+                        self.outer_radius - self.inner_radius, self.height)
+
+    def place(self, x, y):
+        """Move every piece, x and y are single numbers or arrays"""
+        self.x[:] = x
+        self.y[:] = y
+
+    def costing(self):
+        """
+        Sewn area, cut area (with the seam allowances) and length of the cut
+        line of every piece.
+
+        @return (area, cut_area, cut_length) arrays
+        """
+        r1 = self.outer_radius
+        r2 = self.inner_radius
+        angle = self.angle
+        end = self.seam_end
+        w = self.width
+        h = self.height
+
+        # Circles
+        cr = r1 + self.seam_outer
+        c_area = pi * r1 * r1
+        c_cut_area = pi * cr * cr
+        c_cut_length = 2 * pi * cr
+
+        # Sectors, the end caps are rectangles along each end
+        cr1 = r1 + self.seam_outer
+        cr2 = r2 - self.seam_inner
+        cw = cr1 - cr2
+        s_area = angle / 2 * (r1 * r1 - r2 * r2)
+        s_cut_area = angle / 2 * (cr1 * cr1 - cr2 * cr2) + 2 * end * cw
+        s_cut_length = angle * (cr1 + cr2) + 2 * cw + 4 * end
+
+        # Rectangles
+        rw = w + self.seam_left + self.seam_right
+        rh = h + self.seam_top + self.seam_bottom
+        r_area = w * h
+        r_cut_area = rw * rh
+        r_cut_length = 2 * (rw + rh)
+
+        kinds = [self.kind == CIRCLE, self.kind == SECTOR]
+        return (np.select(kinds, [c_area, s_area], r_area),
+                np.select(kinds, [c_cut_area, s_cut_area], r_cut_area),
+                np.select(kinds, [c_cut_length, s_cut_length], r_cut_length))
+
+    def fabric_area(self):
+        """Total cut area of the pattern, counting every copy of a piece"""
+        return float((self.costing()[1] * self.quantity).sum())
+
+    def bounds(self):
+        """
+        Bounding boxes of the cut outlines, (x0, y0, x1, y1) arrays. Sectors
+        are bounded by the extremes of their cut radii, with the end seams
+        added all round.
+        """
+        x = self.x
+        y = self.y
+        angle = self.angle
+        ro = self.outer_radius + self.seam_outer
+        ri = np.maximum(self.inner_radius - self.seam_inner, 0.0)
+
+        # Sector extremes: both ends of both arcs and the quarter turns the
+        # outer arc passes
+        ends = np.stack((np.zeros_like(angle), angle), axis=1)
+        px = np.concatenate((ro[:, None] * np.cos(ends),
+                             ri[:, None] * np.cos(ends)), axis=1)
+        py = np.concatenate((ro[:, None] * np.sin(ends),
+                             ri[:, None] * np.sin(ends)), axis=1)
+        quarter = np.arange(1, 4) * (pi / 2)
+        passed = quarter[None, :] < angle[:, None]
+        qx = np.where(passed, ro[:, None] * np.cos(quarter), px[:, :1])
+        qy = np.where(passed, ro[:, None] * np.sin(quarter), py[:, :1])
+        px = np.concatenate((px, qx), axis=1)
+        py = np.concatenate((py, qy), axis=1)
+        e = self.seam_end
+        s = [px.min(axis=1) - e, py.min(axis=1) - e,
+             px.max(axis=1) + e, py.max(axis=1) + e]
+
+        circle = self.kind == CIRCLE
+        rect = self.kind == RECT
+        c = [-ro, -ro, ro, ro]
+        r = [-self.seam_left, -self.seam_bottom,
+             self.width + self.seam_right, self.height + self.seam_top]
+        box = [np.select([circle, rect], [c[k], r[k]], s[k])
+               for k in range(4)]
+        return box[0] + x, box[1] + y, box[2] + x, box[3] + y
+
+    def rows(self):
+        """Yield every piece as a cut list dictionary, lengths as stored"""
+        area, cut_area, cut_length = self.costing()
+        columns = dict((c, getattr(self, c).tolist()) for c in FLOAT_COLUMNS)
+        columns['angle'] = np.degrees(self.angle).tolist()
+        area = area.tolist()
+        cut_area = cut_area.tolist()
+        cut_length = cut_length.tolist()
+        kinds = self.kind.tolist()
+        quantity = self.quantity.tolist()
+        for i in range(len(self)):
+            row = {
+                'label': self.label[i],
+                'name': self.name[i],
+                'kind': KINDS[kinds[i]],
+                'quantity': quantity[i],
+                'area': area[i],
+                'cut_area': cut_area[i],
+                'cut_length': cut_length[i]
+            }
+            for field in _KIND_FIELDS[kinds[i]]:
+                row[field] = columns[field][i]
+            yield row
+
+
+class PieceView(object):
+    """
+    One row of a PatternModel, read through attributes. Changes go straight
+    to the model's arrays.
+    """
+
+    __slots__ = ('model', 'index')
+
+    def __init__(self, model, index):
+        self.model = model
+        self.index = index
+
+    @property
+    def label(self):
+        return self.model.label[self.index]
+
+    @property
+    def name(self):
+        return self.model.name[self.index]
+
+    @property
+    def id(self):
+        return int(self.model.piece_id[self.index])
+
+    @property
+    def kind(self):
+        return KINDS[self.model.kind[self.index]]
+
+    @property
+    def quantity(self):
+        return int(self.model.quantity[self.index])
+
+    @property
+    def radius(self):
+        return self.outer_radius
+
+    @property
+    def thickness(self):
+        return self.outer_radius - self.inner_radius
+
+    @property
+    def start_loc(self):
+        return (self.x, self.y)
+
+    def set_start_loc(self, x, y):
+        self.x = x
+        self.y = y
+
+    def piece(self, seams=True):
+        """
+        The matching pattern piece: a DomePiece or DomeSeamPiece for sectors,
+        a RectPattern or RectSeamPattern for strips and a Piece holding the
+        circle's path for the top cone.
+
+        @param seams False for the plain piece without seam allowances
+        """
+        kind = self.model.kind[self.index]
+        if kind == CIRCLE:
+            r = self.outer_radius
+            if seams:
+                r += self.seam_outer
+            p = Piece(self.label, self.name)
+            p._local = circle_path(r, 0.0, 0.0)
+            p.start_loc = self.start_loc
+            return p
+        if kind == SECTOR:
+            seams = seams and dict(outer=self.seam_outer,
+                                   inner=self.seam_inner, end=self.seam_end)
+            if seams and any(seams.values()):
+                p = DomeSeamPiece(self.id, self.angle, self.outer_radius,
+                                  self.thickness, **seams)
+            else:
+                p = DomePiece(self.id, self.angle, self.outer_radius,
+                              self.thickness)
+        else:
+            seams = seams and dict(top=self.seam_top, right=self.seam_right,
+                                   bottom=self.seam_bottom,
+                                   left=self.seam_left)
+            if seams and any(seams.values()):
+                p = RectSeamPattern(self.width, self.height, self.label,
+                                    self.name, seams)
+            else:
+                p = RectPattern(self.width, self.height, self.label,
+                                self.name)
+        p.start_loc = self.start_loc
+        return p
+
+
+def _column(name):
+    def get(self):
+        return float(getattr(self.model, name)[self.index])
+
+    def set(self, value):
+        getattr(self.model, name)[self.index] = value
+    return property(get, set)
+
+for _name in FLOAT_COLUMNS:
+    setattr(PieceView, _name, _column(_name))
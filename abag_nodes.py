@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+abag_nodes.py
+Element factory for the abag-inkex extensions
+Copyright (C) 2014 Samuel Hodges <octerman@gmail.com>
+
+This program is free software: you can redistribute it and/or modify it
+under the terms of the GNU General Public License as published by the
+Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along
+with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Every tag and namespaced attribute name the extensions write is resolved
+once, when this module is imported, instead of with inkex.addNS for every
+element. Elements are made empty by the parent and given all their
+attributes in one update from a sequence of (key, value) pairs, which is
+cheaper in lxml than passing a new attribute dict for each element. Inline
+styles are formatted once for each distinct style and kept.
+"""
+import inkex
+
+SubElement = inkex.etree.SubElement
+
+PATH = inkex.addNS('path', 'svg')
+TEXT = inkex.addNS('text', 'svg')
+TSPAN = inkex.addNS('tspan', 'svg')
+TEXT_PATH = inkex.addNS('textPath', 'svg')
+DESC = inkex.addNS('desc', 'svg')
+# Groups have always been written without the svg namespace
+GROUP = 'g'
+
+LABEL = inkex.addNS('label', 'inkscape')
+ROLE = inkex.addNS('role', 'sodipodi')
+HREF = inkex.addNS('href', 'xlink')
+
+# The sodipodi arc attributes: centre, radii and angles, then the ones that
+# are the same for every arc
+ARC_KEYS = tuple(inkex.addNS(k, 'sodipodi')
+                 for k in ('cx', 'cy', 'rx', 'ry', 'start', 'end'))
+ARC_FIXED = (
+    # Ellipse sectors will be drawn open
+    (inkex.addNS('open', 'sodipodi'), 'True'),
+    (inkex.addNS('type', 'sodipodi'), 'arc'),
+    ('transform', '')
+)
+
+_styles = {}
+_STYLE_CACHE_SIZE = 256
+
+
+def style(values):
+    """The inline style attribute for a dict of style properties"""
+    key = tuple(values.items())
+    s = _styles.get(key)
+    if s is None:
+        if len(_styles) >= _STYLE_CACHE_SIZE:
+            _styles.clear()
+        s = _styles[key] = str(inkex.Style(values))
+    return s
+
+
+def node(parent, tag, attrs=(), text=None):
+    """
+    Append an element to parent.
+
+    @param attrs Sequence of (key, value) pairs or a dict, keys from this
+                 module for namespaced attributes
+    """
+    el = SubElement(parent, tag)
+    if attrs:
+        el.attrib.update(attrs)
+    if text is not None:
+        el.text = text
+    return el
+
+
+def path(parent, d, style_attr, label=None, nid=None):
+    """A path with formatted data d and an already formatted style"""
+    attrs = [('style', style_attr), ('d', d)]
+    if label is not None:
+        attrs.append((LABEL, label))
+    if nid is not None:
+        attrs.append(('id', nid))
+    return node(parent, PATH, attrs)
+
+
+def arc_items(rx, ry, cx, cy, start_end, d=None, sodipodi=True):
+    """
+    The attributes of an elliptical arc path after its style, see
+    abag_utils.arc_attrs.
+    """
+    items = []
+    if d is not None:
+        items.append(('d', d))
+    if sodipodi:
+        items.extend(zip(ARC_KEYS, (str(cx), str(cy), str(rx), str(ry),
+                                    str(start_end[0]), str(start_end[1]))))
+        items.extend(ARC_FIXED)
+    return items
+
+
+def text_path(parent, href, text, style_attr, start_offset):
+    """A text element laid along the path with id href"""
+    t = node(parent, TEXT, (('style', style_attr),))
+    node(t, TEXT_PATH, ((HREF, '#' + href), ('startOffset', start_offset)),
+         text)
+    return t
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+abag_notch.py
+Match marks (notches) along the edges that are sewn together
+Copyright (C) 2014 Samuel Hodges <octerman@gmail.com>
+
+This program is free software: you can redistribute it and/or modify it
+under the terms of the GNU General Public License as published by the
+Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along
+with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Edges come from abag_utils.arc_edge and line_edge. The notches of an edge
+are placed by arc length along the seam line (loop) it is sewn on: a loop
+made from n identical pieces with count notches per piece has a mark every
+loop / (n * (count + 1)), which includes the joins between the pieces. An
+edge gets the marks which fall inside its part of the loop, so two edges on
+the same loop always get matching marks.
+
+All the marks of a pattern are computed in one pass over numpy arrays.
+"""
+import numpy as np
+
+# Marks this close to the ends of an edge are dropped, they are corners
+EPSILON = 1e-6
+
+
+def notch_marks(edges, count):
+    """
+    Place count notches per piece along every edge.
+
+    @param edges Sequence of edge tuples
+    @param count Notches per piece on each loop, not counting the joins
+    @return (points, ends) float arrays (n, 2), the notch ticks run from
+            the points on the edges to the ends
+    """
+    if not len(edges) or count < 1:
+        return np.empty((0, 2)), np.empty((0, 2))
+    e = np.asarray(edges, dtype=float)
+    x, y, radius, angle, sign, depth, loop, repeats, offset, length = e.T
+
+    # Every mark on the loops, k * step for k in 1 .. repeats * (count + 1) - 1
+    per = (repeats * (count + 1) - 1).astype(int)
+    owner = np.repeat(np.arange(len(e)), per)
+    starts = np.cumsum(per) - per
+    k = np.arange(per.sum()) - np.repeat(starts, per) + 1
+    s = k * (loop / (repeats * (count + 1)))[owner] - offset[owner]
+
+    # Keep the marks inside each edge's part of the loop
+    keep = (s > EPSILON) & (s < length[owner] - EPSILON)
+    owner = owner[keep]
+    s = s[keep]
+
+    r = radius[owner]
+    arc = r > 0
+    a = angle[owner] + np.where(arc, s / np.where(arc, r, 1.0), 0.0)
+    c = np.cos(a)
+    sn = np.sin(a)
+    # Arcs: point on the circle, normal along the radius. Lines: point along
+    # the line, normal the direction turned by 90 degrees.
+    px = np.where(arc, x[owner] + r * c, x[owner] + s * c)
+    py = np.where(arc, y[owner] + r * sn, y[owner] + s * sn)
+    nx = np.where(arc, c, -sn) * sign[owner]
+    ny = np.where(arc, sn, c) * sign[owner]
+
+    d = depth[owner]
+    points = np.column_stack((px, py))
+    ends = np.column_stack((px + nx * d, py + ny * d))
+    return points, ends
+
+
+def tick_path(points, ends):
+    """Path data with a short line for every notch"""
+    return ''.join('M%.4f %.4fL%.4f %.4f' % tuple(row) for row in
+                   np.column_stack((points, ends)).tolist())
+
+
+def write_dxf(fh, points, scale=1.0):
+    """
+    Write the notch points as DXF POINT entities, the positions are divided
+    by scale. DXF has y up so y is flipped.
+    """
+    fh.write("0\nSECTION\n2\nENTITIES\n")
+    for x, y in (points / scale).tolist():
+        fh.write("0\nPOINT\n8\nNOTCHES\n10\n%.4f\n20\n%.4f\n30\n0.0\n" %
+                 (x, -y))
+    fh.write("0\nENDSEC\n0\nEOF\n")
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+abag_offset.py
+Seam allowance offsetting for abag-inkex pattern pieces
+Copyright (C) 2014 Samuel Hodges <octerman@gmail.com>
+
+This program is free software: you can redistribute it and/or modify it
+under the terms of the GNU General Public License as published by the
+Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along
+with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+A closed piece outline (lines and circular arcs) is grown outwards by an
+allowance given per edge. Lines move along their normal, arcs change radius
+and the corners are joined with a mitre, round or square join. All the
+geometry for a batch of outlines is computed at once with numpy, only the
+final Path commands are emitted one edge at a time.
+
+Concave corners between two lines are trimmed to the mitre point, other
+concave corners are simply bridged with a straight line.
+"""
+import math
+import numpy as np
+from abag_utils import Path
+from abag_vec import cross, normalised, perpendicular
+
+MITRE = 'mitre'
+ROUND = 'round'
+SQUARE = 'square'
+
+LINE = 0
+ARC = 1
+
+_EPS = 1e-9
+
+
+def _arc_center(x1, y1, x2, y2, r, laf, sf):
+    """
+    Centre and signed sweep of a circular SVG arc given in endpoint form.
+    The radius is scaled up if it is too small to reach the end point.
+    """
+    hx = (x1 - x2) / 2.0
+    hy = (y1 - y2) / 2.0
+    h2 = hx * hx + hy * hy
+    r = max(abs(r), math.sqrt(h2))
+    coef = math.sqrt(max(r * r - h2, 0.0) / h2) if h2 else 0.0
+    if laf == sf:
+        coef = -coef
+    cx = coef * hy + (x1 + x2) / 2.0
+    cy = -coef * hx + (y1 + y2) / 2.0
+
+    delta = math.atan2(y2 - cy, x2 - cx) - math.atan2(y1 - cy, x1 - cx)
+    if sf and delta < 0:
+        delta += 2 * math.pi
+    elif not sf and delta > 0:
+        delta -= 2 * math.pi
+    return cx, cy, r, delta
+
+
+class Outline(object):
+    """
+    A closed outline as a list of edges. Each edge is a tuple of
+    (kind, x0, y0, x1, y1, cx, cy, r, delta), the centre, radius and signed
+    sweep angle are only used by arcs.
+    """
+
+    __slots__ = ('edges',)
+
+    def __init__(self):
+        self.edges = []
+
+    def __len__(self):
+        return len(self.edges)
+
+    def line(self, x0, y0, x1, y1):
+        if abs(x1 - x0) > _EPS or abs(y1 - y0) > _EPS:
+            self.edges.append((LINE, x0, y0, x1, y1, 0.0, 0.0, 0.0, 0.0))
+
+    def arc(self, x0, y0, x1, y1, r, laf, sf):
+        cx, cy, r, delta = _arc_center(x0, y0, x1, y1, r, laf, sf)
+        self.edges.append((ARC, x0, y0, x1, y1, cx, cy, r, delta))
+
+    @classmethod
+    def from_path(cls, path):
+        """
+        Build an outline from the first subpath of a Path. Only straight
+        lines and circular arcs are supported.
+        """
+        o = cls()
+        x = y = sx = sy = 0.0
+        for cmd, args in path:
+            rel = cmd.islower()
+            c = cmd.upper()
+            ox, oy = (x, y) if rel else (0.0, 0.0)
+            if c == 'M':
+                if len(o):
+                    break
+                x, y = ox + args[0], oy + args[1]
+                sx, sy = x, y
+            elif c == 'L':
+                nx, ny = ox + args[0], oy + args[1]
+                o.line(x, y, nx, ny)
+                x, y = nx, ny
+            elif c == 'H':
+                nx = (x if rel else 0.0) + args[0]
+                o.line(x, y, nx, y)
+                x = nx
+            elif c == 'V':
+                ny = (y if rel else 0.0) + args[0]
+                o.line(x, y, x, ny)
+                y = ny
+            elif c == 'A':
+                rx, ry, xar, laf, sf, ex, ey = args
+                if abs(rx - ry) > _EPS:
+                    raise ValueError("Only circular arcs can be offset")
+                nx, ny = ox + ex, oy + ey
+                o.arc(x, y, nx, ny, rx, laf, sf)
+                x, y = nx, ny
+            elif c == 'Z':
+                o.line(x, y, sx, sy)
+                x, y = sx, sy
+            else:
+                raise ValueError("Can not offset path command '%s'" % cmd)
+        return o
+
+
+def _close(a, b):
+    return abs(a[0] - b[0]) < 1e-6 and abs(a[1] - b[1]) < 1e-6
+
+
+def offset_outlines(outlines, allowances, join=MITRE, mitre_limit=4.0):
+    """
+    Grow each outline outwards by its allowances.
+
+    @param outlines List of Outline objects
+    @param allowances One value per outline, either a number for all edges
+                      or a sequence with one value per edge, none negative
+    @param join MITRE, ROUND or SQUARE
+    @param mitre_limit Longest mitre, as a multiple of the allowance, before
+                       falling back to a bevel
+    @return List of Path objects, one for each outline
+    """
+    counts = [len(o) for o in outlines]
+    if not sum(counts):
+        return [Path() for o in outlines]
+
+    e = np.array([edge for o in outlines for edge in o.edges], dtype=float)
+    d = np.concatenate([np.broadcast_to(np.asarray(a, dtype=float), (n,))
+                        for a, n in zip(allowances, counts)])
+    if np.any(d < 0):
+        raise ValueError("Seam allowances can not be negative")
+    owner = np.repeat(np.arange(len(outlines)), counts)
+    first = np.repeat(np.cumsum([0] + counts[:-1]), counts)
+    idx = np.arange(len(e))
+    nxt = np.where(idx + 1 < first + np.repeat(counts, counts), idx + 1,
+                   first)
+
+    is_arc = e[:, 0] == ARC
+    p0 = e[:, 1:3]
+    p1 = e[:, 3:5]
+    c = e[:, 5:7]
+    r = e[:, 7]
+    delta = e[:, 8]
+    s = np.where(delta < 0, -1.0, 1.0)
+
+    # Orientation of each outline from its signed area, arcs add the area
+    # between their chord and the curve.
+    area = np.where(is_arc,
+                    c[:, 0] * (p1[:, 1] - p0[:, 1]) -
+                    c[:, 1] * (p1[:, 0] - p0[:, 0]) + r * r * delta,
+                    p0[:, 0] * p1[:, 1] - p1[:, 0] * p0[:, 1])
+    orient = np.where(np.bincount(owner, area, len(outlines)) < 0, -1.0, 1.0)
+    orient = orient[owner]
+
+    # Tangents and outward normals at both ends of every edge
+    safe_r = np.where(r > 0, r, 1.0)[:, None]
+    u0 = (p0 - c) / safe_r
+    u1 = (p1 - c) / safe_r
+    tl = normalised(p1 - p0)
+    t0 = np.where(is_arc[:, None], s[:, None] * perpendicular(u0), tl)
+    t1 = np.where(is_arc[:, None], s[:, None] * perpendicular(u1), tl)
+    n0 = -orient[:, None] * perpendicular(t0)
+    n1 = -orient[:, None] * perpendicular(t1)
+
+    q0 = p0 + n0 * d[:, None]
+    q1 = p1 + n1 * d[:, None]
+    qr = r + orient * s * d
+
+    # Joins between the end of each edge and the start of the next one
+    ti = t1
+    tj = t0[nxt]
+    a_end = q1
+    b_start = q0[nxt]
+    turn = cross(ti, tj)
+    parallel = np.abs(turn) < _EPS
+    safe_turn = np.where(parallel, 1.0, turn)
+    k = cross(b_start - a_end, tj) / safe_turn
+    mitre = a_end + ti * k[:, None]
+    concave = (turn * orient < 0) & ~parallel
+    reach = np.hypot(*(mitre - p1).T)
+    too_long = reach > mitre_limit * np.maximum(d, d[nxt]) + _EPS
+
+    # Lines are trimmed or extended to meet at the mitre point, arcs keep
+    # their end points and are bridged to it with a short line.
+    both_lines = ~is_arc & ~is_arc[nxt]
+    use_mitre = ~too_long & ~parallel & np.where(concave, both_lines,
+                                                 join == MITRE)
+    move_end = use_mitre & ~is_arc
+    move_start = use_mitre & ~is_arc[nxt]
+    q1 = np.where(move_end[:, None], mitre, q1)
+    q0[nxt[move_start]] = mitre[move_start]
+
+    dj = (d + d[nxt]) / 2.0
+    sq_a = a_end + ti * d[:, None]
+    sq_b = b_start - tj * d[nxt][:, None]
+
+    # Plain floats keep the emitted path data short
+    q0 = q0.tolist()
+    q1 = q1.tolist()
+    qr = qr.tolist()
+    mitre = mitre.tolist()
+    sq_a = sq_a.tolist()
+    sq_b = sq_b.tolist()
+    dj = dj.tolist()
+    nxt = nxt.tolist()
+    large = (np.abs(delta) > math.pi).tolist()
+    sweep = (s > 0).tolist()
+    is_arc = is_arc.tolist()
+    use_mitre = use_mitre.tolist()
+    concave = concave.tolist()
+    left = (turn > 0).tolist()
+
+    paths = []
+    start = 0
+    for n in counts:
+        p = Path()
+        paths.append(p)
+        if not n:
+            continue
+        last = q0[start]
+        p.M(*last)
+        for i in range(start, start + n):
+            j = nxt[i]
+            if is_arc[i]:
+                p.A(qr[i], qr[i], 0, int(large[i]), int(sweep[i]), *q1[i])
+            elif not _close(q1[i], last) and not (j == start and
+                                                  _close(q1[i], q0[j])):
+                p.L(*q1[i])
+            last = q1[i]
+
+            if use_mitre[i]:
+                pts = [mitre[i]]
+            elif concave[i]:
+                pts = []
+            elif join == SQUARE:
+                pts = [sq_a[i], sq_b[i]]
+            elif join == ROUND and not _close(q0[j], last):
+                p.A(dj[i], dj[i], 0, 0, int(left[i]), *q0[j])
+                last = q0[j]
+                pts = []
+            else:
+                pts = []
+            pts.append(q0[j])
+            for pt in pts:
+                if j == start and _close(pt, q0[j]):
+                    break
+                if not _close(pt, last):
+                    p.L(*pt)
+                    last = pt
+        p.Z()
+        start += n
+    return paths
+
+
+def offset_path(path, allowance, join=MITRE, mitre_limit=4.0):
+    """
+    Grow a closed Path outwards by allowance, a number or one value per edge
+    """
+    outline = Outline.from_path(path)
+    return offset_outlines([outline], [allowance], join, mitre_limit)[0]
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+abag_optimize.py
+Search the segment, seam and seam allowance choices of a bag pattern
+Copyright (C) 2014 Samuel Hodges <octerman@gmail.com>
+
+This program is free software: you can redistribute it and/or modify it
+under the terms of the GNU General Public License as published by the
+Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along
+with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Every candidate pattern is scored on three things, all of them smaller is
+better:
+
+    fabric     cm^2 of a fabric roll of the given width used by the pieces
+    deviation  largest distance in cm of the sewn dome from the sphere
+    pieces     number of pieces to cut and sew
+
+The fabric is estimated by packing the bounding boxes of every copy of the
+pieces onto the roll in shelves, tallest first, without drawing anything.
+A piece is laid lengthways along the roll when it is wider than the roll.
+The deviation only depends on the segment count and grows with the radius,
+it is worked out once per segment count for a radius of 1.
+
+The candidates of one radius and segment count are scored together, those
+jobs are spread over --workers processes. The result is the Pareto front of
+every radius: the candidates no other candidate of that radius beats on one
+score without losing on another.
+
+Usage:
+    python abag_optimize.py --radius=20 --segmentRange=3,24 --maxSeams=4
+    python abag_optimize.py --radii=10,15,20,25 --seamAllowances=0.5,1 \\
+        --fabricWidth=140 --workers=4
+"""
+import json
+import sys
+from itertools import product
+from optparse import OptionParser
+import numpy as np
+from abag_cutlist import add_pattern_options, seam_allowances
+from abag_mesh import ring_profile, sphere_deviation
+from abag_model import PatternModel
+
+# Width of a fabric roll in cm
+FABRIC_WIDTH = 150.0
+# Gap in cm left between pieces on the fabric
+GAP = 1.0
+# Scores in the order they are compared
+SCORES = ('fabric', 'deviation', 'pieces')
+
+_deviations = {}
+
+
+def unit_deviation(segments):
+    """Sphere deviation of a dome of radius 1"""
+    d = _deviations.get(segments)
+    if d is None:
+        rho, z, mismatch = ring_profile(1.0, segments)
+        d = _deviations[segments] = float(sphere_deviation(1.0, rho, z))
+    return d
+
+
+def fabric_length(model, width=FABRIC_WIDTH, gap=GAP):
+    """
+    Length of fabric of the given width used by every copy of the pieces,
+    packed in shelves tallest first.
+
+    @return length in cm, inf when a piece does not fit the width either way
+    """
+    model.place(0.0, 0.0)
+    x0, y0, x1, y1 = model.bounds()
+    w = x1 - x0
+    h = y1 - y0
+    # Lie the pieces flat, the long side across the roll when it fits
+    long_side = np.maximum(w, h)
+    short_side = np.minimum(w, h)
+    across = long_side <= width
+    w = np.where(across, long_side, short_side)
+    h = np.where(across, short_side, long_side)
+    if np.any(w > width):
+        return float('inf')
+
+    order = np.argsort(-h, kind='stable')
+    counts = model.quantity[order].tolist()
+    w = w[order].tolist()
+    h = h[order].tolist()
+    # Shelves as [space left, height], a shelf is as tall as its first piece
+    shelves = []
+    for i in range(len(w)):
+        for n in range(counts[i]):
+            for shelf in shelves:
+                if shelf[0] >= w[i]:
+                    shelf[0] -= w[i] + gap
+                    break
+            else:
+                shelves.append([width - w[i] - gap, h[i]])
+    if not shelves:
+        return 0.0
+    return sum(s[1] for s in shelves) + gap * (len(shelves) - 1)
+
+
+def evaluate(job):
+    """
+    Score the candidates of one radius and segment count.
+
+    @param job (radius, segments, seam counts, seam allowance dicts, zipper
+               options (join_w, zip_h, top_h, bottom_h), fabric width)
+    @return list of candidate dicts
+    """
+    radius, segments, seam_counts, allowances, zipper, width = job
+    deviation = radius * unit_deviation(segments)
+    results = []
+    for seams, sa in product(seam_counts, allowances):
+        model = PatternModel.from_dimensions(radius, segments, seams, *zipper,
+                                             seam_allowances=sa)
+        length = fabric_length(model, width)
+        results.append({
+            'radius': radius,
+            'segments': segments,
+            'seams': seams,
+            'seamAllowances': sa,
+            'fabric': length * width,
+            'length': length,
+            'cutArea': model.fabric_area(),
+            'deviation': deviation,
+            'pieces': int(model.quantity.sum())
+        })
+    return results
+
+
+def pareto_front(scores):
+    """
+    Mask of the rows of scores no other row dominates, a row dominates
+    another when it is no worse on every column and better on one.
+
+    Rows are taken in lexicographic order, a row can only be dominated by
+    one before it and then also by one on the front, so each row is only
+    compared with the front found so far.
+
+    @param scores (n, k) array, smaller is better
+    """
+    scores = np.asarray(scores, dtype=float)
+    n = len(scores)
+    front = np.zeros(n, dtype=bool)
+    kept = np.empty_like(scores)
+    count = 0
+    for i in np.lexsort(scores.T[::-1]).tolist():
+        row = scores[i]
+        if count:
+            k = kept[:count]
+            if np.any(np.all(k <= row, axis=1) & np.any(k < row, axis=1)):
+                continue
+        kept[count] = row
+        count += 1
+        front[i] = True
+    return front
+
+
+def _map(func, jobs, workers):
+    """func over jobs in order, over worker processes when there are enough"""
+    if workers < 2 or len(jobs) < 2 * workers:
+        return [func(job) for job in jobs]
+    import multiprocessing
+    pool = multiprocessing.Pool(workers)
+    try:
+        return pool.map(func, jobs, max(1, len(jobs) // (workers * 4)))
+    finally:
+        pool.close()
+        pool.join()
+
+
+def optimize(radii, segment_counts, seam_counts=(1, 2, 3, 4),
+             allowances=(None,), join_w=1.0, zip_h=1.0, top_h=1.0,
+             bottom_h=1.0, width=FABRIC_WIDTH, workers=0):
+    """
+    Score every combination of segment count, seam count and seam allowances
+    for each radius.
+
+    @param allowances seam allowance dicts as for
+                      PatternModel.from_dimensions, None for none
+    @return dict of radius: (front, candidates), front the Pareto front
+            sorted by fabric, candidates every candidate that fits the
+            fabric
+    """
+    zipper = (join_w, zip_h, top_h, bottom_h)
+    jobs = [(float(r), int(s), tuple(seam_counts), tuple(allowances), zipper,
+             width) for r, s in product(radii, segment_counts)]
+    found = {}
+    for results in _map(evaluate, jobs, workers):
+        for c in results:
+            found.setdefault(c['radius'], []).append(c)
+
+    fronts = {}
+    for radius, candidates in found.items():
+        candidates = [c for c in candidates if c['fabric'] < float('inf')]
+        scores = [[c[k] for k in SCORES] for c in candidates]
+        mask = pareto_front(scores).tolist() if candidates else []
+        front = [c for c, keep in zip(candidates, mask) if keep]
+        front.sort(key=lambda c: [c[k] for k in SCORES])
+        fronts[radius] = (front, candidates)
+    return fronts
+
+
+def _list(kind, text):
+    return [kind(v) for v in text.split(',') if v.strip()]
+
+
+def main(argv=None):
+    parser = OptionParser(usage="usage: %prog [options]")
+    add_pattern_options(parser, (
+        ("--radii", "string", "radii", "",
+            "Comma separated radii of a size run, --radius if empty"),
+        ("--segmentRange", "string", "segmentRange", "3,24",
+            "First and last segment count to try"),
+        ("--maxSeams", "int", "maxSeams", 4,
+            "Try 1 up to this many seams per segment"),
+        ("--seamAllowances", "string", "seamAllowances", "",
+            "Comma separated seam allowances to try on every edge, the "
+            "seam allowance options if empty"),
+        ("--fabricWidth", "float", "fabricWidth", FABRIC_WIDTH,
+            "Width of the fabric roll in cm"),
+        ("--workers", "int", "workers", 0,
+            "Processes scoring the candidates, 0 for this one"),
+        ("--output", "string", "output", "-",
+            "JSON file for the fronts, - for a table on stdout")
+    ))
+    o, args = parser.parse_args(argv)
+
+    first, last = (_list(int, o.segmentRange) * 2)[:2]
+    if o.seamAllowances:
+        allowances = [dict.fromkeys(('inner', 'outer', 'end', 'other'), s)
+                      for s in _list(float, o.seamAllowances)]
+    else:
+        allowances = [seam_allowances(o)]
+    fronts = optimize(_list(float, o.radii) or [o.radius],
+                      range(max(2, first), last + 1),
+                      range(1, max(1, o.maxSeams) + 1), allowances,
+                      o.zipperStrapJoin, o.zipperHeight, o.zipperTop,
+                      o.zipperBottom, o.fabricWidth, o.workers)
+
+    if o.output != '-':
+        with open(o.output, 'w') as fh:
+            json.dump([{'radius': r, 'front': fronts[r][0],
+                        'candidates': len(fronts[r][1])}
+                       for r in sorted(fronts)], fh, indent=2,
+                      sort_keys=True)
+        return 0
+    for radius in sorted(fronts):
+        front, candidates = fronts[radius]
+        sys.stdout.write("radius %gcm: %i of %i candidates on the front\n" %
+                         (radius, len(front), len(candidates)))
+        sys.stdout.write("%9s %6s %8s %10s %10s %7s\n" % (
+            'segments', 'seams', 'seam', 'fabric m', 'deviation', 'pieces'))
+        for c in front:
+            sys.stdout.write("%9i %6i %8g %10.3f %10.3f %7i\n" % (
+                c['segments'], c['seams'],
+                max(c['seamAllowances'].values()),
+                c['length'] / 100.0, c['deviation'], c['pieces']))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+abag_profile.py
+Gore data for domes of any profile, not only hemispheres
+Copyright (C) 2014 Samuel Hodges <octerman@gmail.com>
+
+This program is free software: you can redistribute it and/or modify it
+under the terms of the GNU General Public License as published by the
+Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along
+with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+A profile is the meridian of the dome from the top (on the axis) down to
+the rim, as radius from the axis and height. It is either a function
+mapping an array of t in [0, 1] to the arrays (rho, z), or a sequence of
+sampled (rho, z) points.
+
+The profile is divided into rings of equal slant width and every ring is
+replaced by the cone through its two edges. For a ring from radius rho1 to
+rho2 with slant width w the cone's slant length to the outer edge is
+rho2 * w / (rho2 - rho1), which is the radius of the flat piece, and the
+piece sweeps 2 * pi * (rho2 - rho1) / w radians.
+"""
+from math import pi
+import numpy as np
+
+# Samples of an analytic profile used to integrate its arc length
+SAMPLES = 4096
+
+
+def ellipsoid(a, c):
+    """
+    Profile of a spheroid dome.
+
+    @param a Radius at the rim
+    @param c Height of the dome, a for a hemisphere
+    """
+    def profile(t):
+        t = np.asarray(t) * (pi / 2)
+        return a * np.sin(t), c * np.cos(t)
+    return profile
+
+
+def arc_length(rho, z):
+    """Arc length of the polyline through the points, from the first"""
+    s = np.empty(len(rho))
+    s[0] = 0.0
+    np.cumsum(np.hypot(np.diff(rho), np.diff(z)), out=s[1:])
+    return s
+
+
+def ring_edges(profile, segments, samples=SAMPLES):
+    """
+    Radius and height of the segments + 1 ring edges, evenly spaced along
+    the profile from the top.
+    """
+    if callable(profile):
+        t = np.linspace(0.0, 1.0, samples)
+        s = arc_length(*profile(t))
+        # Invert s(t) and put the edges on the exact curve
+        at = np.interp(np.linspace(0.0, s[-1], segments + 1), s, t)
+        rho, z = profile(at)
+        return np.asarray(rho, dtype=float), np.asarray(z, dtype=float)
+
+    rho, z = np.asarray(profile, dtype=float).reshape(-1, 2).T
+    s = arc_length(rho, z)
+    at = np.linspace(0.0, s[-1], segments + 1)
+    return np.interp(at, s, rho), np.interp(at, s, z)
+
+
+def gore_data(rho, z):
+    """
+    The flat pieces for the cone rings between consecutive edges.
+
+    @return data A dictionary of <segment number>: (angle, radius, thickness)
+            ready for DomePiece
+    """
+    dr = np.diff(rho)
+    width = np.hypot(dr, np.diff(z))
+    if np.any(dr <= 0):
+        raise ValueError("The profile must widen from the top to the rim")
+    angle = 2 * pi * dr / width
+    radius = rho[1:] * width / dr
+    return dict(zip(range(1, len(dr) + 1),
+                    zip(angle.tolist(), radius.tolist(), width.tolist())))
+
+
+def make_profile_data(profile, segments, samples=SAMPLES):
+    """
+    Calculate the angles and radiei of the flat pieces for any profile.
+
+    @param profile Function of t or sequence of (rho, z) points, in cm
+    @param segments Number of segments(resolution) to divide the dome into
+
+    @return data A dictionary of <segment number>: (angle, radius, thickness)
+    """
+    return gore_data(*ring_edges(profile, segments, samples))
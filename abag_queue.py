@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+abag_queue.py
+Catalogue rendering shared between machines through a job folder
+Copyright (C) 2014 Samuel Hodges <octerman@gmail.com>
+
+This program is free software: you can redistribute it and/or modify it
+under the terms of the GNU General Public License as published by the
+Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along
+with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+The queue is a folder every worker can see, a network share for workers on
+several machines. Nothing but the file system is shared:
+
+    jobs/<id>.json     the pattern options of a job, id is their archive key
+    locks/<id>.lock    held by the worker rendering the job
+    errors/<id>.<n>    one file for every failed or stalled attempt
+    done/<id>.json     written when the job's output is in place
+    failed/<id>.json   the job gave up after too many attempts
+    objects/<sha256>   the rendered SVG files, named by their content
+
+A worker claims a job by creating its lock file with O_EXCL, only one
+worker can do that. While it renders it touches the lock every few seconds,
+up to the render timeout. A lock left untouched for longer than the stall
+time belongs to a worker that died, or to a render that hung past its
+timeout. Another worker then renames the lock away, which again
+only one worker can do, counts the attempt as an error and claims the job.
+Files are written under a temporary name and renamed into place, so a
+reader never sees half a file. Outputs named by their content can be
+written by two workers without harm. The clocks of the machines have to
+agree to well within the stall time.
+
+Usage:
+    python abag_queue.py submit --queue=q --radii=10,20 --segmentCounts=4,8
+    python abag_queue.py work --queue=q
+    python abag_queue.py status --queue=q
+    python abag_queue.py archive --queue=q --output=catalogue.abag
+"""
+import errno
+import hashlib
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+import traceback
+from itertools import product
+from optparse import OptionParser
+from abag_archive import ArchiveWriter, pattern_key, pattern_params,\
+                         render_pattern, PARAMS
+from abag_cutlist import add_pattern_options
+
+FOLDERS = ('jobs', 'locks', 'errors', 'done', 'failed', 'objects')
+
+# Seconds without a touch before a lock counts as stalled
+STALL = 60.0
+# Attempts before a job is given up
+RETRIES = 3
+# Seconds between looks at the queue while other workers hold all jobs
+POLL = 1.0
+# Seconds a render may take before its lock is left to go stale
+TIMEOUT = 600.0
+
+
+def _path(queue, folder, name=''):
+    return os.path.join(queue, folder, name)
+
+
+def _write(path, data):
+    """Write data to path in one step, readers see the old file or this one"""
+    tmp = '%s.%s.%i.tmp' % (path, socket.gethostname(), os.getpid())
+    with open(tmp, 'wb') as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+
+def _read_json(path):
+    with open(path, 'rb') as fh:
+        return json.loads(fh.read().decode('utf-8'))
+
+
+def make_queue(queue):
+    for folder in FOLDERS:
+        try:
+            os.makedirs(_path(queue, folder))
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+
+def submit(queue, param_sets):
+    """
+    Add a job for every set of pattern options, jobs already in the queue
+    are left as they are.
+
+    @return list of the job ids
+    """
+    make_queue(queue)
+    ids = []
+    for params in param_sets:
+        params = pattern_params(params)
+        job = pattern_key(params).hex()
+        path = _path(queue, 'jobs', job + '.json')
+        if not os.path.exists(path):
+            _write(path, json.dumps(params, sort_keys=True).encode('utf-8'))
+        ids.append(job)
+    return ids
+
+
+def store(queue, data):
+    """Put data in the object store, returns its name there"""
+    name = hashlib.sha256(data).hexdigest() + '.svg'
+    path = _path(queue, 'objects', name)
+    if not os.path.exists(path):
+        _write(path, data)
+    return name
+
+
+def errors(queue, job):
+    prefix = job + '.'
+    return sorted(f for f in os.listdir(_path(queue, 'errors'))
+                  if f.startswith(prefix))
+
+
+def _finished(queue, job):
+    return os.path.exists(_path(queue, 'done', job + '.json')) or \
+        os.path.exists(_path(queue, 'failed', job + '.json'))
+
+
+class Worker(object):
+    """
+    Renders jobs from the queue until every job is done or failed.
+
+    @param render function of the pattern options returning the SVG bytes
+    @param timeout Seconds after which a render counts as hung, its lock is
+                   no longer touched and another worker takes the job over
+                   once the lock has stalled
+    """
+
+    def __init__(self, queue, render=render_pattern, stall=STALL,
+                 retries=RETRIES, poll=POLL, timeout=TIMEOUT):
+        self.queue = queue
+        self.render = render
+        self.stall = stall
+        self.retries = retries
+        self.poll = poll
+        self.timeout = timeout
+        self.name = '%s.%i' % (socket.gethostname(), os.getpid())
+        self.rendered = []
+
+    def run(self):
+        """Work the queue, returns the ids of the jobs this worker rendered"""
+        make_queue(self.queue)
+        while True:
+            pending = self.pending()
+            if not pending:
+                return self.rendered
+            # Workers start on different jobs and rarely race for a lock
+            random.shuffle(pending)
+            claimed = False
+            for job in pending:
+                if self.attempt(job):
+                    claimed = True
+            if not claimed:
+                time.sleep(self.poll)
+
+    def pending(self):
+        """Jobs neither done nor given up"""
+        finished = set(f[:-5] for folder in ('done', 'failed')
+                       for f in os.listdir(_path(self.queue, folder)))
+        return [f[:-5] for f in os.listdir(_path(self.queue, 'jobs'))
+                if f.endswith('.json') and f[:-5] not in finished]
+
+    def attempt(self, job):
+        """Claim and render the job, False when it could not be claimed"""
+        lock = self.claim(job)
+        if lock is None:
+            return False
+        try:
+            if _finished(self.queue, job):
+                return True
+            if len(errors(self.queue, job)) >= self.retries:
+                self.give_up(job)
+                return True
+            self.render_job(job, lock)
+        finally:
+            self.release(lock)
+        return True
+
+    def claim(self, job):
+        """Create the job's lock, breaking a stalled one, or return None"""
+        lock = _path(self.queue, 'locks', job + '.lock')
+        for i in range(2):
+            try:
+                fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+                if i or not self.break_stalled(job, lock):
+                    return None
+                continue
+            token = '%s %r' % (self.name, time.time())
+            os.write(fd, token.encode('utf-8'))
+            os.close(fd)
+            return lock, token
+        return None
+
+    def break_stalled(self, job, lock):
+        """
+        Move a stalled lock out of the way, True when the job can be claimed
+        again. Another worker can break the same lock and claim the job
+        between the look at the lock and the move, the moved lock is then
+        checked to be the one looked at and put back when it is not.
+        """
+        try:
+            mtime = os.stat(lock).st_mtime
+            with open(lock, 'rb') as fh:
+                owner = fh.read().decode('utf-8', 'replace')
+        except OSError:
+            # Released since, try again
+            return True
+        age = time.time() - mtime
+        if age < self.stall:
+            return False
+        stale = '%s.%s.stale' % (lock, self.name)
+        try:
+            os.rename(lock, stale)
+        except OSError:
+            # Another worker broke it first
+            return False
+        with open(stale, 'rb') as fh:
+            moved = fh.read().decode('utf-8', 'replace')
+        if moved != owner or os.stat(stale).st_mtime != mtime:
+            # A live lock taken since, give it back
+            os.rename(stale, lock)
+            return False
+        os.remove(stale)
+        self.record_error(job, 'stalled: lock of %s untouched for %.1fs\n' %
+                          (owner, age))
+        return True
+
+    def release(self, claimed):
+        lock, token = claimed
+        try:
+            with open(lock, 'rb') as fh:
+                mine = fh.read().decode('utf-8', 'replace') == token
+            if mine:
+                os.remove(lock)
+        except OSError:
+            pass
+
+    def render_job(self, job, claimed):
+        lock, token = claimed
+        params = _read_json(_path(self.queue, 'jobs', job + '.json'))
+        stop = threading.Event()
+        start = time.time()
+        beat = threading.Thread(target=self._heartbeat,
+                                args=(lock, stop, start + self.timeout))
+        beat.daemon = True
+        beat.start()
+        try:
+            data = self.render(params)
+            name = store(self.queue, data)
+        except Exception:
+            self.record_error(job, traceback.format_exc())
+            return
+        finally:
+            stop.set()
+            beat.join()
+        _write(_path(self.queue, 'done', job + '.json'), json.dumps({
+            'params': params, 'object': name, 'bytes': len(data),
+            'worker': self.name, 'seconds': round(time.time() - start, 4)
+        }, sort_keys=True).encode('utf-8'))
+        self.rendered.append(job)
+
+    def _heartbeat(self, lock, stop, deadline):
+        while not stop.wait(self.stall / 4):
+            if time.time() > deadline:
+                # Hung, let the lock stall so another worker retries the job
+                return
+            try:
+                os.utime(lock, None)
+            except OSError:
+                return
+
+    def record_error(self, job, text):
+        n = len(errors(self.queue, job))
+        path = _path(self.queue, 'errors', '%s.%i' % (job, n))
+        # Two workers can count the same n, the second one goes after it
+        while True:
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+                n += 1
+                path = _path(self.queue, 'errors', '%s.%i' % (job, n))
+        os.write(fd, ('%s\n%s' % (self.name, text)).encode('utf-8'))
+        os.close(fd)
+
+    def give_up(self, job):
+        _write(_path(self.queue, 'failed', job + '.json'), json.dumps({
+            'params': _read_json(_path(self.queue, 'jobs', job + '.json')),
+            'errors': errors(self.queue, job)
+        }, sort_keys=True).encode('utf-8'))
+
+
+def status(queue):
+    """Number of jobs in the queue, running, done and failed"""
+    def count(folder):
+        return len([f for f in os.listdir(_path(queue, folder))
+                    if f.endswith(('.json', '.lock'))])
+    return dict((k, count(folder)) for k, folder in (
+        ('jobs', 'jobs'), ('running', 'locks'), ('done', 'done'),
+        ('failed', 'failed')))
+
+
+def outputs(queue):
+    """Yield (pattern options, SVG bytes) of every done job"""
+    for f in sorted(os.listdir(_path(queue, 'done'))):
+        if not f.endswith('.json'):
+            continue
+        done = _read_json(_path(queue, 'done', f))
+        with open(_path(queue, 'objects', done['object']), 'rb') as fh:
+            yield done['params'], fh.read()
+
+
+def write_archive(queue, filename, level=6):
+    """Collect the outputs of the queue into an abag_archive file"""
+    with ArchiveWriter(filename, level) as writer:
+        for params, data in outputs(queue):
+            writer.add(params, data)
+        return len(writer)
+
+
+def _list(kind, text):
+    return [kind(v) for v in text.split(',') if v.strip()]
+
+
+def main(argv=None):
+    parser = OptionParser(
+        usage="usage: %prog submit|work|status|archive [options]")
+    add_pattern_options(parser, (
+        ("--queue", "string", "queue", "queue", "The shared queue folder"),
+        ("--radii", "string", "radii", "",
+            "Comma separated radii to submit, --radius if empty"),
+        ("--segmentCounts", "string", "segmentCounts", "",
+            "Comma separated segment counts, --segments if empty"),
+        ("--seamCounts", "string", "seamCounts", "",
+            "Comma separated seams per segment, --seams if empty"),
+        ("--zipperHeights", "string", "zipperHeights", "",
+            "Comma separated zipper heights, --zipperHeight if empty"),
+        ("--stall", "float", "stall", STALL,
+            "Seconds before an untouched lock is broken"),
+        ("--retries", "int", "retries", RETRIES,
+            "Attempts before a job is given up"),
+        ("--timeout", "float", "timeout", TIMEOUT,
+            "Seconds before a render counts as hung"),
+        ("--output", "string", "output", "catalogue.abag",
+            "Archive written by archive")
+    ))
+    o, args = parser.parse_args(argv)
+    if len(args) != 1 or args[0] not in ('submit', 'work', 'status',
+                                         'archive'):
+        parser.error("expected one of submit, work, status or archive")
+    command = args[0]
+
+    if command == 'submit':
+        params = dict((dest, getattr(o, dest))
+                      for dest, kind, default in PARAMS)
+        variants = product(_list(float, o.radii) or [o.radius],
+                           _list(int, o.segmentCounts) or [o.segments],
+                           _list(int, o.seamCounts) or [o.seams],
+                           _list(float, o.zipperHeights) or [o.zipperHeight])
+        ids = submit(o.queue, (
+            dict(params, radius=r, segments=s, seams=n, zipperHeight=z)
+            for r, s, n, z in variants))
+        sys.stdout.write("%i jobs\n" % len(ids))
+    elif command == 'work':
+        done = Worker(o.queue, stall=o.stall, retries=o.retries,
+                      timeout=o.timeout).run()
+        sys.stdout.write("%i jobs rendered\n" % len(done))
+    elif command == 'status':
+        sys.stdout.write(json.dumps(status(o.queue), sort_keys=True) + '\n')
+    else:
+        sys.stdout.write("%i patterns\n" % write_archive(o.queue, o.output))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
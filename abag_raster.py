@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+abag_raster.py
+Anti-aliased PNG thumbnails of the bag pattern, without an SVG renderer
+Copyright (C) 2014 Samuel Hodges <octerman@gmail.com>
+
+This program is free software: you can redistribute it and/or modify it
+under the terms of the GNU General Public License as published by the
+Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along
+with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+The pieces are laid out as for the printed pages, their outlines are read
+back from the pattern pieces and the arcs are flattened into short lines.
+Every line is crossed with the scanlines it spans in one numpy pass, the
+crossings are sorted and paired up into spans (even-odd rule) and the
+spans are added into the image with their exact horizontal coverage. Each
+pixel row is sampled by SUBSAMPLES scanlines, which gives the vertical
+anti-aliasing. The cut outlines are filled first and the sewing outlines
+on top, so the seam allowances show as a band around every piece.
+
+Usage:
+    python abag_raster.py --radius=30 --segments=8 --size=256 --output=a.png
+"""
+import struct
+import zlib
+from math import ceil
+from optparse import OptionParser
+import numpy as np
+from abag_offset import Outline, ARC
+from abag_model import PatternModel
+from abag_cutlist import add_pattern_options, seam_allowances
+from abag_tile import shelf_layout
+
+# Largest distance between an arc and its flattened lines, in pixels
+TOLERANCE = 0.2
+# Scanlines per pixel row
+SUBSAMPLES = 4
+# Empty border around the pattern, in pixels
+MARGIN = 2
+
+BACKGROUND = (255, 255, 255)
+CUT_COLOUR = (200, 200, 200)
+PIECE_COLOUR = (70, 110, 160)
+
+
+def flatten(outlines, tolerance=TOLERANCE):
+    """
+    The edges of the outlines as straight lines, arcs are split so no point
+    of the arc is further than tolerance from its lines.
+
+    @param outlines Sequence of abag_offset.Outline
+    @return float array (n, 4) of x0, y0, x1, y1
+    """
+    edges = [e for o in outlines for e in o.edges]
+    if not edges:
+        return np.empty((0, 4))
+    kind, x0, y0, x1, y1, cx, cy, r, delta = np.array(edges, dtype=float).T
+    arc = kind == ARC
+    # Lines are one step, arcs as many as the tolerance needs
+    step = 2 * np.arccos(np.clip(1 - tolerance / np.where(arc, r, 1.0),
+                                 -1.0, 1.0))
+    count = np.where(arc, np.ceil(np.abs(delta) / np.maximum(step, 1e-3)), 1)
+    count = np.maximum(count, 1).astype(int)
+
+    owner = np.repeat(np.arange(len(kind)), count)
+    starts = np.cumsum(count) - count
+    k = np.arange(count.sum()) - np.repeat(starts, count)
+    t0 = k / count[owner]
+    t1 = (k + 1) / count[owner]
+
+    a0 = np.arctan2(y0 - cy, x0 - cx)[owner]
+    o_arc = arc[owner]
+    d = delta[owner]
+    ox, oy, orad = cx[owner], cy[owner], r[owner]
+    lx0, ly0, lx1, ly1 = x0[owner], y0[owner], x1[owner], y1[owner]
+    out = np.empty((len(owner), 4))
+    out[:, 0] = np.where(o_arc, ox + orad * np.cos(a0 + d * t0),
+                         lx0 + (lx1 - lx0) * t0)
+    out[:, 1] = np.where(o_arc, oy + orad * np.sin(a0 + d * t0),
+                         ly0 + (ly1 - ly0) * t0)
+    out[:, 2] = np.where(o_arc, ox + orad * np.cos(a0 + d * t1),
+                         lx0 + (lx1 - lx0) * t1)
+    out[:, 3] = np.where(o_arc, oy + orad * np.sin(a0 + d * t1),
+                         ly0 + (ly1 - ly0) * t1)
+    # Put the arc ends exactly on the edge ends so the outline stays closed
+    last = k == count[owner] - 1
+    out[last, 2] = lx1[last]
+    out[last, 3] = ly1[last]
+    out[k == 0, 0] = lx0[k == 0]
+    out[k == 0, 1] = ly0[k == 0]
+    return out
+
+
+def coverage(edges, width, height, subsamples=SUBSAMPLES):
+    """
+    How much of each pixel is inside the closed outlines made by the edges,
+    with the even-odd rule.
+
+    @param edges float array (n, 4) of x0, y0, x1, y1 in pixels
+    @return float array (height, width) from 0 to 1
+    """
+    x0, y0, x1, y1 = np.asarray(edges, dtype=float).reshape(-1, 4).T
+    # Point every edge down, horizontal edges never cross a scanline
+    flip = y1 < y0
+    x0, x1 = np.where(flip, x1, x0), np.where(flip, x0, x1)
+    y0, y1 = np.where(flip, y1, y0), np.where(flip, y0, y1)
+
+    # Scanline k is at y = (k + 0.5) / subsamples, an edge crosses the
+    # scanlines first <= k < last
+    first = np.clip(np.ceil(y0 * subsamples - 0.5), 0, height * subsamples)
+    last = np.clip(np.ceil(y1 * subsamples - 0.5), 0, height * subsamples)
+    per = (last - first).astype(int)
+    keep = per > 0
+    if not keep.any():
+        return np.zeros((height, width))
+    x0, y0, x1, y1 = x0[keep], y0[keep], x1[keep], y1[keep]
+    first, per = first[keep].astype(int), per[keep]
+
+    owner = np.repeat(np.arange(len(per)), per)
+    starts = np.cumsum(per) - per
+    k = np.arange(per.sum()) - np.repeat(starts, per) + first[owner]
+    y = (k + 0.5) / subsamples
+    slope = (x1 - x0) / (y1 - y0)
+    x = x0[owner] + (y - y0[owner]) * slope[owner]
+
+    # Pair the sorted crossings of each scanline into spans
+    order = np.lexsort((x, k))
+    k = k[order][::2]
+    xa = np.clip(x[order][::2], 0, width)
+    xb = np.clip(x[order][1::2], 0, width)
+
+    # Exact coverage of the end pixels, the ones between are full
+    row = (k // subsamples) * (width + 1)
+    ia = np.floor(xa).astype(int)
+    ib = np.floor(xb).astype(int)
+    same = ia == ib
+    size = height * (width + 1)
+    w = 1.0 / subsamples
+    direct = np.bincount(row + ia, np.where(same, xb - xa, ia + 1 - xa) * w,
+                         size)
+    direct += np.bincount(row + ib, np.where(same, 0.0, xb - ib) * w, size)
+    full = ~same
+    runs = np.bincount(row[full] + ia[full] + 1,
+                       np.full(full.sum(), w), size)
+    runs -= np.bincount(row[full] + ib[full], np.full(full.sum(), w), size)
+    cover = direct.reshape(height, width + 1) + \
+        np.cumsum(runs.reshape(height, width + 1), axis=1)
+    return np.clip(cover[:, :width], 0.0, 1.0)
+
+
+def composite(size, layers, background=BACKGROUND):
+    """
+    Paint the layers over the background.
+
+    @param size (width, height) in pixels
+    @param layers Sequence of (coverage, (r, g, b))
+    @return uint8 array (height, width, 3)
+    """
+    width, height = size
+    img = np.empty((height, width, 3))
+    img[:] = background
+    for cover, colour in layers:
+        a = cover[:, :, None]
+        img += (np.asarray(colour, dtype=float) - img) * a
+    return np.rint(img).astype(np.uint8)
+
+
+def _chunk(kind, data):
+    return (struct.pack('>I', len(data)) + kind + data +
+            struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+
+
+def png_bytes(img, level=6):
+    """An RGB uint8 array (height, width, 3) as a PNG file"""
+    height, width = img.shape[:2]
+    raw = np.empty((height, width * 3 + 1), dtype=np.uint8)
+    # Filter type 0 (none) for every row
+    raw[:, 0] = 0
+    raw[:, 1:] = img.reshape(height, width * 3)
+    return b''.join((
+        b'\x89PNG\r\n\x1a\n',
+        _chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)),
+        _chunk(b'IDAT', zlib.compress(raw.tobytes(), level)),
+        _chunk(b'IEND', b'')))
+
+
+def _outlines(model, seams):
+    return [Outline.from_path(model[i].piece(seams).path)
+            for i in range(len(model))]
+
+
+def thumbnail(model, size=256, margin=MARGIN):
+    """
+    Lay the pattern out and draw it scaled to fit a size x size square.
+
+    @return uint8 array (height, width, 3), the longer side is size
+    """
+    w, h = shelf_layout(model)
+    k = (size - 2 * margin) / float(max(w, h))
+    width = max(1, int(ceil(w * k)) + 2 * margin)
+    height = max(1, int(ceil(h * k)) + 2 * margin)
+    tolerance = TOLERANCE / k
+
+    layers = []
+    for seams, colour in ((True, CUT_COLOUR), (False, PIECE_COLOUR)):
+        edges = flatten(_outlines(model, seams), tolerance) * k + margin
+        layers.append((coverage(edges, width, height), colour))
+    return composite((width, height), layers)
+
+
+def write_thumbnail(filename, model, size=256):
+    with open(filename, 'wb') as fh:
+        fh.write(png_bytes(thumbnail(model, size)))
+
+
+def main(argv=None):
+    parser = OptionParser(usage="usage: %prog [options]")
+    add_pattern_options(parser, (
+        ("--size", "int", "size", 256, "Longer side of the image in pixels"),
+        ("--output", "string", "output", "thumbnail.png", "PNG file to write")
+    ))
+    o, args = parser.parse_args(argv)
+
+    model = PatternModel.from_dimensions(o.radius, o.segments, o.seams,
+                                         o.zipperStrapJoin, o.zipperHeight,
+                                         o.zipperTop, o.zipperBottom,
+                                         seam_allowances(o))
+    write_thumbnail(o.output, model, o.size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+abag_strips.py
+Split the body and zipper strips into panels that fit the fabric
+Copyright (C) 2014 Samuel Hodges <octerman@gmail.com>
+
+This program is free software: you can redistribute it and/or modify it
+under the terms of the GNU General Public License as published by the
+Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along
+with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+The body strip is as long as the rim of the dome and the zipper strips are
+nearly as long, for a big bag that is more than the width of the roll or
+the length of the cutter bed. Such a strip is cut as n panels sewn end to
+end. Every join adds a join seam allowance to both panels it joins, the
+ends of the strip keep their own seam allowances. The fewest panels are
+used and they are cut as near to the same length as possible:
+
+    n = ceil((cut - 2 * join) / (max - 2 * join))
+
+with cut the strip length with its end seam allowances. Joins are then
+moved onto the grid of match marks of the strip (see abag_notch), a
+join on a mark is sewn where a mark would be and the marks on either side
+of it still line up with the mating edge. When the grid is too coarse for
+n panels, one more panel is tried, and when that fails the joins are left
+where the even split put them.
+
+A grading run is planned in one pass over numpy arrays, one row per size.
+Lengths are in cm.
+
+Usage:
+    python abag_strips.py --radii=20,30,40 --maxLength=140 \\
+        --seamAllowenceJoin=1.0 --notches=2
+"""
+import sys
+from math import pi
+from optparse import OptionParser
+import numpy as np
+from abag_cutlist import add_pattern_options, seam_allowances
+from abag_model import PatternModel, RECT, FLOAT_COLUMNS
+
+# Panels more than the fewest tried before the joins are left off the grid
+TRIES = 2
+# Slack allowed on the longest panel, for the rounding of the grid
+EPSILON = 1e-9
+
+
+def _ideal_joins(total, join, left, n, k):
+    """Joins giving n panels of the same cut length, k = 1 .. n - 1"""
+    cut = (total + 2 * join * (n - 1)) / n
+    return k * cut[:, None] - left[:, None] - (2 * k - 1) * join[:, None]
+
+
+def _fits(length, max_length, join, left, right, n, t):
+    """Rows where the joins t (padded with length) give panels that fit"""
+    edges = np.concatenate((np.zeros((len(t), 1)), t,
+                            length[:, None]), axis=1)
+    span = np.diff(edges, axis=1)
+    k = np.arange(span.shape[1])
+    used = k[None, :] < n[:, None]
+    cut = span + np.where(k == 0, left[:, None], join[:, None]) + \
+        np.where(k[None, :] == n[:, None] - 1, right[:, None], join[:, None])
+    ok = (cut <= max_length[:, None] + EPSILON) & (span > EPSILON)
+    return np.all(ok | ~used, axis=1)
+
+
+def plan_joins(length, max_length, join=0.0, left=0.0, right=0.0, step=0.0,
+               offset=0.0):
+    """
+    Where to join the panels of strips, every argument is a number or an
+    array with one value per size.
+
+    @param length Sewn length of each strip
+    @param max_length Longest panel that can be cut, seam allowances included
+    @param join Seam allowance added on both sides of a join
+    @param left, right Seam allowances of the ends of the strip
+    @param step Distance between the match marks, 0 to join anywhere
+    @param offset Distance along the mated seam of the start of the strip,
+                  the marks are at multiples of step from the start of that
+                  seam
+    @return (count, joins) count the number of panels of every strip and
+            joins the distance of each join from the start of the strip,
+            padded with nan
+    """
+    length, max_length, join, left, right, step, offset = (
+        np.atleast_1d(a).astype(float) for a in np.broadcast_arrays(
+            length, max_length, join, left, right, step, offset))
+    total = length + left + right
+    room = max_length - 2 * join
+    single = total <= max_length + EPSILON
+    if np.any(~single & ((room <= 0) | (left + join > max_length) |
+                         (right + join > max_length))):
+        raise ValueError("the join seam allowance leaves no room for a panel")
+    n0 = np.where(single, 1,
+                  np.ceil((total - 2 * join) / np.where(room > 0, room, 1.0) -
+                          EPSILON)).astype(int)
+
+    size = int(n0.max()) + TRIES - 1
+    k = np.arange(1, size)
+    count = n0.copy()
+    joins = np.full((len(length), size - 1), np.nan)
+    done = single.copy()
+    grid = step > 0
+    for extra in range(TRIES):
+        n = n0 + extra
+        t = _ideal_joins(total, join, left, n, k)
+        marks = np.where(grid, step, 1.0)[:, None]
+        snapped = np.round((t + offset[:, None]) / marks) * marks - \
+            offset[:, None]
+        t = np.where(grid[:, None], snapped, t)
+        t = np.where(k[None, :] < n[:, None], t, length[:, None])
+        ok = ~done & grid & _fits(length, max_length, join, left, right, n, t)
+        count[ok] = n[ok]
+        joins[ok] = np.where(k[None, :] < n[ok, None], t[ok], np.nan)
+        done |= ok
+    # Off the grid, the even split always fits
+    rest = ~done
+    if np.any(rest):
+        t = _ideal_joins(total, join, left, n0, k)
+        count[rest] = n0[rest]
+        joins[rest] = np.where(k[None, :] < n0[rest, None], t[rest], np.nan)
+    # Trim the padding no strip needed
+    width = int(count.max()) - 1
+    return count, joins[:, :width]
+
+
+def panel_bounds(length, count, joins):
+    """
+    Start and end of every panel along its strip, padded with nan.
+
+    @return (starts, ends) arrays of shape (sizes, most panels)
+    """
+    length = np.atleast_1d(np.asarray(length, dtype=float))
+    rows = np.arange(len(count))
+    starts = np.concatenate((np.zeros((len(count), 1)), joins), axis=1)
+    ends = np.concatenate((joins, np.full((len(count), 1), np.nan)), axis=1)
+    ends[rows, count - 1] = length
+    return starts, ends
+
+
+def panel_label(label, name, k, count):
+    """Label and name of panel k of count, the strip's own when not split"""
+    if count == 1:
+        return label, name
+    return "%s-%i" % (label, k + 1), "%s %i of %i" % (name, k + 1, count)
+
+
+def mark_step(radius, seams, notches):
+    """Distance between the match marks of the strips of a dome"""
+    return 2 * pi * radius / (seams * (notches + 1))
+
+
+def split_strips(model, max_length, join=0.0, step=0.0):
+    """
+    A copy of a PatternModel with every strip too long for max_length cut as
+    panels, the panels of a strip follow each other and take its place.
+
+    @return PatternModel
+    """
+    rect = np.flatnonzero(model.kind == RECT)
+    count = np.ones(len(model), dtype=int)
+    span = np.zeros((len(model), 1))
+    if len(rect):
+        c, joins = plan_joins(model.width[rect], max_length, join,
+                              model.seam_left[rect], model.seam_right[rect],
+                              step)
+        starts, ends = panel_bounds(model.width[rect], c, joins)
+        count[rect] = c
+        span = np.zeros((len(model), starts.shape[1]))
+        span[rect] = ends - starts
+
+    src = np.repeat(np.arange(len(model)), count)
+    k = np.arange(len(src)) - np.repeat(np.cumsum(count) - count, count)
+    new = PatternModel(len(src))
+    for column in ('piece_id', 'kind', 'quantity') + FLOAT_COLUMNS:
+        getattr(new, column)[:] = getattr(model, column)[src]
+    for i, (j, p) in enumerate(zip(src.tolist(), k.tolist())):
+        new.label[i], new.name[i] = panel_label(model.label[j], model.name[j],
+                                                p, int(count[j]))
+    split = count[src] > 1
+    new.width[split] = span[src, k][split]
+    new.seam_left[split & (k > 0)] = join
+    new.seam_right[split & (k < count[src] - 1)] = join
+    return new
+
+
+def _list(kind, text):
+    return [kind(v) for v in text.split(',') if v.strip()]
+
+
+def main(argv=None):
+    parser = OptionParser(usage="usage: %prog [options]")
+    add_pattern_options(parser, (
+        ("--radii", "string", "radii", "",
+            "Comma separated radii of a grading run, --radius if empty"),
+        ("--maxLength", "float", "maxLength", 140.0,
+            "Longest panel that can be cut in cm, seam allowances included"),
+        ("--seamAllowenceJoin", "float", "seamJoin", 1.0,
+            "Seam allowence on both sides of a join"),
+        ("--notches", "int", "notches", 0,
+            "Notches per piece, the joins go on the marks"),
+        ("--anywhere", "int", "anywhere", 0,
+            "1 to join the panels anywhere, not on the marks"),
+    ))
+    o, args = parser.parse_args(argv)
+
+    radii = _list(float, o.radii) or [o.radius]
+    step = np.array([0.0 if o.anywhere else
+                     mark_step(r, o.seams, o.notches) for r in radii])
+    models = [PatternModel.from_dimensions(r, o.segments, o.seams,
+                                           o.zipperStrapJoin, o.zipperHeight,
+                                           o.zipperTop, o.zipperBottom,
+                                           seam_allowances(o))
+              for r in radii]
+    # One pass for every strip of every size
+    strips = [np.flatnonzero(m.kind == RECT) for m in models]
+    rows = [(m, i) for m, idx in zip(models, strips) for i in idx.tolist()]
+    per = np.array([len(idx) for idx in strips])
+    count, joins = plan_joins(
+        [m.width[i] for m, i in rows], o.maxLength, o.seamJoin,
+        [m.seam_left[i] for m, i in rows], [m.seam_right[i] for m, i in rows],
+        np.repeat(step, per))
+
+    for n, (m, i) in enumerate(rows):
+        if n == 0 or rows[n - 1][0] is not m:
+            sys.stdout.write("radius %gcm\n" % radii[models.index(m)])
+        at = ', '.join('%.2f' % t for t in joins[n][:count[n] - 1])
+        sys.stdout.write("  %-4s %-12s %8.2fcm %i panel%s%s\n" % (
+            m.label[i], m.name[i], m.width[i], count[n],
+            '' if count[n] == 1 else 's',
+            ' joined at ' + at if at else ''))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+abag_svgz.py
+Compressed (.svgz) output written from background threads
+Copyright (C) 2014 Samuel Hodges <octerman@gmail.com>
+
+This program is free software: you can redistribute it and/or modify it
+under the terms of the GNU General Public License as published by the
+Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along
+with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Pattern SVG is long and repetitive and shrinks to a small part of its size
+compressed. Writing it compressed in the first place saves writing it out
+plain and reading it back in to compress it.
+
+zlib lets go of the interpreter lock while it works, so a Compressor runs
+it on a pool of threads while the calling thread renders the next pattern.
+Results are handed back in the order the data came in, so archives and
+file lists come out the same whatever the number of threads. No more than
+backlog pieces of data wait for compression at a time, rendering far ahead
+of compression would only use memory.
+
+The gzip header is written without a time stamp, the same SVG always gives
+the same .svgz bytes.
+
+Usage:
+    python abag_archive.py --radii=10,20,30 --segmentCounts=4,8 \\
+        --svgzDir=catalogue --level=6 --threads=2
+"""
+import gzip
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Compression level, 1 is fastest and 9 smallest
+LEVEL = 6
+# Compression threads
+THREADS = 2
+
+
+def compress(data, level=LEVEL):
+    """SVG bytes as .svgz bytes"""
+    return gzip.compress(data, level, mtime=0)
+
+
+def is_svgz(filename):
+    return isinstance(filename, str) and filename.lower().endswith('.svgz')
+
+
+class Compressor(object):
+    """
+    Compress data on background threads and hand it back in order.
+
+    @param pack function of the bytes returning the compressed bytes
+    @param threads Compression threads, 0 to compress in the calling thread
+    @param backlog Pieces of data waiting at most, 2 per thread by default
+    """
+
+    def __init__(self, pack, threads=THREADS, backlog=None):
+        self.pack = pack
+        self.pool = ThreadPoolExecutor(threads) if threads > 0 else None
+        self.backlog = backlog or 2 * max(1, threads)
+        self.pending = deque()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.count = 0
+        self.start = None
+        self.seconds = 0.0
+
+    def put(self, tag, data):
+        """
+        Queue data for compression.
+
+        @return list of (tag, data, compressed) finished since the last call,
+                in the order they were put
+        """
+        if self.start is None:
+            self.start = time.time()
+        self.bytes_in += len(data)
+        if self.pool is None:
+            return [self._done(tag, data, self.pack(data))]
+        self.pending.append((tag, data, self.pool.submit(self.pack, data)))
+        done = []
+        # The oldest is waited for when the backlog is full, the rest only
+        # when they are already finished
+        while self.pending and (len(self.pending) > self.backlog or
+                                self.pending[0][2].done()):
+            tag, data, future = self.pending.popleft()
+            done.append(self._done(tag, data, future.result()))
+        return done
+
+    def finish(self):
+        """Wait for everything, returns the rest as put does"""
+        done = []
+        while self.pending:
+            tag, data, future = self.pending.popleft()
+            done.append(self._done(tag, data, future.result()))
+        if self.pool is not None:
+            self.pool.shutdown()
+        if self.start is not None:
+            self.seconds = time.time() - self.start
+        return done
+
+    def _done(self, tag, data, packed):
+        self.bytes_out += len(packed)
+        self.count += 1
+        return tag, data, packed
+
+    def rate(self):
+        """Compressed bytes per second, from the first put to finish"""
+        return self.bytes_out / self.seconds if self.seconds > 0 else 0.0
+
+    def report(self):
+        """One line on the amount written and how fast"""
+        ratio = self.bytes_out / float(self.bytes_in) if self.bytes_in else 0
+        return "%i files, %i bytes of SVG, %i bytes written (%.1f%%) in " \
+            "%.3fs, %.2f MB/s written\n" % (
+                self.count, self.bytes_in, self.bytes_out, 100 * ratio,
+                self.seconds, self.rate() / 1e6)
+
+
+def _write(filename, data):
+    with open(filename, 'wb') as fh:
+        fh.write(data)
+
+
+class SvgzWriter(object):
+    """Write SVG documents as .svgz files, compressed on background threads"""
+
+    def __init__(self, level=LEVEL, threads=THREADS):
+        self.level = level
+        self.compressor = Compressor(self._pack, threads)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _pack(self, data):
+        return compress(data, self.level)
+
+    def write(self, filename, data):
+        """Write SVG bytes data to filename compressed, in the background"""
+        for name, data, packed in self.compressor.put(filename, data):
+            _write(name, packed)
+
+    def close(self):
+        for name, data, packed in self.compressor.finish():
+            _write(name, packed)
+
+    def report(self):
+        return self.compressor.report()
+
+
+def write_catalogue(directory, items, level=LEVEL, threads=THREADS):
+    """
+    Write (name, SVG bytes) items as directory/name.svgz, the items are
+    taken one at a time while the ones before them are compressed.
+
+    @return the SvgzWriter, for its report
+    """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    with SvgzWriter(level, threads) as writer:
+        for name, data in items:
+            writer.write(os.path.join(directory, name + '.svgz'), data)
+    return writer
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+abag_tile.py
+Tiled print output of the bag pattern, one SVG file per page
+Copyright (C) 2014 Samuel Hodges <octerman@gmail.com>
+
+This program is free software: you can redistribute it and/or modify it
+under the terms of the GNU General Public License as published by the
+Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along
+with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+The pieces are laid out in rows and the layout is cut into a grid of
+pages. Neighbouring pages overlap and carry the same registration marks in
+the overlap, so the printed sheets are lined up by laying one mark over the
+other. The bounding boxes of the pieces are binned by page first, a page is
+only written with the pieces on it, and each piece's path is only built the
+first time a page needs it. All lengths are in cm.
+
+Usage:
+    python abag_tile.py --radius=30 --segments=8 --paper=a4 --output=pages
+"""
+import json
+import os
+from math import ceil
+from optparse import OptionParser
+import numpy as np
+from abag_utils import format_number, format_path
+from abag_model import PatternModel, CIRCLE, SECTOR
+from abag_cutlist import add_pattern_options, seam_allowances
+
+# Paper sizes (width, height) in cm
+PAPERS = {
+    'a4': (21.0, 29.7),
+    'letter': (21.59, 27.94)
+}
+
+# Width of the layout the pages are cut from, and the gap between pieces
+LAYOUT_WIDTH = 100.0
+GAP = 1.0
+
+STROKE = 0.02
+MARK = 0.4
+
+_page = '''<?xml version="1.0" encoding="UTF-8" standalone="no"?>
+<svg xmlns="http://www.w3.org/2000/svg" width="%smm" height="%smm" \
+viewBox="0 0 %s %s">
+<text x="%s" y="%s" style="font-size:0.35px;fill:#000000">%s</text>
+<g transform="translate(%s,%s)" style="fill:none;stroke:#000000;\
+stroke-width:%spx">
+'''
+
+_sheet = '''<?xml version="1.0" encoding="UTF-8" standalone="no"?>
+<svg xmlns="http://www.w3.org/2000/svg" width="%smm" height="%smm" \
+viewBox="0 0 %s %s">
+<title>%s</title>
+<g style="fill:none;stroke:#000000;stroke-width:%spx">
+'''
+
+
+def shelf_layout(model, width=LAYOUT_WIDTH, gap=GAP):
+    """
+    Place the pieces left to right in rows no wider than width, a piece
+    wider than that gets a row of its own.
+
+    @return (width, height) of the layout
+    """
+    model.place(0.0, 0.0)
+    x0, y0, x1, y1 = model.bounds()
+    w = (x1 - x0).tolist()
+    h = (y1 - y0).tolist()
+    xs = []
+    ys = []
+    x = y = row_h = used = 0.0
+    for i in range(len(model)):
+        if x and x + w[i] > width:
+            y += row_h + gap
+            x = row_h = 0.0
+        xs.append(x)
+        ys.append(y)
+        x += w[i] + gap
+        used = max(used, x - gap)
+        row_h = max(row_h, h[i])
+    # The bounds are relative to each piece's own origin
+    model.place(np.array(xs) - x0, np.array(ys) - y0)
+    return used, y + row_h
+
+
+class PageGrid(object):
+    """The pages covering a layout of the given size"""
+
+    def __init__(self, size, paper='a4', margin=1.0, overlap=1.5):
+        self.paper = PAPERS[paper]
+        self.margin = margin
+        self.overlap = overlap
+        pw, ph = self.paper
+        # Printed area of each page and the step from one page to the next
+        self.area = (pw - 2 * margin, ph - 2 * margin)
+        self.step = (self.area[0] - overlap, self.area[1] - overlap)
+        if min(self.step) <= 0:
+            raise ValueError("The margins and overlap do not fit the paper")
+        self.cols = max(1, int(ceil((size[0] - overlap) / self.step[0])))
+        self.rows = max(1, int(ceil((size[1] - overlap) / self.step[1])))
+
+    def __len__(self):
+        return self.rows * self.cols
+
+    def tile(self, row, col):
+        """The part of the layout printed on a page, (x0, y0, x1, y1)"""
+        x = col * self.step[0]
+        y = row * self.step[1]
+        return x, y, x + self.area[0], y + self.area[1]
+
+    def index(self, bounds):
+        """
+        The pieces on every page.
+
+        @param bounds (x0, y0, x1, y1) arrays from PatternModel.bounds
+        @return dict of (row, col): [piece index, ...]
+        """
+        x0, y0, x1, y1 = bounds
+        first_col, last_col = self._span(x0, x1, 0, self.cols)
+        first_row, last_row = self._span(y0, y1, 1, self.rows)
+        pages = {}
+        spans = zip(first_row.tolist(), last_row.tolist(),
+                    first_col.tolist(), last_col.tolist())
+        for i, (r0, r1, c0, c1) in enumerate(spans):
+            for r in range(r0, r1 + 1):
+                for c in range(c0, c1 + 1):
+                    pages.setdefault((r, c), []).append(i)
+        return pages
+
+    def _span(self, lo, hi, axis, count):
+        # Pages k with k * step < hi and k * step + area > lo
+        step = self.step[axis]
+        first = np.floor((lo - self.area[axis]) / step).astype(int) + 1
+        last = np.ceil(hi / step).astype(int) - 1
+        return np.clip(first, 0, count - 1), np.clip(last, 0, count - 1)
+
+    def marks(self, row, col):
+        """
+        Registration marks of a page, at the middle of the overlaps in each
+        corner. A neighbouring page has the same marks on the shared side.
+        """
+        x0, y0, x1, y1 = self.tile(row, col)
+        h = self.overlap / 2
+        return [(x, y) for y in (y0 + h, y1 - h) for x in (x0 + h, x1 - h)]
+
+
+def _label_points(model):
+    """Where each piece's label goes"""
+    r = (model.outer_radius + model.inner_radius) / 2
+    a = model.angle / 2
+    return (np.select([model.kind == CIRCLE, model.kind == SECTOR],
+                      [model.x, model.x + r * np.cos(a)],
+                      model.x + model.width / 2),
+            np.select([model.kind == CIRCLE, model.kind == SECTOR],
+                      [model.y, model.y + r * np.sin(a)],
+                      model.y + model.height / 2))
+
+
+def _piece_paths(model, i):
+    """Path elements for a piece, the cut line and a dashed sewing line"""
+    view = model[i]
+    cut = format_path(view.piece().path, 3)
+    out = ['<path d="%s"/>\n' % cut]
+    sewing = format_path(view.piece(seams=False).path, 3)
+    if sewing != cut:
+        out.append('<path d="%s" style="stroke-dasharray:0.2,0.1"/>\n' %
+                   sewing)
+    return ''.join(out)
+
+
+def _piece_body(model, i, x, y):
+    """The paths of a piece and its label at x, y"""
+    view = model[i]
+    text = view.label
+    if view.quantity > 1:
+        text += ' x%i' % view.quantity
+    return _piece_paths(model, i) + (
+        '<text x="%s" y="%s" style="font-size:0.8px;fill:#000000;'
+        'stroke:none">%s</text>\n' %
+        (format_number(x, 3), format_number(y, 3), text))
+
+
+def write_page(fh, grid, row, col, body, title):
+    """Write one page, body is the SVG of the pieces in layout units"""
+    f = format_number
+    pw, ph = grid.paper
+    m = grid.margin
+    x0, y0, x1, y1 = grid.tile(row, col)
+    fh.write(_page % (f(pw * 10), f(ph * 10), f(pw), f(ph), f(m),
+                      f(m * 0.7), title, f(m - x0), f(m - y0), f(STROKE)))
+    fh.write(body)
+    for x, y in grid.marks(row, col):
+        fh.write('<circle cx="%s" cy="%s" r="%s"/><path d="M%s %sH%sM%s %sV%s"'
+                 '/>\n' % (f(x), f(y), f(MARK / 2), f(x - MARK), f(y),
+                           f(x + MARK), f(x), f(y - MARK), f(y + MARK)))
+    fh.write('</g>\n</svg>\n')
+
+
+def write_tiles(model, directory, paper='a4', margin=1.0, overlap=1.5,
+                width=LAYOUT_WIDTH):
+    """
+    Lay the pattern out and write a page_<row>_<col>.svg file for every page
+    with something on it, and pages.json listing the pages and their pieces.
+
+    @return list of the page file names
+    """
+    size = shelf_layout(model, width)
+    grid = PageGrid(size, paper, margin, overlap)
+    pages = grid.index(model.bounds())
+    lx, ly = _label_points(model)
+    lx = lx.tolist()
+    ly = ly.tolist()
+
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    bodies = {}
+    names = []
+    index = []
+    for row, col in sorted(pages):
+        pieces = pages[(row, col)]
+        parts = []
+        for i in pieces:
+            if i not in bodies:
+                bodies[i] = _piece_body(model, i, lx[i], ly[i])
+            parts.append(bodies[i])
+        name = 'page_%i_%i.svg' % (row + 1, col + 1)
+        title = 'Page row %i of %i, column %i of %i' % (row + 1, grid.rows,
+                                                        col + 1, grid.cols)
+        fh = open(os.path.join(directory, name), 'w')
+        try:
+            write_page(fh, grid, row, col, ''.join(parts), title)
+        finally:
+            fh.close()
+        names.append(name)
+        index.append({'file': name, 'row': row + 1, 'col': col + 1,
+                      'tile': grid.tile(row, col),
+                      'pieces': [model.label[i] for i in pieces]})
+
+    fh = open(os.path.join(directory, 'pages.json'), 'w')
+    try:
+        json.dump({'paper': paper, 'rows': grid.rows, 'cols': grid.cols,
+                   'pages': index}, fh, indent=1, sort_keys=True)
+    finally:
+        fh.close()
+    return names
+
+
+def write_sheet(fh, model, width=LAYOUT_WIDTH, title=''):
+    """
+    Lay the pattern out and write it as a single SVG document, in cm and
+    without pages, for catalogues and previews.
+    """
+    f = format_number
+    w, h = shelf_layout(model, width)
+    lx, ly = _label_points(model)
+    lx = lx.tolist()
+    ly = ly.tolist()
+    fh.write(_sheet % (f(w * 10), f(h * 10), f(w), f(h), title, f(STROKE)))
+    for i in range(len(model)):
+        fh.write(_piece_body(model, i, lx[i], ly[i]))
+    fh.write('</g>\n</svg>\n')
+
+
+def main(argv=None):
+    parser = OptionParser(usage="usage: %prog [options]")
+    add_pattern_options(parser, (
+        ("--paper", "choice", "paper", "a4", "Paper size, a4 or letter"),
+        ("--margin", "float", "margin", 1.0, "Unprinted margin of the paper"),
+        ("--overlap", "float", "overlap", 1.5,
+            "Overlap between neighbouring pages"),
+        ("--width", "float", "width", LAYOUT_WIDTH,
+            "Width of the layout the pages are cut from"),
+        ("--output", "string", "output", "pages", "Directory for the pages")
+    ), sorted(PAPERS))
+    o, args = parser.parse_args(argv)
+
+    model = PatternModel.from_dimensions(o.radius, o.segments, o.seams,
+                                         o.zipperStrapJoin, o.zipperHeight,
+                                         o.zipperTop, o.zipperBottom,
+                                         seam_allowances(o))
+    write_tiles(model, o.output, o.paper, o.margin, o.overlap, o.width)
+
+
+if __name__ == '__main__':
+    main()
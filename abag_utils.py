@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+#!/usr/bin/env python3
 """
 abag_utils.py
 A helper module for abag-inkex extensions
@@ -16,12 +16,14 @@ See the GNU General Public License for more details.
 
 You should have received a copy of the GNU General Public License along
 with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Only the functions writing SVG elements need inkex, they import abag_nodes
+when called. The geometry, the paths and the pieces work without it.
 """
-import inkex
 import math
-from math import pi, cos, sin
+from math import pi, cos, sin, sqrt
+from operator import itemgetter
 from random import randint
-from simplestyle import formatStyle
 
 DEFAULT_STYLE = {
     'stroke': '#ffffff',
@@ -50,85 +52,140 @@ def format_number(n, accuracy=6):
     return str_n
 
 
-def circle(r, cx, cy, parent, style, start_end=(0, 2 * math.pi)):
+def format_path(path, accuracy=6):
+    """Format path data from (command, params) pairs, with rounded numbers"""
+    return "".join([cmd + " ".join([format_number(p, accuracy) for p in params])
+                    for cmd, params in path])
+
+
+def circle(r, cx, cy, parent, style, start_end=(0, 2 * math.pi),
+           precompute=False, sodipodi=True):
     # add in an id variable to the attributs so I can pass it to the text
     # to put it along the path
-    if not style:
-        style = DEFAULT_STYLE
+    return arc_node(parent, r, r, cx, cy, start_end, style, precompute,
+                    sodipodi)
 
-    attrs = {
-        'style': formatStyle(style),
-        inkex.addNS('cx', 'sodipodi'): str(cx),
-        inkex.addNS('cy', 'sodipodi'): str(cy),
-        inkex.addNS('rx', 'sodipodi'): str(r),
-        inkex.addNS('ry', 'sodipodi'): str(r),
-        inkex.addNS('start', 'sodipodi'): str(start_end[0]),
-        inkex.addNS('end', 'sodipodi'): str(start_end[1]),
-        # Ellipse extors will be drawn open
-        inkex.addNS('open', 'sodipodi'): 'True',
-        inkex.addNS('type', 'sodipodi'): 'arc',
-        'transform': ''
-    }
-    return inkex.etree.SubElement(parent, inkex.addNS('path', 'svg'), attrs)
 
+def circle_path(r, cx, cy):
+    """Path data for a full circle, drawn as two half arcs"""
+    p = Path()
+    p.M(cx + r, cy)
+    p.A(r, r, 0, 1, 1, cx - r, cy)
+    p.A(r, r, 0, 1, 1, cx + r, cy)
+    p.Z()
+    return p
 
-def ellipse((rx, ry), (cx, cy), parent, style=False, startEnd=(0, 2 * math.pi)):
+
+def ellipse(radii, center, parent, style=False, startEnd=(0, 2 * math.pi),
+            precompute=False, sodipodi=True):
     # add in an id variable to the attributs so I can pass it to the text
     # to put it along the path
-    if not style:
-        style = DEFAULT_STYLE
-
-    attrs = {
-        'style': formatStyle(style),
-        inkex.addNS('cx', 'sodipodi'): str(cx),
-        inkex.addNS('cy', 'sodipodi'): str(cy),
-        inkex.addNS('rx', 'sodipodi'): str(rx),
-        inkex.addNS('ry', 'sodipodi'): str(ry),
-        inkex.addNS('start', 'sodipodi'): str(startEnd[0]),
-        inkex.addNS('end', 'sodipodi'): str(startEnd[1]),
-        # Ellipse sectors drawn open
-        inkex.addNS('open', 'sodipodi'): 'True',
-        inkex.addNS('type', 'sodipodi'): 'arc',
-        'transform': ''
-    }
-    return inkex.etree.SubElement(parent, inkex.addNS('path', 'svg'), attrs)
+    rx, ry = radii
+    cx, cy = center
+    return arc_node(parent, rx, ry, cx, cy, startEnd, style, precompute,
+                    sodipodi)
 
 
-def ellipse_id((rx, ry), (cx, cy), parent, nid, startEnd=(0, 2 * math.pi),
-                                                                style=False):
+def ellipse_id(radii, center, parent, nid, startEnd=(0, 2 * math.pi),
+               style=False, precompute=False, sodipodi=True):
     # add in an id variable to the attributs so I can pass it to the text
     # to put it along the path
-    if not style:
-        style = DEFAULT_STYLE
+    rx, ry = radii
+    cx, cy = center
+    return arc_node(parent, rx, ry, cx, cy, startEnd, style, precompute,
+                    sodipodi, str(nid))
+
+
+def arc_node(parent, rx, ry, cx, cy, start_end, style=False,
+             precompute=False, sodipodi=True, nid=None):
+    """Append an elliptical arc path to parent, see arc_attrs"""
+    import abag_nodes as nodes
+    attrs = [('style', nodes.style(style or DEFAULT_STYLE))]
+    d = None
+    if precompute or not sodipodi:
+        d = arc_path_data(rx, ry, cx, cy, start_end[0], start_end[1])
+    attrs.extend(nodes.arc_items(rx, ry, cx, cy, start_end, d, sodipodi))
+    if nid is not None:
+        attrs.append(('id', nid))
+    return nodes.node(parent, nodes.PATH, attrs)
+
+
+def arc_attrs(rx, ry, cx, cy, start_end, style=False, precompute=False,
+              sodipodi=True):
+    """
+    Attributes of an elliptical arc path, the arc is drawn open.
 
-    attrs = {
-        'style': formatStyle(style),
-        'id': str(nid),
-        inkex.addNS('cx', 'sodipodi'): str(cx),
-        inkex.addNS('cy', 'sodipodi'): str(cy),
-        inkex.addNS('rx', 'sodipodi'): str(rx),
-        inkex.addNS('ry', 'sodipodi'): str(ry),
-        inkex.addNS('start', 'sodipodi'): str(startEnd[0]),
-        inkex.addNS('end', 'sodipodi'): str(startEnd[1]),
-        # Ellipse sectors will be drawn open
-        inkex.addNS('open', 'sodipodi'): 'True',
-        inkex.addNS('type', 'sodipodi'): 'arc',
-        'transform': ''
-    }
-    return inkex.etree.SubElement(parent, inkex.addNS('path', 'svg'), attrs)
+    @param precompute Add the path data, so the arc shows outside Inkscape
+                      and Inkscape does not have to build it on load
+    @param sodipodi Add the sodipodi:type="arc" attributes that keep the
+                    arc editable in Inkscape. Without them the path data is
+                    always added.
+    """
+    import abag_nodes as nodes
+    d = None
+    if precompute or not sodipodi:
+        d = arc_path_data(rx, ry, cx, cy, start_end[0], start_end[1])
+    attrs = {'style': nodes.style(style or DEFAULT_STYLE)}
+    attrs.update(nodes.arc_items(rx, ry, cx, cy, start_end, d, sodipodi))
+    return attrs
 
 
-def line((x1, y1), (x2, y2), name, parent, style):
+# (start point, formatted relative arcs) keyed by (rx, ry, start, end)
+_arc_cache = {}
+_ARC_CACHE_SIZE = 1024
+
+
+def arc_path_data(rx, ry, cx, cy, start=0, end=2 * math.pi):
+    """
+    Path data of an elliptical arc from the angle start to end, a closed
+    ellipse for a full turn. Only the first point depends on the centre, the
+    rest is relative and cached for each radius and pair of angles.
+    """
+    key = (rx, ry, start, end)
+    entry = _arc_cache.get(key)
+    if entry is None:
+        if len(_arc_cache) >= _ARC_CACHE_SIZE:
+            _arc_cache.clear()
+        entry = _arc_cache[key] = _relative_arc(rx, ry, start, end)
+    (x0, y0), tail = entry
+    return "M%s %s%s" % (format_number(cx + x0), format_number(cy + y0), tail)
+
+
+def _relative_arc(rx, ry, start, end):
+    sweep = end - start
+    if sweep <= 0:
+        sweep += 2 * pi
+    full = sweep >= 2 * pi - 1e-9
+    # Arcs of up to half a turn so the large arc flag is never needed
+    n = 2 if full or sweep > pi else 1
+    step = sweep / n
+
+    p = Path()
+    x, y = rx * cos(start), ry * sin(start)
+    first = (x, y)
+    for k in range(1, n + 1):
+        t = start + step * k
+        nx, ny = rx * cos(t), ry * sin(t)
+        p.a(rx, ry, 0, 0, 1, nx - x, ny - y)
+        x, y = nx, ny
+    if full:
+        p.z()
+    return first, format_path(p)
+
+
+def line(p1, p2, name, parent, style):
     """draw an SVG line segment between the given (raw) points"""
+    import abag_nodes as nodes
+    x1, y1 = p1
+    x2, y2 = p2
     if not style:
         style = DEFAULT_STYLE
 
-    attrs = {
-        'style': formatStyle(style),
-        inkex.addNS('label', 'inkscape'): name,
-        'd': 'M ' + str(x1) + ',' + str(y1) + ' L ' + str(x2) + ',' + str(y2)
-    }
-    inkex.etree.SubElement(parent, inkex.addNS('path', 'svg'), attrs)
+    nodes.node(parent, nodes.PATH, (
+        ('style', nodes.style(style)),
+        (nodes.LABEL, name),
+        ('d', 'M %s,%s L %s,%s' % (x1, y1, x2, y2))
+    ))
 
 
 def make_segment_data(radius, segments):
@@ -141,11 +198,29 @@ def make_segment_data(radius, segments):
     @return data A dictionary of <segment number>: (angle, radius)
     """
     data = {}
+    for i, angle_t, seg_r in iter_segment_data(radius, segments):
+        data[i] = (angle_t, seg_r)
+    return data, segment_thickness(radius, segments)
+
+
+def segment_thickness(radius, segments):
+    """Width of every segment of the dome in cm"""
+    angle_a = (pi / 2) / segments
+    angle_b = (pi - angle_a) / 2
+    return (cos(angle_b) * radius) * 2
+
+
+def iter_segment_data(radius, segments, first=1, last=None):
+    """
+    Yield (segment number, angle, radius) for the segments first to last
+    only, last defaults to segments. See make_segment_data.
+    """
+    if last is None:
+        last = segments
     angle_a = (pi / 2) / segments
     angle_b = (pi - angle_a) / 2
-    thickness = (cos(angle_b) * radius) * 2
     #main loop to calculate the needed angle and radius for the cone pattern
-    for i in range(1, segments + 1):
+    for i in range(max(first, 1), min(last, segments) + 1):
         angle_m = angle_a * i
         cone_r = radius * sin(angle_m)
         c = 2 * pi * cone_r
@@ -160,12 +235,61 @@ def make_segment_data(radius, segments):
         #find the angle for the flat pattern from the radians
         # fomular s/r = theta
         angle_t = c / seg_r
-        data[i] = (angle_t, seg_r)
-    return data, thickness
+        yield i, angle_t, seg_r
 
 make_dome_data = make_segment_data
 
 
+def make_zipper_data(radius, thickness, join_w, zip_h, top_h, bottom_h):
+    """
+    Calculate dimensions and points for each piece, top, bottom and joiner.
+    @return List List of dics where keys are the name of each piece
+    """
+    c = 2 * pi * radius
+    length = c - join_w
+    data = {
+        'BodyStrip': {'label': 'B1', 'd': (c, thickness)},
+        'ZipTop': {'label': 'Z1', 'd': (length, top_h)},
+        'ZipBottom': {'label': 'Z2', 'd': (length, bottom_h)},
+        'ZipJoin': {'label': 'Z3', 'd': (join_w, top_h + zip_h + bottom_h)},
+    }
+    return data
+
+
+def arc_edge(cx, cy, radius, sign, depth, loop, repeats=1, offset=0.0,
+             length=None):
+    """
+    An edge to put notches on, along the arc of a circle centred on (cx, cy)
+    counter clockwise from angle 0.
+
+    Notches go on the seam line that the edge is sewn along, which runs for
+    loop and is made from repeats identical pieces. The edge covers the part
+    of the loop from offset for length, the whole loop by default. Mating
+    edges share the same loop so their notches line up.
+
+    @param sign 1 when the outside of the piece is away from the centre,
+                -1 when it is towards it
+    @param depth Length of the notch ticks, negative to go into the piece
+    @return Tuple for abag_notch.notch_marks
+    """
+    if length is None:
+        length = loop - offset
+    return (cx, cy, radius, 0.0, sign, depth, loop, repeats, offset, length)
+
+
+def line_edge(x, y, angle, sign, depth, loop, repeats=1, offset=0.0,
+              length=None):
+    """
+    An edge to put notches on, along a straight line from (x, y) in the
+    direction of angle. The outside of the piece is the direction of the
+    line turned by +90 degrees for sign 1, -90 degrees for sign -1. See
+    arc_edge for the rest.
+    """
+    if length is None:
+        length = loop - offset
+    return (x, y, 0.0, angle, sign, depth, loop, repeats, offset, length)
+
+
 class Vector2(object):
 
     __slots__ = ('_v',)
@@ -206,7 +330,7 @@ class Vector2(object):
 
     @classmethod
     def from_floats(cls, x, y):
-        vec = cls.__new__(cls, object)
+        vec = cls.__new__(cls)
         vec._v = [x, y]
         return vec
 
@@ -217,9 +341,9 @@ class Vector2(object):
         @param iterable: An iterable of at least 2 numeric values
 
         """
-        n = iter(iterable).next
-        vec = cls.__new__(cls, object)
-        vec._v = [float(n()), float(n())]
+        it = iter(iterable)
+        vec = cls.__new__(cls)
+        vec._v = [float(next(it)), float(next(it))]
         return vec
 
     @classmethod
@@ -229,7 +353,7 @@ class Vector2(object):
         @param p2: Second point
 
         """
-        v = cls.__new__(cls, object)
+        v = cls.__new__(cls)
         x, y = p1
         xx, yy = p2
         v._v = [float(xx - x), float(yy - y)]
@@ -237,13 +361,13 @@ class Vector2(object):
 
     @classmethod
     def _from_float_sequence(cls, sequence):
-        v = cls.__new__(cls, object)
+        v = cls.__new__(cls)
         v._v = list(sequence[:2])
         return v
 
     def copy(self):
         """Returns a copy of this object."""
-        vec = self.__new__(self.__class__, object)
+        vec = self.__new__(self.__class__)
         vec._v = self._v[:]
         return vec
 
@@ -317,7 +441,7 @@ class Vector2(object):
 
     def __hash__(self):
 
-        return hash(self._v)
+        return hash(tuple(self._v))
 
     def __add__(self, rhs):
         x, y = self._v
@@ -389,7 +513,7 @@ class Vector2(object):
             yy = lhs
         return self.from_floats(x * xx, y * yy)
 
-    def __div__(self, rhs):
+    def __truediv__(self, rhs):
         """
         Return the result of dividing this vector by a scalar or a
         vector-list object.
@@ -401,7 +525,7 @@ class Vector2(object):
         else:
             return Vector2.from_floats(x / rhs, y / rhs)
 
-    def __idiv__(self, rhs):
+    def __itruediv__(self, rhs):
         """Divides this vector with a scalar or a vector-list object."""
         if hasattr(rhs, "__getitem__"):
             xx, yy = rhs
@@ -414,7 +538,7 @@ class Vector2(object):
             v[1] /= rhs
         return self
 
-    def __rdiv__(self, lhs):
+    def __rtruediv__(self, lhs):
 
         x, y = self._v
         if hasattr(lhs, "__getitem__"):
@@ -433,7 +557,7 @@ class Vector2(object):
 
         return self.copy()
 
-    def __nonzero__(self):
+    def __bool__(self):
 
         x, y = self._v
         return bool(x or y)
@@ -489,11 +613,7 @@ class Vector2(object):
 
     def set_length(self, length):
         """Sets the magnitude for the vector."""
-        angle = self.get_angle()
-        x = length * math.cos(angle)
-        y = length * math.sin(angle)
-        self.set_x(x)
-        self.set_y(y)
+        self._set_length(length)
 
     set_magnitude = set_length
 
@@ -524,6 +644,114 @@ class Vector2(object):
         return math.sqrt(dx * dx + dy * dy)
 
 
+class Vec2(tuple):
+    """
+    Immutable 2D vector backed by a tuple.
+
+    A lighter alternative to Vector2 for geometry code, every operation
+    returns a new vector and the common combinations are fused into a single
+    call, e.g. perpendicular_of_length.
+    """
+
+    __slots__ = ()
+
+    x = property(itemgetter(0), doc="x component.")
+    y = property(itemgetter(1), doc="y component.")
+
+    def __new__(cls, x=0., y=0.):
+        return tuple.__new__(cls, (x, y))
+
+    @classmethod
+    def from_points(cls, p1, p2):
+        """The vector from point p1 to point p2"""
+        return tuple.__new__(cls, (p2[0] - p1[0], p2[1] - p1[1]))
+
+    @classmethod
+    def from_polar(cls, length, angle):
+        return tuple.__new__(cls, (length * cos(angle), length * sin(angle)))
+
+    def __repr__(self):
+        return "Vec2(%s, %s)" % self
+
+    def __str__(self):
+        return "(%s, %s)" % (format_number(self[0]), format_number(self[1]))
+
+    def __add__(self, rhs):
+        return tuple.__new__(Vec2, (self[0] + rhs[0], self[1] + rhs[1]))
+    __radd__ = __add__
+
+    def __sub__(self, rhs):
+        return tuple.__new__(Vec2, (self[0] - rhs[0], self[1] - rhs[1]))
+
+    def __rsub__(self, lhs):
+        return tuple.__new__(Vec2, (lhs[0] - self[0], lhs[1] - self[1]))
+
+    def __mul__(self, k):
+        """Scale by a number"""
+        return tuple.__new__(Vec2, (self[0] * k, self[1] * k))
+    __rmul__ = __mul__
+
+    def __truediv__(self, k):
+        k = float(k)
+        return tuple.__new__(Vec2, (self[0] / k, self[1] / k))
+
+    def __neg__(self):
+        return tuple.__new__(Vec2, (-self[0], -self[1]))
+
+    def __pos__(self):
+        return self
+
+    def __bool__(self):
+        return bool(self[0] or self[1])
+
+    @property
+    def length(self):
+        x, y = self
+        return sqrt(x * x + y * y)
+
+    @property
+    def angle(self):
+        """The angle made against the x axis in radians"""
+        return math.atan2(self[1], self[0])
+
+    def dot(self, rhs):
+        return self[0] * rhs[0] + self[1] * rhs[1]
+
+    def cross(self, rhs):
+        """z component of the cross product"""
+        return self[0] * rhs[1] - self[1] * rhs[0]
+
+    def perpendicular(self):
+        return tuple.__new__(Vec2, (-self[1], self[0]))
+
+    def with_length(self, length):
+        """This vector scaled to the given length, zero stays zero"""
+        x, y = self
+        l = sqrt(x * x + y * y)
+        if not l:
+            return tuple.__new__(Vec2, (0.0, 0.0))
+        k = length / l
+        return tuple.__new__(Vec2, (x * k, y * k))
+
+    def normalised(self):
+        return self.with_length(1.0)
+    normalized = normalised
+
+    def perpendicular_of_length(self, length):
+        """The perpendicular scaled to the given length in one step"""
+        x, y = self
+        l = sqrt(x * x + y * y)
+        if not l:
+            return tuple.__new__(Vec2, (0.0, 0.0))
+        k = length / l
+        return tuple.__new__(Vec2, (-y * k, x * k))
+
+    def distance_to(self, p):
+        dx = p[0] - self[0]
+        dy = p[1] - self[1]
+        return sqrt(dx * dx + dy * dy)
+
+
 class Path(object):
     """SVG path data class"""
 
@@ -638,17 +866,152 @@ class Path(object):
         pass
 
 
+# Affine transforms are SVG matrices (a, b, c, d, e, f), mapping x, y to
+# a*x + c*y + e, b*x + d*y + f
+IDENTITY = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+
+def compose(m1, m2):
+    """The transform applying m2 first and then m1"""
+    a1, b1, c1, d1, e1, f1 = m1
+    a2, b2, c2, d2, e2, f2 = m2
+    return (a1 * a2 + c1 * b2, b1 * a2 + d1 * b2,
+            a1 * c2 + c1 * d2, b1 * c2 + d1 * d2,
+            a1 * e2 + c1 * f2 + e1, b1 * e2 + d1 * f2 + f1)
+
+
+def translation(x, y):
+    return (1.0, 0.0, 0.0, 1.0, x, y)
+
+
+def rotation(angle, cx=0.0, cy=0.0):
+    """Rotation by angle radians around cx, cy"""
+    c = cos(angle)
+    s = sin(angle)
+    return (c, s, -s, c, cx - c * cx + s * cy, cy - s * cx - c * cy)
+
+
+def reflection(angle, cx=0.0, cy=0.0):
+    """Mirror across the line through cx, cy at angle radians"""
+    c = cos(2 * angle)
+    s = sin(2 * angle)
+    return (c, s, s, -c, cx - c * cx - s * cy, cy - s * cx + c * cy)
+
+
+def format_transform(matrix, accuracy=6):
+    """The SVG transform attribute for a matrix, '' for the identity"""
+    a, b, c, d, e, f = matrix
+    if (a, b, c, d) == (1.0, 0.0, 0.0, 1.0):
+        if not e and not f:
+            return ''
+        return 'translate(%s,%s)' % (format_number(e, accuracy),
+                                     format_number(f, accuracy))
+    return 'matrix(%s)' % ','.join(format_number(v, accuracy) for v in matrix)
+
+
+def transform_path(path, matrix):
+    """
+    Path data moved by a rigid transform (rotations, mirrors and moves).
+    Arcs keep their radii, only their end points, axis angle and, when
+    mirrored, sweep flag change. With no rotation or mirror only the
+    absolute coordinates are moved and the commands stay the same.
+    """
+    a, b, c, d, e, f = matrix
+    p = Path()
+    out = p.d
+    if (a, b, c, d) == (1.0, 0.0, 0.0, 1.0):
+        for cmd, args in path:
+            if cmd in 'MLTCSQ':
+                args = [v + (f if i % 2 else e) for i, v in enumerate(args)]
+            elif cmd == 'A':
+                args = args[:5] + [args[5] + e, args[6] + f]
+            elif cmd == 'H':
+                args = [args[0] + e]
+            elif cmd == 'V':
+                args = [args[0] + f]
+            else:
+                args = list(args)
+            out.append([cmd, args])
+        return p
+
+    def full(x, y):
+        return [a * x + c * y + e, b * x + d * y + f]
+
+    def linear(x, y):
+        return [a * x + c * y, b * x + d * y]
+
+    flip = a * d - b * c < 0
+    # Arc axes turn with the x axis, a mirror also reverses their angle
+    turn = math.degrees(math.atan2(b, a))
+    x = y = sx = sy = 0.0
+    for cmd, args in path:
+        up = cmd.upper()
+        if up == 'Z':
+            out.append([cmd, []])
+            x, y = sx, sy
+            continue
+        # A path starting with m starts at an absolute point
+        rel = cmd != up and bool(out)
+        if up == 'H':
+            up, args = 'L', [args[0], 0.0 if rel else y]
+        elif up == 'V':
+            up, args = 'L', [0.0 if rel else x, args[0]]
+        move = linear if rel else full
+        if up == 'A':
+            rx, ry, xar, laf, sf = args[:5]
+            if flip:
+                new = [rx, ry, (turn - xar) % 360, laf, 1 - sf]
+            else:
+                new = [rx, ry, (turn + xar) % 360, laf, sf]
+            new += move(*args[5:])
+        else:
+            new = []
+            for i in range(0, len(args), 2):
+                new.extend(move(args[i], args[i + 1]))
+        out.append([up.lower() if rel else up, new])
+        if rel:
+            x, y = x + args[-2], y + args[-1]
+        else:
+            x, y = args[-2:]
+        if up == 'M':
+            sx, sy = x, y
+    return p
+
+
 class Piece(object):
     """
     Base class for all pattern pieces
+
+    The outline is built once with the piece at the origin and kept, moving,
+    rotating or mirroring the piece only changes its transform, and the
+    placed path is the kept outline mapped through it. start_loc is where
+    the origin of the piece goes. The notch edges are placed by start_loc
+    alone, they do not follow rotations and mirrors.
+
+    Setting one of the attributes named in shape, or calling set_seams on
+    the seam pieces, drops the kept outline and it is built again.
     """
 
+    # Attributes the outline is built from
+    shape = ()
+
     def __init__(self, label='', name=''):
         self.label = label
         self.name = name
         self._d = Path()
         self._path = Path()
-        self.start_loc = (0, 0)
+        self._local = None
+        self.matrix = IDENTITY
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name in self.shape:
+            self.invalidate()
+
+    def invalidate(self):
+        """Drop the kept outline, after a change to the piece's shape"""
+        self._local = None
+        self._path = Path()
 
     def _build_path(self):
         pass
@@ -656,9 +1019,57 @@ class Piece(object):
     @property
     def path(self):
         if len(self._path) == 0:
-            self._build_path()
+            self._path = transform_path(self.local_path, self.matrix)
         return self._path
 
+    @property
+    def local_path(self):
+        """The outline with the piece's origin at 0, 0"""
+        if self._local is None:
+            matrix = self.matrix
+            self.matrix = IDENTITY
+            self._build_path()
+            self._local = self._path
+            self._path = Path()
+            self.matrix = matrix
+        return self._local
+
+    @property
+    def svg_transform(self):
+        """The transform attribute placing local_path like path"""
+        return format_transform(self.matrix)
+
+    def _get_start_loc(self):
+        return self.matrix[4], self.matrix[5]
+
+    def _set_start_loc(self, loc):
+        self.matrix = self.matrix[:4] + (loc[0], loc[1])
+        self._path = Path()
+    start_loc = property(_get_start_loc, _set_start_loc)
+
+    def transform(self, matrix):
+        """Apply matrix after the current placement, returns the piece"""
+        self.matrix = compose(matrix, self.matrix)
+        self._path = Path()
+        return self
+
+    def translate(self, dx, dy):
+        return self.transform(translation(dx, dy))
+
+    def rotate(self, angle, center=None):
+        """Rotate by angle radians around center, the start location if None"""
+        cx, cy = center or self.start_loc
+        return self.transform(rotation(angle, cx, cy))
+
+    def mirror(self, angle=pi / 2, center=None):
+        """
+        Mirror across the line at angle radians through center, the start
+        location if None. The default line is vertical, flipping left and
+        right.
+        """
+        cx, cy = center or self.start_loc
+        return self.transform(reflection(angle, cx, cy))
+
     @property
     def svg_id(self):
         ret = self.label
@@ -666,14 +1077,14 @@ class Piece(object):
             ret = 'piece_'
         return ret + str(randint(1, 50000))
 
-    # TODO: Made this into a property with getters and setters
     def set_start_loc(self, x, y):
         self.start_loc = (x, y)
-        self._build_path()
 
 
 class DomePiece(Piece):
 
+    shape = ('angle', 'outer_radius', 'inner_radius', 'thickness')
+
     def __init__(self, _id, angle, radius, thickness):
         super(DomePiece, self).__init__()
         self.id = _id
@@ -687,6 +1098,21 @@ class DomePiece(Piece):
     def radius(self):
         return self.outer_radius
 
+    def notch_edges(self, size):
+        """
+        The outer and inner arcs, with notch ticks going size into the piece.
+        The arcs of neighbouring rings are the same length so their notches
+        line up.
+        """
+        cx, cy = self.start_loc
+        return self._notch_edges(cx, cy, -size, -size)
+
+    def _notch_edges(self, cx, cy, outer, inner):
+        r1 = self.outer_radius
+        r2 = self.inner_radius
+        return [arc_edge(cx, cy, r1, 1, outer, self.angle * r1),
+                arc_edge(cx, cy, r2, -1, inner, self.angle * r2)]
+
     @staticmethod
     def get_arch_flags(angle):
         if angle <= pi:
@@ -724,4 +1150,144 @@ class DomePiece(Piece):
         p.L(sx, sy)
         p.Z()
 
-        self._path = p
\ No newline at end of file
+        self._path = p
+
+
+class RectPattern(Piece):
+    """Rectangular pattern piece class"""
+
+    shape = ('width', 'height')
+
+    def __init__(self, width, height, label='', name=''):
+        super(RectPattern, self).__init__(label, name)
+        self.width = width
+        self.height = height
+
+    def _build_path(self):
+        w = self.width
+        h = self.height
+        sx, sy = self.start_loc
+
+        p = Path()
+        p.M(sx, sy)
+        p.l(w, 0.0)
+        p.l(0.0, h)
+        p.l(-w, 0.0)
+        p.l(0.0, -h)
+        p.z()
+
+        self._path = p
+
+    def notch_edge(self, side, size, loop, repeats=1, offset=0.0):
+        """
+        The 'bottom' or 'top' edge, left to right, with notch ticks going size
+        into the piece. See abag_utils.arc_edge for the loop.
+        """
+        return self._notch_edge(side, -size, loop, repeats, offset)
+
+    def _notch_edge(self, side, depth, loop, repeats, offset):
+        sx, sy = self.start_loc
+        if side == 'top':
+            return line_edge(sx, sy + self.height, 0.0, 1, depth, loop,
+                             repeats, offset, self.width)
+        return line_edge(sx, sy, 0.0, -1, depth, loop, repeats, offset,
+                         self.width)
+
+
+class RectSeamPattern(RectPattern):
+
+    left = 0
+    right = 0
+    top = 0
+    bottom = 0
+    shape = RectPattern.shape + ('bottom', 'right', 'top', 'left')
+
+    def __init__(self, width, height, label='', name='', seams={}):
+        super(RectSeamPattern, self).__init__(width, height, label, name)
+        self._set_seams(seams)
+
+    @classmethod
+    def from_rect(cls, rect, seams={}):
+        label = "%sS" % rect.label
+        name = "%s Seam" % rect.name
+
+        new = cls(rect.width, rect.height, label, name, seams)
+        new.start_loc = rect.start_loc
+        return new
+
+    def _build_path(self):
+        # Grow the plain rectangle, its edges run bottom, right, top and left
+        # from the start location.
+        from abag_offset import offset_path
+        super(RectSeamPattern, self)._build_path()
+        seams = (self.bottom, self.right, self.top, self.left)
+        self._path = offset_path(self._path, seams)
+
+    def notch_edge(self, side, size, loop, repeats=1, offset=0.0):
+        # Ticks from the sewing line out to the cut line
+        depth = getattr(self, side) or -size
+        return self._notch_edge(side, depth, loop, repeats, offset)
+
+    def _set_seams(self, seams):
+        if isinstance(seams, dict):
+            if 'top' in seams:
+                self.top = seams['top']
+            if 'right' in seams:
+                self.right = seams['right']
+            if 'bottom' in seams:
+                self.bottom = seams['bottom']
+            if 'left' in seams:
+                self.left = seams['left']
+        else:
+            self.top = self.right = self.bottom = self.left = seams
+    set_seams = _set_seams
+
+
+class DomeSeamPiece(DomePiece):
+
+    outer = 0
+    inner = 0
+    end = 0
+    shape = DomePiece.shape + ('outer', 'inner', 'end')
+
+    def __init__(self, _id, angle, radius, thickness, **kwargs):
+        super(DomeSeamPiece, self).__init__(_id, angle, radius, thickness)
+        self._set_seams(kwargs)
+
+    @classmethod
+    def from_dome_piece(cls, piece):
+        pid = piece.id
+        angle = piece.angle
+        radius = piece.radius
+        thickness = piece.thickness
+
+        new = cls(pid, angle, radius, thickness)
+        new.start_loc = piece.start_loc
+        return new
+
+    def _build_path(self):
+        # Grow the plain dome piece by the seams. Its edges run outer arc, end,
+        # inner arc then start, the mitre joins turn the end seams into
+        # rectangular caps on each end of the circular segment.
+        from abag_offset import offset_path
+        super(DomeSeamPiece, self)._build_path()
+        seams = (self.outer, self.end, self.inner, self.end)
+        self._path = offset_path(self._path, seams)
+
+    def notch_edges(self, size):
+        # Ticks from the sewing line out to the cut line
+        cx, cy = self.start_loc
+        return self._notch_edges(cx, cy, self.outer or -size,
+                                 self.inner or -size)
+
+    def _set_seams(self, seams):
+        if isinstance(seams, dict):
+            if 'outer' in seams:
+                self.outer = seams['outer']
+            if 'inner' in seams:
+                self.inner = seams['inner']
+            if 'end' in seams:
+                self.end = seams['end']
+        else:
+            self.outer = self.inner = self.end = seams
+    set_seams = _set_seams
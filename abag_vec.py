@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+abag_vec.py
+Batch 2D vector operations on numpy arrays of points
+Copyright (C) 2014 Samuel Hodges <octerman@gmail.com>
+
+This program is free software: you can redistribute it and/or modify it
+under the terms of the GNU General Public License as published by the
+Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along
+with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+The numpy counterpart of abag_utils.Vec2. Every function takes arrays of
+shape (n, 2) and returns a new array, lengths are arrays of shape (n,) or a
+single number for all the vectors.
+"""
+import numpy as np
+
+
+def points(seq):
+    """An (n, 2) float array from a sequence of points"""
+    return np.asarray(seq, dtype=float).reshape(-1, 2)
+
+
+def from_points(p1, p2):
+    """The vectors from each point in p1 to the matching point in p2"""
+    return p2 - p1
+
+
+def from_polar(length, angle):
+    return np.column_stack((length * np.cos(angle), length * np.sin(angle)))
+
+
+def length(v):
+    return np.hypot(v[:, 0], v[:, 1])
+
+
+def dot(a, b):
+    return a[:, 0] * b[:, 0] + a[:, 1] * b[:, 1]
+
+
+def cross(a, b):
+    """z components of the cross products"""
+    return a[:, 0] * b[:, 1] - a[:, 1] * b[:, 0]
+
+
+def perpendicular(v):
+    return np.column_stack((-v[:, 1], v[:, 0]))
+
+
+def _scale(v, length):
+    l = np.hypot(v[:, 0], v[:, 1])
+    k = np.divide(length, l, out=np.zeros_like(l), where=l != 0)
+    return k[:, None]
+
+
+def with_length(v, length):
+    """The vectors scaled to the given lengths, zero vectors stay zero"""
+    return v * _scale(v, length)
+
+
+def normalised(v):
+    return v * _scale(v, 1.0)
+normalized = normalised
+
+
+def perpendicular_of_length(v, length):
+    """The perpendiculars scaled to the given lengths in one step"""
+    k = _scale(v, length)
+    return np.column_stack((-v[:, 1], v[:, 0])) * k
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+bench.py
+Micro-benchmarks for the abag-inkex helpers
+
+Every benchmark is timed with timeit and reported in microseconds per call,
+benchmarks in the same group are meant to be compared with each other.
+
+Usage:
+    python tests/bench.py [group ...]
+"""
+import os
+import sys
+import timeit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+for p in (os.path.dirname(HERE), os.path.join(HERE, 'stub')):
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+# group: [(name, setup, statement), ...]
+BENCHMARKS = {}
+
+
+def bench(group, name, stmt, setup='pass'):
+    BENCHMARKS.setdefault(group, []).append((name, setup, stmt))
+
+
+# The end seam cap of a dome piece: the perpendicular of the vector between
+# two points, scaled to the seam allowance.
+bench('vector', 'Vector2 cap', '''
+v = Vector2.from_points(p1, p2)
+vp = v.perpendicular()
+vp.set_length(s)
+''', 'from abag_utils import Vector2\n'
+     'p1 = (536.95, 232.76); p2 = (443.20, 399.63); s = 24.8')
+bench('vector', 'Vec2 cap', '''
+vp = Vec2.from_points(p1, p2).perpendicular_of_length(s)
+''', 'from abag_utils import Vec2\n'
+     'p1 = (536.95, 232.76); p2 = (443.20, 399.63); s = 24.8')
+bench('vector', 'Vector2 add scale', 'v = (a + b) * 2.0',
+      'from abag_utils import Vector2\n'
+      'a = Vector2(1.0, 2.0); b = Vector2(3.0, 4.0)')
+bench('vector', 'Vec2 add scale', 'v = (a + b) * 2.0',
+      'from abag_utils import Vec2\n'
+      'a = Vec2(1.0, 2.0); b = Vec2(3.0, 4.0)')
+bench('vector', 'abag_vec cap x1000 (per cap)', '''
+vp = abag_vec.perpendicular_of_length(abag_vec.from_points(p1, p2), s)
+''', 'import numpy as np\nimport abag_vec\n'
+     'p1 = np.random.rand(1000, 2); p2 = np.random.rand(1000, 2); s = 24.8',
+)
+
+# Gore data for a 500 ring dome
+bench('profile', 'make_segment_data 500', 'make_segment_data(10.0, 500)',
+      'from abag_utils import make_segment_data')
+bench('profile', 'make_profile_data 500', 'make_profile_data(p, 500)',
+      'from abag_profile import ellipsoid, make_profile_data\n'
+      'p = ellipsoid(20.0, 12.0)')
+
+# Placing a seamed dome piece: building its outline at the new place against
+# moving the outline built once at the origin
+bench('piece', 'DomeSeamPiece rebuild',
+      'p.start_loc = (x, y); p._build_path()',
+      'from abag_utils import DomeSeamPiece\n'
+      'p = DomeSeamPiece(3, 0.7, 30.0, 4.0, outer=1.0, inner=1.0, end=0.5)\n'
+      'x = 12.5; y = 40.0')
+bench('piece', 'DomeSeamPiece move', 'p.set_start_loc(x, y); p.path',
+      'from abag_utils import DomeSeamPiece\n'
+      'p = DomeSeamPiece(3, 0.7, 30.0, 4.0, outer=1.0, inner=1.0, end=0.5)\n'
+      'x = 12.5; y = 40.0; p.local_path')
+bench('piece', 'DomeSeamPiece rotate', 'p.rotate(0.1); p.path',
+      'from abag_utils import DomeSeamPiece\n'
+      'p = DomeSeamPiece(3, 0.7, 30.0, 4.0, outer=1.0, inner=1.0, end=0.5)\n'
+      'p.local_path')
+
+# Dome radii for a price list of capacities
+bench('capacity', 'radius_for_capacity x1000 (per capacity)',
+      'radius_for_capacity(v, 8)',
+      'import numpy as np\n'
+      'from abag_capacity import radius_for_capacity\n'
+      'v = np.linspace(1.0, 60.0, 1000)')
+
+# One label arc, the attribute dict built with inkex.addNS for every
+# element against the keys resolved once by abag_nodes
+bench('nodes', 'arc addNS dict', 'arc(p, 10.0, 10.0, 5.0, 6.0, se, "a1")',
+      'import inkex\n'
+      'from abag_utils import DEFAULT_STYLE\n'
+      'def arc(parent, rx, ry, cx, cy, start_end, nid):\n'
+      '    attrs = {"style": str(inkex.Style(DEFAULT_STYLE))}\n'
+      '    attrs.update({\n'
+      '        inkex.addNS("cx", "sodipodi"): str(cx),\n'
+      '        inkex.addNS("cy", "sodipodi"): str(cy),\n'
+      '        inkex.addNS("rx", "sodipodi"): str(rx),\n'
+      '        inkex.addNS("ry", "sodipodi"): str(ry),\n'
+      '        inkex.addNS("start", "sodipodi"): str(start_end[0]),\n'
+      '        inkex.addNS("end", "sodipodi"): str(start_end[1]),\n'
+      '        inkex.addNS("open", "sodipodi"): "True",\n'
+      '        inkex.addNS("type", "sodipodi"): "arc",\n'
+      '        "transform": ""})\n'
+      '    attrs["id"] = nid\n'
+      '    return inkex.etree.SubElement(parent, inkex.addNS("path", "svg"),\n'
+      '                                  attrs)\n'
+      'p = inkex.etree.Element("g"); se = (0.1, 0.5)')
+bench('nodes', 'arc abag_nodes', 'ellipse_id(r, c, p, "a1", se)',
+      'import inkex\n'
+      'from abag_utils import ellipse_id\n'
+      'p = inkex.etree.Element("g"); se = (0.1, 0.5)\n'
+      'r = (10.0, 10.0); c = (5.0, 6.0)')
+bench('nodes', 'text addNS', '''
+el = inkex.etree.SubElement(p, inkex.addNS("text", "svg"))
+el.set("style", str(inkex.Style(style)))
+el.set("x", str(212))
+el.set("y", str(40.5))
+el.text = "B1"
+''', 'import inkex\n'
+     'p = inkex.etree.Element("g")\n'
+     'style = {"font-size": "12px", "fill-opacity": "1.0", "stroke": "none",\n'
+     '         "font-weight": "normal", "font-style": "normal",\n'
+     '         "fill": "#000"}')
+bench('nodes', 'text abag_nodes', 'svg_add_text(p, 212, 40.5, "B1")',
+      'import inkex\n'
+      'from abag_bagpat import svg_add_text\n'
+      'p = inkex.etree.Element("g")')
+
+# PNG thumbnail of a laid out 8 segment pattern
+bench('raster', 'thumbnail 128', 'png_bytes(thumbnail(m, 128))',
+      'from abag_model import PatternModel\n'
+      'from abag_raster import thumbnail, png_bytes\n'
+      'm = PatternModel.from_dimensions(30.0, 8, 2)')
+bench('raster', 'thumbnail 512', 'png_bytes(thumbnail(m, 512))',
+      'from abag_model import PatternModel\n'
+      'from abag_raster import thumbnail, png_bytes\n'
+      'm = PatternModel.from_dimensions(30.0, 8, 2)')
+
+# One pattern out of a 1000 entry archive
+bench('archive', 'lookup 1000', 'a[p]',
+      'import os, tempfile\n'
+      'from abag_archive import ArchiveWriter, Archive\n'
+      'path = os.path.join(tempfile.mkdtemp(), "bench.abag")\n'
+      'w = ArchiveWriter(path)\n'
+      'for i in range(1000): w.add({"radius": i}, b"<svg/>" * 100)\n'
+      'w.close()\n'
+      'a = Archive(path); p = {"radius": 500}')
+
+# Scoring the candidates of one segment count, and the front of a size run
+bench('optimize', 'evaluate 8 segments x4 seams', 'evaluate(job)',
+      'from abag_optimize import evaluate\n'
+      'job = (20.0, 8, (1, 2, 3, 4), (None,), (1.0, 1.0, 1.0, 1.0), 150.0)')
+bench('optimize', 'pareto_front 2000', 'pareto_front(s)',
+      'import numpy as np\nfrom abag_optimize import pareto_front\n'
+      's = np.random.rand(2000, 3)')
+
+# Strip joins for every strip of a 100 size grading run in one pass
+bench('strips', 'plan_joins x300 (per strip)',
+      'plan_joins(l, 140.0, 1.0, 1.0, 1.0, s)',
+      'import numpy as np\nfrom abag_strips import mark_step, plan_joins\n'
+      'r = np.repeat(np.linspace(10.0, 80.0, 100), 3)\n'
+      'l = 2 * np.pi * r; s = mark_step(r, 2, 2)')
+
+# Compressing a rendered catalogue pattern at the fastest, default and
+# smallest levels
+for level in (1, 6, 9):
+    bench('svgz', 'compress level %i' % level, 'compress(d, %i)' % level,
+          'from abag_svgz import compress\n'
+          'from abag_archive import render_pattern\n'
+          'd = render_pattern({"radius": 30, "segments": 32})')
+
+# Calls per batch for the benchmarks timing a whole array at once
+PER_CALL = {'abag_vec cap x1000 (per cap)': 1000,
+            'radius_for_capacity x1000 (per capacity)': 1000,
+            'plan_joins x300 (per strip)': 300}
+
+
+def run(groups=None, repeat=3):
+    results = []
+    for group in sorted(BENCHMARKS):
+        if groups and group not in groups:
+            continue
+        for name, setup, stmt in BENCHMARKS[group]:
+            timer = timeit.Timer(stmt, setup)
+            number = 1
+            while timer.timeit(number) < 0.2:
+                number *= 10
+            best = min(timer.repeat(repeat, number)) / number
+            best /= PER_CALL.get(name, 1)
+            results.append((group, name, best * 1e6))
+    return results
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    for group, name, usec in run(argv):
+        sys.stdout.write("%-10s %-32s %10.3f us\n" % (group, name, usec))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+compare_runtimes.py
+Wall time of the harness fixtures on the old Python 2 / inkex 0.48 tree
+against this one
+
+The old tree is exported from git into a temporary folder and both trees
+run the fixtures of this harness, each in its own interpreter, on the
+same blank document. Every fixture is run once to warm up the lazy imports
+and then timed repeat times, the best time is reported. The timing covers
+a whole run of the effect: parsing the arguments and the document, the
+effect and writing the result.
+
+This file is run by the old interpreter too, it has to stay valid Python 2.
+
+Usage:
+    python3 tests/compare_runtimes.py [--old-python=python2] [--old-rev=REV]
+                                      [--repeat=5] [fixture ...]
+"""
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+# The last revision running on Python 2 with inkex 0.48
+OLD_REV = 'b595020'
+REPEAT = 5
+
+
+def time_fixtures(root, fixtures, repeat):
+    """
+    Best wall time in seconds of each fixture run on the tree at root with
+    the running interpreter, None where the fixture fails there.
+    """
+    for p in (root, os.path.join(root, 'tests', 'stub')):
+        sys.path.insert(0, p)
+    blank = os.path.join(root, 'tests', 'blank.svg')
+    out = open(os.devnull, 'wb')
+    times = {}
+    for name in sorted(fixtures):
+        module, cls, args = fixtures[name]
+        args = args + [blank]
+        best = None
+        try:
+            mod = __import__(module)
+            for i in range(repeat + 1):
+                effect = getattr(mod, cls)()
+                start = time.time()
+                if hasattr(effect, 'run'):
+                    effect.run(args, output=out)
+                else:
+                    # inkex 0.48 writes the document to sys.stdout
+                    stdout = sys.stdout
+                    sys.stdout = out
+                    try:
+                        effect.affect(args)
+                    finally:
+                        sys.stdout = stdout
+                seconds = time.time() - start
+                if i and (best is None or seconds < best):
+                    best = seconds
+        except Exception as e:
+            sys.stderr.write("%s: %s\n" % (name, e))
+            best = None
+        times[name] = best
+    out.close()
+    return times
+
+
+def run_tree(python, root, fixtures, repeat):
+    """time_fixtures for the tree at root in another interpreter"""
+    cmd = python + [os.path.abspath(__file__), '--child', root,
+                    json.dumps(fixtures), str(repeat)]
+    return json.loads(subprocess.check_output(cmd).decode('utf-8'))
+
+
+def export_tree(rev, directory):
+    """Write the files of the git revision rev into directory"""
+    archive = subprocess.Popen(['git', 'archive', rev], cwd=ROOT,
+                               stdout=subprocess.PIPE)
+    with tarfile.open(fileobj=archive.stdout, mode='r|') as tar:
+        tar.extractall(directory)
+    if archive.wait():
+        raise RuntimeError("git archive %s failed" % rev)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == '--child':
+        root, fixtures, repeat = argv[1:4]
+        sys.stdout.write(json.dumps(time_fixtures(root, json.loads(fixtures),
+                                                  int(repeat))))
+        return 0
+
+    sys.path.insert(0, HERE)
+    import harness
+
+    old_python = ['python2']
+    rev = OLD_REV
+    repeat = REPEAT
+    names = []
+    for a in argv:
+        if a.startswith('--old-python='):
+            old_python = shlex.split(a.split('=', 1)[1])
+        elif a.startswith('--old-rev='):
+            rev = a.split('=', 1)[1]
+        elif a.startswith('--repeat='):
+            repeat = int(a.split('=', 1)[1])
+        else:
+            names.append(a)
+    fixtures = dict((name, harness.FIXTURES[name])
+                    for name in names or harness.FIXTURES)
+
+    old_root = tempfile.mkdtemp(prefix='abag-old-')
+    try:
+        export_tree(rev, old_root)
+        old = run_tree(old_python, old_root, fixtures, repeat)
+    finally:
+        shutil.rmtree(old_root)
+    new = run_tree([sys.executable], ROOT, fixtures, repeat)
+
+    sys.stdout.write("%-20s %10s %10s %8s\n" % ('fixture', 'old s', 'new s',
+                                                'speedup'))
+    for name in sorted(fixtures):
+        a = old.get(name)
+        b = new.get(name)
+        sys.stdout.write("%-20s %10s %10s %8s\n" % (
+            name, '%.4f' % a if a else '-', '%.4f' % b if b else '-',
+            '%.2fx' % (a / b) if a and b else '-'))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
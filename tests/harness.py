@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+harness.py
+Headless golden output and performance harness for the abag-inkex effects
+
+The effects run in-process against tests/blank.svg using the inkex stand-in
+in tests/stub. Their output is canonicalised (ids renumbered, attributes
+and styles sorted, numbers rounded) and compared with tests/golden. Wall
+time and allocations are recorded for every fixture.
+
+Usage:
+    python tests/harness.py            # compare and report
+    python tests/harness.py --update   # rewrite the golden files
+"""
+import gc
+import io
+import json
+import os
+import random
+import re
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+for p in (ROOT, os.path.join(HERE, 'stub')):
+    if p not in sys.path:
+        sys.path.insert(0, p)
+
+import tracemalloc
+from lxml import etree
+from abag_utils import format_number
+
+BLANK = os.path.join(HERE, 'blank.svg')
+GOLDEN = os.path.join(HERE, 'golden')
+PERF = os.path.join(GOLDEN, 'perf.json')
+
+# Allowed growth of the allocations over the recorded baseline
+ALLOC_TOLERANCE = 1.5
+
+# name: (module, effect class, arguments)
+FIXTURES = {
+    'bagpat_default': ('abag_bagpat', 'Abagpat', []),
+    'bagpat_seams': ('abag_bagpat', 'Abagpat', [
+        '--segments=6', '--seams=2', '--addSeamAllowence=true',
+        '--seamAllowenceInner=0.5', '--seamAllowenceOuter=1.0',
+        '--seamAllowenceEnd=0.7', '--seamAllowenceOther=0.3']),
+    'bagpat_info': ('abag_bagpat', 'Abagpat', [
+        '--radius=15', '--showSegData=true', '--showSegLabel=false']),
+    'bagpat_capacity': ('abag_bagpat', 'Abagpat', [
+        '--capacity=12', '--segments=6', '--showSegData=true']),
+    'bagpat_arcs': ('abag_bagpat', 'Abagpat', [
+        '--addSeamAllowence=true', '--seamAllowenceOuter=1.0',
+        '--arcPaths=true', '--sodipodiArcs=false']),
+    'bagpat_compound': ('abag_bagpat', 'Abagpat', [
+        '--segments=8', '--compoundPaths=true', '--addSeamAllowence=true',
+        '--seamAllowenceEnd=0.5']),
+    'bagpat_large': ('abag_bagpat', 'Abagpat', [
+        '--segments=120', '--addSeamAllowence=true',
+        '--seamAllowenceInner=0.5', '--seamAllowenceOuter=0.5',
+        '--seamAllowenceEnd=0.5']),
+    'bagpat_notches': ('abag_bagpat', 'Abagpat', [
+        '--segments=5', '--seams=2', '--notches=2', '--addSeamAllowence=true',
+        '--seamAllowenceOuter=1.0', '--seamAllowenceOther=0.5']),
+    'bagpat_strips': ('abag_bagpat', 'Abagpat', [
+        '--radius=30', '--maxStripLength=140', '--addSeamAllowence=true',
+        '--seamAllowenceOther=1.0', '--seamAllowenceJoin=1.5',
+        '--notches=2']),
+    'bagpat_range': ('abag_bagpat', 'Abagpat', [
+        '--segments=200', '--onlyRender=true', '--renderSegmentsFrom=120',
+        '--renderSegmentsTo=122', '--addSeamAllowence=true',
+        '--seamAllowenceOuter=0.5']),
+    'bagpat_preview': ('abag_bagpat', 'Abagpat', [
+        '--segments=20', '--preview=true', '--addSeamAllowence=true',
+        '--previewCache=' + os.devnull]),
+    'domepat_default': ('abag_domepat', 'Domepat', []),
+    'domepat_seams': ('abag_domepat', 'Domepat', [
+        '--radius=20', '--segments=10', '--seams=3']),
+    'domepat_arcs': ('abag_domepat', 'Domepat', [
+        '--segments=6', '--seams=2', '--arcPaths=true']),
+    'domepat_oblate': ('abag_domepat', 'Domepat', [
+        '--radius=20', '--segments=10', '--height=12']),
+}
+
+_number_re = re.compile(r'-?(?:\d+\.\d*|\.\d+)(?:[eE][-+]?\d+)?|-?\d+[eE][-+]?\d+')
+_href = '{http://www.w3.org/1999/xlink}href'
+
+
+def run_effect(module, cls, args, filename=BLANK):
+    """
+    Run an effect on filename and return (document, seconds, allocations).
+    Allocations are the memory blocks allocated and still held afterwards
+    (tracemalloc). The effect is run once beforehand so lazy imports are
+    not counted.
+    """
+    mod = __import__(module)
+    getattr(mod, cls)().run(args + [filename], output=io.BytesIO())
+    random.seed(0)
+    effect = getattr(mod, cls)()
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    start = time.time()
+    effect.run(args + [filename], output=io.BytesIO())
+    seconds = time.time() - start
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, 'filename')
+    allocs = sum(s.count_diff for s in stats if s.count_diff > 0)
+    return effect.document, seconds, allocs
+
+
+def _round(m):
+    return format_number(float(m.group(0)), 4)
+
+
+def canonicalize(document):
+    """Return the document as a stable, comparable string"""
+    root = etree.fromstring(etree.tostring(document),
+                            etree.XMLParser(remove_blank_text=True))
+    ids = {}
+    for el in root.iter():
+        if el.get('id') is not None:
+            ids[el.get('id')] = 'id%i' % (len(ids) + 1)
+
+    for el in root.iter():
+        if not isinstance(el.tag, str):
+            continue
+        attrs = sorted(el.attrib.items())
+        el.attrib.clear()
+        for key, val in attrs:
+            if key == 'id':
+                val = ids[val]
+            elif key == _href and val[1:] in ids:
+                val = '#' + ids[val[1:]]
+            elif key == 'style':
+                val = ';'.join(sorted(val.split(';')))
+            val = _number_re.sub(_round, val)
+            el.set(key, val)
+        if el.text and el.text.strip():
+            el.text = _number_re.sub(_round, el.text)
+        if el.tail is not None and not el.tail.strip():
+            el.tail = None
+    return etree.tostring(root, pretty_print=True).decode('utf-8')
+
+
+def golden_path(name):
+    return os.path.join(GOLDEN, name + '.svg')
+
+
+def load_perf():
+    if not os.path.exists(PERF):
+        return {}
+    with open(PERF) as fh:
+        return json.load(fh)
+
+
+def check(name):
+    """
+    Run a fixture and return (problems, seconds, allocations) where problems
+    is a list of messages, empty when it matches the golden file and the
+    allocation baseline.
+    """
+    module, cls, args = FIXTURES[name]
+    doc, seconds, allocs = run_effect(module, cls, args)
+    problems = []
+
+    with open(golden_path(name)) as fh:
+        expected = fh.read()
+    if canonicalize(doc) != expected:
+        problems.append("%s: output differs from %s" % (name,
+                                                        golden_path(name)))
+
+    base = load_perf().get(name)
+    if base and base.get('kind') == 'tracemalloc' and \
+            allocs > base['allocs'] * ALLOC_TOLERANCE:
+        problems.append("%s: %i allocations, baseline %i" %
+                        (name, allocs, base['allocs']))
+    return problems, seconds, allocs
+
+
+def update(names):
+    perf = load_perf()
+    for name in names:
+        module, cls, args = FIXTURES[name]
+        doc, seconds, allocs = run_effect(module, cls, args)
+        with open(golden_path(name), 'w') as fh:
+            fh.write(canonicalize(doc))
+        perf[name] = {
+            'kind': 'tracemalloc',
+            'allocs': allocs,
+            'seconds': round(seconds, 4)
+        }
+    with open(PERF, 'w') as fh:
+        json.dump(perf, fh, indent=2, sort_keys=True)
+        fh.write('\n')
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    names = [a for a in argv if not a.startswith('--')] or sorted(FIXTURES)
+    if '--update' in argv:
+        update(names)
+        return 0
+
+    failed = 0
+    sys.stdout.write("%-20s %10s %12s\n" % ('fixture', 'seconds', 'allocs'))
+    for name in names:
+        problems, seconds, allocs = check(name)
+        sys.stdout.write("%-20s %10.4f %12i %s\n" %
+                         (name, seconds, allocs, 'FAIL' if problems else 'ok'))
+        for p in problems:
+            sys.stdout.write("    %s\n" % p)
+        failed += bool(problems)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
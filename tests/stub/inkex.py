@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+inkex.py
+In-process stand-in for the parts of Inkscape's inkex (1.x) package used by
+the abag-inkex extensions, so the effects can run headless in tests.
+
+This program is free software: you can redistribute it and/or modify it
+under the terms of the GNU General Public License as published by the
+Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+"""
+import argparse
+import io
+import re
+import sys
+from collections import OrderedDict
+from lxml import etree
+
+NSS = {
+    'sodipodi': 'http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd',
+    'cc': 'http://creativecommons.org/ns#',
+    'svg': 'http://www.w3.org/2000/svg',
+    'dc': 'http://purl.org/dc/elements/1.1/',
+    'rdf': 'http://www.w3.org/1999/02/22-rdf-syntax-ns#',
+    'inkscape': 'http://www.inkscape.org/namespaces/inkscape',
+    'xlink': 'http://www.w3.org/1999/xlink',
+    'xml': 'http://www.w3.org/XML/1998/namespace'
+}
+
+# Pixels per unit, 96 per inch as in Inkscape 1.x
+CONVERSIONS = {
+    'in': 96.0,
+    'pt': 1.3333333333333333,
+    'px': 1.0,
+    'mm': 3.779527559055118,
+    'cm': 37.79527559055118,
+    'm': 3779.527559055118,
+    'km': 3779527.559055118,
+    'Q': 0.94488188976378,
+    'pc': 16.0,
+    'yd': 3456.0,
+    'ft': 1152.0,
+    '': 1.0
+}
+
+_unit_re = re.compile(r'\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*(%s)?'
+                      % '|'.join(u for u in CONVERSIONS if u))
+
+
+def addNS(tag, ns=None):
+    val = tag
+    if ns is not None and len(ns) > 0 and ns in NSS and len(tag) > 0 \
+            and tag[0] != '{':
+        val = "{%s}%s" % (NSS[ns], tag)
+    return val
+
+
+def parse_unit(value, default_unit='px'):
+    m = _unit_re.match(str(value))
+    if not m:
+        return None
+    return float(m.group(1)), m.group(2) or default_unit
+
+
+def convert_unit(value, to_unit, default='px'):
+    parsed = parse_unit(value, default) or (0.0, default)
+    return parsed[0] * CONVERSIONS[parsed[1]] / CONVERSIONS[to_unit]
+
+
+def discover_unit(value, viewbox, default='px'):
+    """The unit one user unit is, from the width and the viewBox width"""
+    value, unit = parse_unit(value) or (100.0, 'px')
+    factor = CONVERSIONS[unit] * value / viewbox
+    for unit, unit_factor in CONVERSIONS.items():
+        if unit and abs(factor - unit_factor) <= factor * 0.01:
+            return unit
+    return default
+
+
+def Boolean(value):
+    """ArgParser function to turn a boolean string into a python boolean"""
+    if value.upper() == 'TRUE':
+        return True
+    if value.upper() == 'FALSE':
+        return False
+    return None
+
+
+def errormsg(msg):
+    sys.stderr.write(str(msg) + "\n")
+
+
+class Style(OrderedDict):
+    """An inline style attribute"""
+
+    def __str__(self):
+        return ";".join("%s:%s" % item for item in self.items())
+
+
+class Vector2d(tuple):
+    def __new__(cls, x=0.0, y=0.0):
+        return tuple.__new__(cls, (float(x), float(y)))
+
+    x = property(lambda self: self[0])
+    y = property(lambda self: self[1])
+
+
+class NamedView(etree.ElementBase):
+    current_layer = property(lambda self: self.get(
+        addNS('current-layer', 'inkscape')))
+
+    @property
+    def center(self):
+        """The view centre in user units"""
+        root = self.getroottree().getroot()
+        return Vector2d(*[root.viewport_to_unit(self.get(
+            addNS(k, 'inkscape')) or 0) for k in ('cx', 'cy')])
+
+
+class SvgDocumentElement(etree.ElementBase):
+
+    @property
+    def unit(self):
+        """The unit of one user unit, px unless a viewBox scales it"""
+        viewbox = [float(v) for v in
+                   re.split(r'[\s,]+', self.get('viewBox', '').strip()) if v]
+        if len(viewbox) == 4 and viewbox[2]:
+            return discover_unit(self.get('width'), viewbox[2])
+        return 'px'
+
+    @property
+    def scale(self):
+        viewbox = [float(v) for v in
+                   re.split(r'[\s,]+', self.get('viewBox', '').strip()) if v]
+        width = convert_unit(self.get('width', '0'), 'px')
+        if len(viewbox) == 4 and viewbox[2] and width:
+            return width / viewbox[2]
+        return 1.0
+
+    def unittouu(self, value):
+        return convert_unit(value, self.unit)
+
+    def uutounit(self, value, to_unit='px'):
+        return convert_unit(value, to_unit, default=self.unit)
+
+    def viewport_to_unit(self, value):
+        return convert_unit(value, 'px') / self.scale
+
+    @property
+    def namedview(self):
+        found = self.findall(addNS('namedview', 'sodipodi'))
+        if found:
+            return found[0]
+        return etree.SubElement(self, addNS('namedview', 'sodipodi'))
+
+    def getElementById(self, eid, elm='*'):
+        for el in self.iter(addNS(elm[4:], 'svg') if elm != '*' else '*'):
+            if el.get('id') == eid:
+                return el
+        return None
+
+    def get_current_layer(self):
+        layer = self.getElementById(self.namedview.current_layer, 'svg:g')
+        if layer is None:
+            return self
+        return layer
+
+
+_lookup = etree.ElementNamespaceClassLookup()
+_lookup.get_namespace(NSS['svg'])['svg'] = SvgDocumentElement
+_lookup.get_namespace(NSS['sodipodi'])['namedview'] = NamedView
+
+
+def load_svg(stream):
+    """Parse a filename, stream or bytes into an element tree"""
+    parser = etree.XMLParser(huge_tree=True)
+    parser.set_element_class_lookup(_lookup)
+    if isinstance(stream, bytes):
+        stream = io.BytesIO(stream)
+    return etree.parse(stream, parser=parser)
+
+
+class EffectExtension(object):
+    """A class for creating Inkscape SVG Effects"""
+
+    def __init__(self):
+        self.file_io = None
+        self.options = argparse.Namespace()
+        self.document = None
+        self.svg = None
+        self.arg_parser = argparse.ArgumentParser(description=self.__doc__)
+        self.arg_parser.add_argument("input_file", nargs="?", default=None)
+        self.arg_parser.add_argument("--output", type=str, default=None)
+        self.arg_parser.add_argument("--id", action="append", type=str,
+                                     dest="ids", default=[])
+        self.add_arguments(self.arg_parser)
+
+    def add_arguments(self, pars):
+        pass
+
+    def effect(self):
+        pass
+
+    def parse_arguments(self, args):
+        self.options = self.arg_parser.parse_args(args)
+
+    def load(self, stream):
+        document = load_svg(stream)
+        self.svg = document.getroot()
+        return document
+
+    def load_raw(self):
+        if isinstance(self.options.input_file, str):
+            with open(self.options.input_file, 'rb') as stream:
+                self.document = self.load(stream)
+        else:
+            self.document = self.load(self.options.input_file)
+
+    def save(self, stream):
+        self.document.write(stream)
+
+    def save_raw(self, ret):
+        if isinstance(self.options.output, str):
+            with open(self.options.output, 'wb') as stream:
+                self.save(stream)
+        else:
+            self.save(self.options.output)
+
+    def run(self, args=None, output=None):
+        if args is None:
+            args = sys.argv[1:]
+        self.parse_arguments(args)
+        if self.options.input_file is None:
+            self.options.input_file = sys.stdin.buffer
+        if self.options.output is None:
+            self.options.output = output or sys.stdout.buffer
+        self.load_raw()
+        self.save_raw(self.effect())
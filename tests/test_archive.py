@@ -0,0 +1,56 @@
+import pytest
+
+abag_archive = pytest.importorskip('abag_archive')
+
+PARAMS = [{'radius': r, 'segments': s} for r in (10, 20.5, 30)
+          for s in (3, 4, 8)]
+
+
+@pytest.fixture
+def archive(tmp_path):
+    path = str(tmp_path / 'catalogue.abag')
+    assert abag_archive.write_archive(path, PARAMS) == len(PARAMS)
+    a = abag_archive.Archive(path)
+    yield a
+    a.close()
+
+
+def test_entries_match_rendering(archive):
+    assert len(archive) == len(PARAMS)
+    for p in PARAMS:
+        assert archive[p] == abag_archive.render_pattern(p)
+    assert archive[{'radius': 30.0, 'segments': 8, 'seams': 1}] == \
+        archive[{'radius': 30, 'segments': 8}]
+
+
+def test_missing_entries(archive):
+    assert {'radius': 10, 'segments': 5} not in archive
+    assert archive.get({'radius': 11}) is None
+    with pytest.raises(KeyError):
+        archive[{'radius': 10, 'segments': 4, 'seamInner': 1.0}]
+    with pytest.raises(ValueError):
+        archive.get({'diameter': 10})
+
+
+def test_iteration_in_write_order(archive):
+    listed = [(p['radius'], p['segments']) for p in archive]
+    assert listed == [(float(p['radius']), p['segments']) for p in PARAMS]
+
+
+def test_rewritten_entry_replaces_old(tmp_path):
+    path = str(tmp_path / 'a.abag')
+    with abag_archive.ArchiveWriter(path) as w:
+        w.add({'radius': 5}, b'old')
+        w.add({'radius': 5}, b'new')
+        w.add({'radius': 6}, b'other')
+    with abag_archive.Archive(path) as a:
+        assert len(a) == 2
+        assert a[{'radius': 5}] == b'new'
+        assert a[{'radius': 6}] == b'other'
+
+
+def test_not_an_archive(tmp_path):
+    path = tmp_path / 'x.abag'
+    path.write_bytes(b'<svg/>' * 20)
+    with pytest.raises(ValueError):
+        abag_archive.Archive(str(path))
@@ -0,0 +1,51 @@
+from math import cos, pi, sin
+
+import pytest
+from lxml import etree
+
+import abag_utils
+from abag_utils import arc_path_data, ellipse_id
+
+SODIPODI = '{http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd}'
+
+
+def end_point(d):
+    """Absolute end point of an M followed by relative arcs"""
+    parts = d.replace('z', '').split('a')
+    x, y = [float(v) for v in parts[0][1:].split()]
+    for arc in parts[1:]:
+        values = [float(v) for v in arc.split()]
+        x += values[5]
+        y += values[6]
+    return x, y
+
+
+@pytest.mark.parametrize('start, end', [(0, 1.0), (0.5, 4.0), (0, 2 * pi),
+                                        (5.0, 1.0)])
+def test_arc_ends_on_the_ellipse(start, end):
+    d = arc_path_data(30.0, 20.0, 100.0, 50.0, start, end)
+    x, y = end_point(d)
+    assert x == pytest.approx(100.0 + 30.0 * cos(end), abs=1e-5)
+    assert y == pytest.approx(50.0 + 20.0 * sin(end), abs=1e-5)
+    assert d.endswith('z') == (end - start == 2 * pi)
+
+
+def test_arcs_are_cached_per_radius():
+    abag_utils._arc_cache.clear()
+    a = arc_path_data(12.5, 12.5, 0, 0, 0, 1.0)
+    b = arc_path_data(12.5, 12.5, 40, 40, 0, 1.0)
+    assert len(abag_utils._arc_cache) == 1
+    assert a.split('a', 1)[1] == b.split('a', 1)[1]
+
+
+def test_plain_path_without_sodipodi():
+    parent = etree.Element('g')
+    node = ellipse_id((10, 10), (0, 0), parent, 'label1', (0, pi),
+                      sodipodi=False)
+    assert node.get('id') == 'label1'
+    assert node.get('d').startswith('M10 0a')
+    assert not [k for k in node.attrib if k.startswith(SODIPODI)]
+
+    node = ellipse_id((10, 10), (0, 0), parent, 'label2', (0, pi),
+                      precompute=True)
+    assert node.get('d') and node.get(SODIPODI + 'type') == 'arc'
@@ -0,0 +1,40 @@
+from math import pi
+
+import numpy as np
+import pytest
+
+abag_capacity = pytest.importorskip('abag_capacity')
+from abag_utils import segment_thickness
+
+
+def test_dome_volume_approaches_hemisphere():
+    ideal = 2 * pi * 10.0 ** 3 / 3
+    coarse = abag_capacity.dome_volume(10.0, 4)
+    fine = abag_capacity.dome_volume(10.0, 200)
+    assert coarse < fine < ideal
+    assert fine == pytest.approx(ideal, rel=1e-4)
+
+
+def test_capacity_adds_the_wall():
+    r, segments = 12.0, 6
+    wall = segment_thickness(r, segments) + 0.5 + 2.0 + 1.5
+    expected = abag_capacity.dome_volume(r, segments) + pi * r * r * wall
+    got = abag_capacity.capacity(r, segments, zip_h=2.0, top_h=0.5,
+                                 bottom_h=1.5)
+    assert got == pytest.approx(expected / 1000.0)
+
+
+def test_radius_for_capacity_round_trip():
+    litres = np.array([0.5, 3.0, 10.0, 25.0, 80.0])
+    radii = abag_capacity.radius_for_capacity(litres, 8, 1.5, 1.0, 1.0)
+    assert np.all(np.diff(radii) > 0)
+    assert np.allclose(abag_capacity.capacity(radii, 8, 1.5, 1.0, 1.0),
+                       litres, rtol=1e-9)
+
+
+def test_radius_for_capacity_scalar_and_invalid():
+    r = abag_capacity.radius_for_capacity(10.0, 4)
+    assert isinstance(r, float)
+    assert abag_capacity.capacity(r, 4) == pytest.approx(10.0)
+    radii = abag_capacity.radius_for_capacity([0.0, -1.0, 2.0], 4)
+    assert np.isnan(radii[:2]).all() and radii[2] > 0
@@ -0,0 +1,58 @@
+import csv
+import io
+import json
+
+import pytest
+
+abag_cutlist = pytest.importorskip('abag_cutlist')
+
+SEAMS = {'inner': 0.5, 'outer': 1.0, 'end': 0.7, 'other': 0.3}
+
+
+def rows(**kwargs):
+    return list(abag_cutlist.cut_list(10.0, 6, 2, seam_allowances=SEAMS,
+                                      **kwargs))
+
+
+def test_csv_round_trip():
+    fh = io.StringIO()
+    abag_cutlist.write_csv(rows(), fh)
+    fh.seek(0)
+    reader = csv.DictReader(fh)
+    assert tuple(reader.fieldnames) == abag_cutlist.FIELDS
+    parsed = list(reader)
+    expected = rows()
+    assert [r['label'] for r in parsed] == [r['label'] for r in expected]
+    for got, want in zip(parsed, expected):
+        assert got['kind'] == want['kind']
+        assert int(got['quantity']) == want['quantity']
+        assert float(got['cut_area']) == pytest.approx(want['cut_area'])
+        # Fields a piece does not have are left empty
+        for key, val in want.items():
+            if val is None:
+                assert got[key] == ''
+
+
+def test_json_round_trip():
+    fh = io.StringIO()
+    abag_cutlist.write_json(rows(), fh)
+    text = fh.getvalue()
+    parsed = json.loads(text)
+    assert parsed == json.loads(json.dumps(rows()))
+    # One piece per line
+    assert len(text.splitlines()) == len(parsed) + 2
+    assert all(sorted(r) == sorted(abag_cutlist.FIELDS) for r in parsed)
+    fh = io.StringIO()
+    abag_cutlist.write_json([], fh)
+    assert json.loads(fh.getvalue()) == []
+
+
+def test_main_writes_file(tmp_path):
+    out = str(tmp_path / 'cut.csv')
+    abag_cutlist.main(['--radius=10', '--segments=4', '--format=csv',
+                       '--seamAllowenceOuter=1', '--output=' + out])
+    with open(out) as fh:
+        parsed = list(csv.DictReader(fh))
+    assert [r['label'] for r in parsed][:2] == ['B1', 'Z1']
+    assert float(parsed[-1]['seam_outer']) == 1.0
+
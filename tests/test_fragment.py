@@ -0,0 +1,38 @@
+import io
+import os
+
+import pytest
+from lxml import etree
+
+import harness
+
+LAYERED = os.path.join(harness.HERE, 'layered.svg')
+
+
+def run_fragment(module, cls, args, filename):
+    mod = __import__(module)
+    harness.random.seed(0)
+    effect = getattr(mod, cls)()
+    effect.run(args + ['--fragment=true', filename], output=io.BytesIO())
+    return effect
+
+
+@pytest.mark.parametrize('name', ['bagpat_seams', 'bagpat_compound',
+                                  'domepat_default'])
+@pytest.mark.parametrize('filename', [harness.BLANK, LAYERED])
+def test_fragment_matches_full_output(name, filename):
+    module, cls, args = harness.FIXTURES[name]
+    doc = harness.run_effect(module, cls, args, filename)[0]
+    effect = run_fragment(module, cls, args, filename)
+    spliced = etree.ElementTree(etree.fromstring(
+        effect.output_data.encode('utf-8')))
+    assert harness.canonicalize(spliced) == harness.canonicalize(doc)
+
+
+def test_fragment_passes_host_through():
+    with open(LAYERED, 'rb') as fh:
+        data = fh.read().decode('utf-8')
+    effect = run_fragment('abag_domepat', 'Domepat', [], LAYERED)
+    i = effect.output_data.index(effect.fragment)
+    assert effect.output_data[:i] + effect.output_data[
+        i + len(effect.fragment):] == data
@@ -0,0 +1,9 @@
+import pytest
+
+import harness
+
+
+@pytest.mark.parametrize('name', sorted(harness.FIXTURES))
+def test_golden(name):
+    problems, seconds, allocs = harness.check(name)
+    assert not problems, '\n'.join(problems)
@@ -0,0 +1,46 @@
+import io
+import struct
+from math import cos, pi
+
+import pytest
+
+abag_mesh = pytest.importorskip('abag_mesh')
+np = abag_mesh.np
+
+
+@pytest.mark.parametrize('segments', [1, 4, 9])
+def test_rings_rebuild_the_sphere(segments):
+    rho, z, mismatch = abag_mesh.ring_profile(10.0, segments)
+    assert abs(rho[0]) < 1e-9 and abs(z[0] - 10.0) < 1e-9
+    assert abs(rho[-1] - 10.0) < 1e-9 and z[-1] == 0.0
+    assert mismatch.max(initial=0.0) < 1e-9
+    # The chords of a regular polygon sag by r(1 - cos(a / 2))
+    expected = 10.0 * (1 - cos(pi / 4 / segments))
+    assert abs(abag_mesh.sphere_deviation(10.0, rho, z) - expected) < 1e-9
+
+
+def test_stl_size():
+    rho, z, mismatch = abag_mesh.ring_profile(10.0, 4)
+    vertices, faces = abag_mesh.dome_mesh(rho, z, 16)
+    # The apex and four rings, a fan then two triangles per quad
+    assert vertices.shape == (1 + 4 * 16, 3)
+    assert faces.shape == (16 + 2 * 3 * 16, 3)
+    fh = io.BytesIO()
+    abag_mesh.write_stl(fh, vertices, faces)
+    data = fh.getvalue()
+    assert struct.unpack('<I', data[80:84])[0] == len(faces)
+    assert len(data) == 84 + 50 * len(faces)
+
+
+@pytest.mark.parametrize('segments', [1, 6])
+def test_mesh_has_no_empty_faces(segments):
+    rho, z, mismatch = abag_mesh.ring_profile(10.0, segments)
+    vertices, faces = abag_mesh.dome_mesh(rho, z)
+    tri = vertices[faces]
+    cross = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+    assert np.sqrt((cross ** 2).sum(axis=1)).min() > 1e-9
+    assert len(np.unique(vertices.round(9), axis=0)) == len(vertices)
+    # The fan is wound like the rest of the surface
+    side = np.sign((cross * tri.mean(axis=1)).sum(axis=1))
+    assert (side == side[0]).all()
+    assert faces.min() == 0 and faces.max() == len(vertices) - 1
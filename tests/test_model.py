@@ -0,0 +1,75 @@
+import pytest
+
+from abag_utils import DomePiece, make_dome_data
+
+abag_model = pytest.importorskip('abag_model')
+np = abag_model.np
+
+SEAMS = {'inner': 0.5, 'outer': 1.0, 'end': 0.7, 'other': 0.3}
+
+
+def test_model_columns():
+    model = abag_model.PatternModel.from_dimensions(10.0, 6, 2)
+    assert len(model) == 4 + 6
+    assert model.label == ['B1', 'Z1', 'Z2', 'Z3', 'S1', 'S2', 'S3', 'S4',
+                           'S5', 'S6']
+    assert model[0].name == 'Body Strip' and model[0].kind == 'rect'
+    assert model[4].kind == 'circle' and model[5].kind == 'sector'
+    assert model[5].quantity == 2
+
+    data, thickness = make_dome_data(10.0, 6)
+    view = model[6]
+    assert view.id == 3
+    assert view.angle == data[3][0] / 2
+    assert abs(view.thickness - thickness) < 1e-12
+
+
+def test_views_write_through():
+    model = abag_model.PatternModel.from_dimensions(10.0, 4)
+    model[5].set_start_loc(3.0, 4.0)
+    assert model.x[5] == 3.0 and model.y[5] == 4.0
+    model.place(1.0, 2.0)
+    assert model[5].start_loc == (1.0, 2.0)
+
+
+def test_view_builds_the_existing_pieces():
+    model = abag_model.PatternModel.from_dimensions(10.0, 4)
+    model.place(100.0, 50.0)
+    view = model[6]
+    expected = DomePiece(view.id, view.angle, view.radius, view.thickness)
+    expected.set_start_loc(100.0, 50.0)
+    assert list(view.piece().path) == list(expected.path)
+
+
+def test_costing_of_a_sector():
+    model = abag_model.PatternModel.from_dimensions(10.0, 4, 1,
+                                                    seam_allowances=SEAMS)
+    area, cut_area, cut_length = model.costing()
+    i = 6
+    r1, r2, a = model.outer_radius[i], model.inner_radius[i], model.angle[i]
+    assert abs(area[i] - a / 2 * (r1 ** 2 - r2 ** 2)) < 1e-9
+    assert cut_area[i] > area[i]
+    assert model.fabric_area() == pytest.approx(
+        (cut_area * model.quantity).sum())
+
+
+@pytest.mark.parametrize('seams', [None, SEAMS])
+def test_bounds_hold_the_outlines(seams):
+    model = abag_model.PatternModel.from_dimensions(10.0, 5, 1,
+                                                    seam_allowances=seams)
+    model.place(20.0, 30.0)
+    x0, y0, x1, y1 = model.bounds()
+    for i in range(len(model)):
+        if model.kind[i] != abag_model.SECTOR:
+            continue
+        piece = model[i].piece()
+        a = np.linspace(0, model.angle[i], 50)
+        for r in (piece.outer_radius, piece.inner_radius):
+            x = 20.0 + r * np.cos(a)
+            y = 30.0 + r * np.sin(a)
+            assert (x >= x0[i] - 1e-9).all() and (x <= x1[i] + 1e-9).all()
+            assert (y >= y0[i] - 1e-9).all() and (y <= y1[i] + 1e-9).all()
+    # circles
+    c = model.label.index('S1')
+    assert x1[c] - x0[c] == pytest.approx(2 * (model.outer_radius[c] +
+                                               model.seam_outer[c]))
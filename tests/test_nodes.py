@@ -0,0 +1,39 @@
+import inkex
+from lxml import etree
+
+import abag_nodes as nodes
+from abag_utils import arc_attrs, ellipse_id
+
+
+def test_keys_match_addns():
+    assert nodes.PATH == inkex.addNS('path', 'svg')
+    assert nodes.LABEL == inkex.addNS('label', 'inkscape')
+    assert nodes.HREF == inkex.addNS('href', 'xlink')
+    assert nodes.ARC_KEYS[4] == inkex.addNS('start', 'sodipodi')
+
+
+def test_style_is_formatted_once():
+    s = {'stroke': '#000000', 'fill': 'none'}
+    assert nodes.style(s) == str(inkex.Style(s))
+    assert nodes.style(dict(s)) is nodes.style(s)
+
+
+def test_arc_node_matches_arc_attrs():
+    parent = etree.Element('g')
+    for precompute, sodipodi in ((False, True), (True, True), (False, False)):
+        el = ellipse_id((10.0, 8.0), (1.0, 2.0), parent, 'a', (0.0, 1.0),
+                        precompute=precompute, sodipodi=sodipodi)
+        expected = arc_attrs(10.0, 8.0, 1.0, 2.0, (0.0, 1.0),
+                             precompute=precompute, sodipodi=sodipodi)
+        expected['id'] = 'a'
+        assert dict(el.attrib) == expected
+        assert el.tag == nodes.PATH
+
+
+def test_text_path():
+    parent = etree.Element('g')
+    t = nodes.text_path(parent, 'arc1', 'S1', 'font-size:3', '6%')
+    assert parent[-1] is t and t.tag == nodes.TEXT
+    tp = t[0]
+    assert tp.tag == nodes.TEXT_PATH and tp.text == 'S1'
+    assert tp.get(nodes.HREF) == '#arc1' and tp.get('startOffset') == '6%'
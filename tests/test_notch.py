@@ -0,0 +1,62 @@
+from math import atan2
+
+import pytest
+
+from abag_utils import DomePiece, make_dome_data, line_edge
+
+abag_notch = pytest.importorskip('abag_notch')
+
+
+def dome_edges(segments, seams, count):
+    data, thickness = make_dome_data(10.0, segments)
+    edges = []
+    for i in range(2, segments + 1):
+        angle, radius = data[i]
+        piece = DomePiece(i, angle / seams, radius, thickness)
+        edges.extend(piece.notch_edges(0.5))
+    return edges
+
+
+def test_mating_ring_edges_line_up():
+    count = 3
+    edges = dome_edges(6, 2, count)
+    points, ends = abag_notch.notch_marks(edges, count)
+    assert len(points) == len(edges) * count
+    # Marks at the same fractions along the outer arc of a ring and the
+    # inner arc of the next one
+    for outer, inner in zip(edges[0::2], edges[3::2]):
+        assert abs(outer[9] - inner[9]) < 1e-9
+    a = [atan2(y, x) for x, y in points.tolist()]
+    for k in range(count):
+        assert abs(a[k] / edges[0][9] * edges[0][2] -
+                   (k + 1.0) / (count + 1)) < 1e-9
+
+
+def test_ticks_go_into_the_piece():
+    edges = dome_edges(3, 1, 1)
+    points, ends = abag_notch.notch_marks(edges, 1)
+    r = abag_notch.np.hypot(*points.T)
+    r_end = abag_notch.np.hypot(*ends.T)
+    assert (abag_notch.np.abs(r - r_end) - 0.5 < 1e-9).all()
+    # outer arcs tick inwards, inner arcs outwards
+    assert (r_end[0::2] < r[0::2]).all() and (r_end[1::2] > r[1::2]).all()
+
+
+def test_split_edges_share_the_loop():
+    # A 30 long loop of 3 pieces with 1 notch each has marks every 5, an
+    # edge covering 0..20 and one covering 20..30
+    left = line_edge(0.0, 0.0, 0.0, 1, 1.0, 30.0, 3, 0.0, 20.0)
+    right = line_edge(100.0, 0.0, 0.0, 1, 1.0, 30.0, 3, 20.0, 10.0)
+    points, ends = abag_notch.notch_marks([left, right], 1)
+    assert points[:, 0].tolist() == [5.0, 10.0, 15.0, 105.0]
+
+
+def test_dxf_points(tmpdir):
+    points = abag_notch.np.array([[35.0, 70.0]])
+    filename = str(tmpdir.join('notches.dxf'))
+    with open(filename, 'w') as fh:
+        abag_notch.write_dxf(fh, points, 35.0)
+    with open(filename) as fh:
+        data = fh.read()
+    assert '\nPOINT\n' in data and '\n10\n1.0000\n20\n-2.0000\n' in data
+    assert data.endswith('EOF\n')
@@ -0,0 +1,102 @@
+from math import atan2, hypot, sin, sqrt
+
+import pytest
+
+from abag_utils import Path
+
+abag_offset = pytest.importorskip('abag_offset')
+
+SQUARE = [(0, 0), (10, 0), (10, 10), (0, 10)]
+TRIANGLE = [(0, 0), (10, 0), (0, 3)]
+CONCAVE = [(0, 0), (10, 0), (10, 4), (4, 4), (4, 10), (0, 10)]
+
+
+def polygon(points):
+    p = Path()
+    p.M(*points[0])
+    for pt in points[1:]:
+        p.L(*pt)
+    p.Z()
+    return p
+
+
+def vertices(path):
+    return [tuple(round(v, 6) for v in args[-2:]) for cmd, args in path
+            if cmd != 'Z']
+
+
+def corner_distance(points, corners):
+    return [min(hypot(x - cx, y - cy) for cx, cy in corners)
+            for x, y in points]
+
+
+def offset(points, allowance, join=abag_offset.MITRE, mitre_limit=4.0):
+    return abag_offset.offset_path(polygon(points), allowance, join,
+                                   mitre_limit)
+
+
+def test_mitre_join():
+    assert vertices(offset(SQUARE, 1.0)) == [(-1, -1), (11, -1), (11, 11),
+                                             (-1, 11)]
+
+
+def test_round_join():
+    path = offset(SQUARE, 1.0, abag_offset.ROUND)
+    arcs = [args for cmd, args in path if cmd == 'A']
+    assert len(arcs) == 4
+    assert all(a[0] == a[1] == 1.0 for a in arcs)
+    # Every corner is rounded about the corner it grew from
+    assert corner_distance(vertices(path), SQUARE) == pytest.approx(
+        [1.0] * 9)
+
+
+def test_square_join():
+    path = offset(TRIANGLE, 1.0, abag_offset.SQUARE)
+    assert not [cmd for cmd, args in path if cmd == 'A']
+    d = corner_distance(vertices(path), TRIANGLE)
+    assert max(d) == pytest.approx(sqrt(2))
+    # Two points squaring off each corner, one at the right angle where
+    # both are the same
+    assert sum(abs(v - sqrt(2)) < 1e-6 for v in d) == 5
+
+
+def test_per_edge_allowances():
+    # Bottom, right, top then left
+    path = offset(SQUARE, (1.0, 2.0, 3.0, 4.0))
+    assert vertices(path) == [(-4, -1), (12, -1), (12, 13), (-4, 13)]
+    path = offset(SQUARE, (0.0, 2.0, 0.0, 0.0))
+    assert vertices(path) == [(0, 0), (12, 0), (12, 10), (0, 10)]
+
+
+def test_mitre_limit():
+    # The sharp corner's mitre is this far from it
+    half = atan2(3, 10) / 2
+    reach = 1.0 / sin(half)
+    d = corner_distance(vertices(offset(TRIANGLE, 1.0, mitre_limit=20)),
+                        TRIANGLE)
+    assert max(d) == pytest.approx(reach)
+    # Past the limit it is bevelled
+    for limit in (1.5, 4.0, reach - 0.01):
+        d = corner_distance(vertices(offset(TRIANGLE, 1.0,
+                                            mitre_limit=limit)), TRIANGLE)
+        assert max(d) <= limit + 1e-9
+
+
+def test_concave_corner_is_trimmed():
+    expected = [(-1, -1), (11, -1), (11, 5), (5, 5), (5, 11), (-1, 11)]
+    assert vertices(offset(CONCAVE, 1.0)) == expected
+    for join in (abag_offset.ROUND, abag_offset.SQUARE):
+        points = vertices(offset(CONCAVE, 1.0, join))
+        assert (5, 5) in points
+        # Nothing is drawn inside the concave corner
+        assert not [p for p in points if 4 < p[0] < 5 or 4 < p[1] < 5]
+
+
+def test_negative_allowance():
+    with pytest.raises(ValueError):
+        offset(SQUARE, -0.5)
+    with pytest.raises(ValueError):
+        offset(SQUARE, (1.0, 1.0, -1.0, 1.0))
+    outline = abag_offset.Outline.from_path(polygon(SQUARE))
+    with pytest.raises(ValueError):
+        abag_offset.offset_outlines([outline, outline], [1.0, -1.0])
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+abag_optimize = pytest.importorskip('abag_optimize')
+from abag_mesh import ring_profile, sphere_deviation
+from abag_model import PatternModel
+
+
+def test_pareto_front_drops_dominated_rows():
+    scores = np.array([[1, 5, 3], [2, 2, 2], [2, 3, 2], [1, 5, 3],
+                       [0, 9, 9], [3, 3, 3]])
+    # Equal rows do not dominate each other
+    assert abag_optimize.pareto_front(scores).tolist() == \
+        [True, True, False, True, True, False]
+
+
+def test_deviation_grows_with_the_radius():
+    for segments in (3, 8):
+        rho, z, mismatch = ring_profile(17.0, segments)
+        assert sphere_deviation(17.0, rho, z) == pytest.approx(
+            17.0 * abag_optimize.unit_deviation(segments))
+
+
+def test_fabric_length_packs_every_copy():
+    model = PatternModel.from_dimensions(30.0, 6, 3, seam_allowances={
+        'inner': 0.5, 'outer': 0.5, 'end': 0.5, 'other': 0.5})
+    length = abag_optimize.fabric_length(model, 150.0)
+    assert length * 150.0 > model.fabric_area()
+    # The body strip is longer than the roll is wide, it is laid lengthways
+    assert length > 2 * np.pi * 30.0
+    assert abag_optimize.fabric_length(model, 10.0) == float('inf')
+
+
+def test_size_run_fronts():
+    fronts = abag_optimize.optimize([10.0, 30.0], range(3, 9), (1, 2, 3))
+    assert sorted(fronts) == [10.0, 30.0]
+    front, candidates = fronts[30.0]
+    assert len(candidates) == 6 * 3
+    assert 0 < len(front) < len(candidates)
+    keys = abag_optimize.SCORES
+    for c in candidates:
+        beaten = [f for f in front
+                  if all(f[k] <= c[k] for k in keys) and
+                  any(f[k] < c[k] for k in keys)]
+        assert (c in front) != bool(beaten)
+    # Fewest pieces and least deviation are both on the front
+    assert min(c['pieces'] for c in front) == 4 + 1 + 2
+    assert front == sorted(front, key=lambda c: c['fabric'])
+    assert max(c['segments'] for c in front) == 8
+
+
+def test_workers_give_the_same_fronts():
+    args = ([12.0, 18.0], range(3, 13), (1, 2))
+    single = abag_optimize.optimize(*args)
+    assert abag_optimize.optimize(*args, workers=2) == single
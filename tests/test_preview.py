@@ -0,0 +1,33 @@
+import io
+
+import harness
+import abag_bagpat
+
+# The blank document with millimetre user units, the view centre (given in
+# px) lands on the same user unit coordinates
+MM_SVG = '''<?xml version="1.0" encoding="UTF-8" standalone="no"?>
+<svg xmlns="http://www.w3.org/2000/svg" xmlns:sodipodi="http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd" xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape" width="744.09448819mm" height="1052.3622047mm" viewBox="0 0 744.09448819 1052.3622047" id="svg2" version="1.1">
+  <sodipodi:namedview id="base" inkscape:cx="1405.9843" inkscape:cy="1988.0315" inkscape:current-layer="layer1"/>
+  <g inkscape:label="Layer 1" inkscape:groupmode="layer" id="layer1"/>
+</svg>
+'''
+
+
+def preview(document, cache):
+    out = io.BytesIO()
+    abag_bagpat.Abagpat().run(['--segments=12', '--preview=true',
+                               '--previewCache=' + cache, document],
+                              output=out)
+    return out.getvalue()
+
+
+def test_preview_cache_keeps_document_scale(tmp_path):
+    mm = str(tmp_path / 'mm.svg')
+    with open(mm, 'w') as fh:
+        fh.write(MM_SVG)
+    fresh = preview(mm, str(tmp_path / 'fresh.json'))
+    cache = str(tmp_path / 'cache.json')
+    px = preview(harness.BLANK, cache)
+    assert preview(mm, cache) == fresh
+    assert fresh != px
+    assert preview(harness.BLANK, cache) == px
@@ -0,0 +1,48 @@
+from math import pi
+
+import pytest
+
+from abag_utils import make_segment_data
+
+abag_profile = pytest.importorskip('abag_profile')
+
+
+@pytest.mark.parametrize('segments', [1, 4, 20])
+def test_hemisphere_matches_segment_data(segments):
+    expected, thickness = make_segment_data(10.0, segments)
+    data = abag_profile.make_profile_data(abag_profile.ellipsoid(10.0, 10.0),
+                                          segments)
+    assert sorted(data) == sorted(expected)
+    for key in data:
+        angle, radius, width = data[key]
+        assert abs(angle - expected[key][0]) < 1e-9
+        assert abs(radius - expected[key][1]) < 1e-9
+        assert abs(width - thickness) < 1e-9
+
+
+def test_sampled_profile_matches_analytic():
+    profile = abag_profile.ellipsoid(20.0, 12.0)
+    t = abag_profile.np.linspace(0, 1, 20001)
+    points = abag_profile.np.column_stack(profile(t))
+    analytic = abag_profile.make_profile_data(profile, 10)
+    sampled = abag_profile.make_profile_data(points, 10)
+    for key in analytic:
+        for a, b in zip(analytic[key], sampled[key]):
+            assert abs(a - b) < 1e-4
+
+
+def test_oblate_rings_roll_up_to_the_profile():
+    profile = abag_profile.ellipsoid(20.0, 12.0)
+    rho, z = abag_profile.ring_edges(profile, 10)
+    data = abag_profile.gore_data(rho, z)
+    widths = [data[k][2] for k in data]
+    assert max(widths) - min(widths) < 0.01 * max(widths)
+    for key in data:
+        angle, radius, width = data[key]
+        assert abs(angle * radius / (2 * pi) - rho[key]) < 1e-9
+        assert abs(angle * (radius - width) / (2 * pi) - rho[key - 1]) < 1e-9
+
+
+def test_profile_must_widen():
+    with pytest.raises(ValueError):
+        abag_profile.make_profile_data([(0, 10), (5, 8), (4, 0)], 4)
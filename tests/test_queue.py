@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+abag_queue = pytest.importorskip('abag_queue')
+from abag_archive import Archive, render_pattern
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+PARAMS = [{'radius': r, 'segments': s, 'seams': n}
+          for r in (10, 20) for s in (3, 4, 6) for n in (1, 2)]
+
+
+def test_local_workers_share_the_queue(tmp_path):
+    queue = str(tmp_path / 'q')
+    ids = abag_queue.submit(queue, PARAMS)
+    # Submitting again adds nothing
+    assert abag_queue.submit(queue, PARAMS[:3]) == ids[:3]
+
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    workers = [subprocess.Popen([sys.executable,
+                                 os.path.join(ROOT, 'abag_queue.py'),
+                                 'work', '--queue=' + queue], env=env,
+                                stdout=subprocess.PIPE)
+               for i in range(3)]
+    rendered = [int(w.communicate()[0].split()[0]) for w in workers]
+    assert sum(rendered) == len(PARAMS)
+    assert abag_queue.status(queue) == {'jobs': 12, 'running': 0,
+                                        'done': 12, 'failed': 0}
+
+    for params, data in abag_queue.outputs(queue):
+        assert data == render_pattern(params)
+    for f in os.listdir(os.path.join(queue, 'objects')):
+        with open(os.path.join(queue, 'objects', f), 'rb') as fh:
+            assert hashlib.sha256(fh.read()).hexdigest() + '.svg' == f
+
+    path = str(tmp_path / 'c.abag')
+    assert abag_queue.write_archive(queue, path) == len(PARAMS)
+    with Archive(path) as archive:
+        assert archive[PARAMS[5]] == render_pattern(PARAMS[5])
+
+
+def test_failed_jobs_are_retried_then_given_up(tmp_path):
+    queue = str(tmp_path / 'q')
+    flaky, broken = abag_queue.submit(queue, [{'radius': 5}, {'radius': 6}])
+    calls = []
+
+    def render(params):
+        calls.append(params['radius'])
+        if params['radius'] == 6 or calls.count(5) < 2:
+            raise RuntimeError('out of ink')
+        return b'<svg/>'
+
+    worker = abag_queue.Worker(queue, render, retries=3, poll=0.01)
+    assert worker.run() == [flaky]
+    assert calls.count(5.0) == 2 and calls.count(6.0) == 3
+    assert len(abag_queue.errors(queue, flaky)) == 1
+    assert len(abag_queue.errors(queue, broken)) == 3
+    assert os.path.exists(os.path.join(queue, 'failed', broken + '.json'))
+    assert abag_queue.status(queue)['failed'] == 1
+
+
+def test_stalled_lock_is_broken(tmp_path):
+    queue = str(tmp_path / 'q')
+    job, other = abag_queue.submit(queue, [{'radius': 7}, {'radius': 8}])
+    # A worker that died holding the first job, and one still alive
+    dead = os.path.join(queue, 'locks', job + '.lock')
+    with open(dead, 'w') as fh:
+        fh.write('gone.1 0.0')
+    old = time.time() - 30
+    os.utime(dead, (old, old))
+    alive = os.path.join(queue, 'locks', other + '.lock')
+    with open(alive, 'w') as fh:
+        fh.write('busy.2 0.0')
+
+    worker = abag_queue.Worker(queue, lambda p: b'<svg/>', stall=10.0)
+    assert sorted(worker.pending()) == sorted([job, other])
+    assert worker.attempt(job)
+    assert not worker.attempt(other)
+    assert os.path.exists(alive)
+    assert not os.path.exists(dead)
+    first = abag_queue.errors(queue, job)[0]
+    with open(os.path.join(queue, 'errors', first), 'rb') as fh:
+        assert b'stalled' in fh.read()
+    with open(os.path.join(queue, 'done', job + '.json')) as fh:
+        done = json.load(fh)
+    assert done['params']['radius'] == 7.0
+
+
+def test_racing_on_a_stalled_lock(tmp_path, monkeypatch):
+    queue = str(tmp_path / 'q')
+    job, = abag_queue.submit(queue, [{'radius': 7}])
+    lock = os.path.join(queue, 'locks', job + '.lock')
+    with open(lock, 'w') as fh:
+        fh.write('gone.1 0.0')
+    old = time.time() - 30
+    os.utime(lock, (old, old))
+
+    first = abag_queue.Worker(queue, stall=10.0)
+    second = abag_queue.Worker(queue, stall=10.0)
+    first.name, second.name = 'first.1', 'second.2'
+    claimed = []
+    stat = os.stat
+
+    def racing_stat(path, *args, **kwargs):
+        # The second worker breaks the lock and claims the job right after
+        # the first one has looked at it
+        result = stat(path, *args, **kwargs)
+        if path == lock and not claimed:
+            claimed.append(None)
+            claimed[0] = second.claim(job)
+        return result
+
+    monkeypatch.setattr(abag_queue.os, 'stat', racing_stat)
+    assert first.claim(job) is None
+    monkeypatch.undo()
+    assert claimed[0] is not None
+    with open(lock) as fh:
+        assert fh.read() == claimed[0][1]
+    assert len(abag_queue.errors(queue, job)) == 1
+    assert not [f for f in os.listdir(os.path.join(queue, 'locks'))
+                if f.endswith('.stale')]
+    second.release(claimed[0])
+    assert not os.path.exists(lock)
+
+
+def test_hung_render_is_retried(tmp_path):
+    queue = str(tmp_path / 'q')
+    job, = abag_queue.submit(queue, [{'radius': 9}])
+    release = threading.Event()
+
+    def hang(params):
+        release.wait(10)
+        return b'<svg>late</svg>'
+
+    hung = abag_queue.Worker(queue, hang, stall=0.4, timeout=0.5)
+    thread = threading.Thread(target=hung.attempt, args=(job,))
+    thread.start()
+    try:
+        time.sleep(0.2)
+        other = abag_queue.Worker(queue, lambda p: b'<svg/>', stall=0.4)
+        # Alive and within its timeout the lock is kept fresh
+        assert not other.attempt(job)
+        deadline = time.time() + 5
+        while not other.attempt(job):
+            assert time.time() < deadline, "hung render kept its lock"
+            time.sleep(0.1)
+    finally:
+        release.set()
+        thread.join()
+    assert other.rendered == [job]
+    first = abag_queue.errors(queue, job)[0]
+    with open(os.path.join(queue, 'errors', first), 'rb') as fh:
+        assert b'stalled' in fh.read()
@@ -0,0 +1,39 @@
+from lxml import etree
+
+import harness
+from abag_utils import iter_segment_data, make_segment_data
+
+INKSCAPE = 'http://www.inkscape.org/namespaces/inkscape'
+LABEL = '{%s}label' % INKSCAPE
+ARGS = ['--segments=30', '--addSeamAllowence=true', '--seamAllowenceOuter=0.5',
+        '--showSegLabel=false']
+
+
+def segment_groups(doc):
+    groups = {}
+    for g in doc.getroot().iter():
+        if (g.get(LABEL) or '').startswith('Segment '):
+            groups[g.get(LABEL)] = etree.tostring(g)
+    return groups
+
+
+def test_iter_segment_data_matches_segment_data():
+    data, thickness = make_segment_data(10.0, 30)
+    rows = list(iter_segment_data(10.0, 30, 7, 9))
+    assert rows == [(i, data[i][0], data[i][1]) for i in (7, 8, 9)]
+    assert list(iter_segment_data(10.0, 30, 29, 40))[-1][0] == 30
+
+
+def test_range_renders_only_those_segments():
+    full = segment_groups(harness.run_effect('abag_bagpat', 'Abagpat',
+                                             ARGS)[0])
+    args = ARGS + ['--onlyRender=true', '--renderSegmentsFrom=12',
+                   '--renderSegmentsTo=14']
+    doc = harness.run_effect('abag_bagpat', 'Abagpat', args)[0]
+    part = segment_groups(doc)
+    assert sorted(part) == ['Segment 12', 'Segment 13', 'Segment 14']
+    for label in part:
+        assert part[label] == full[label]
+    # No zipper or body strips when re-cutting segments
+    assert not doc.getroot().xpath('//*[@inkscape:label="BodyStrip"]',
+                                   namespaces={'inkscape': INKSCAPE})
@@ -0,0 +1,74 @@
+import struct
+import zlib
+from math import pi
+
+import numpy as np
+import pytest
+
+abag_raster = pytest.importorskip('abag_raster')
+from abag_model import PatternModel
+from abag_offset import Outline
+
+SEAMS = {'inner': 1.0, 'outer': 1.0, 'end': 1.0, 'other': 0.5}
+
+
+def square(x0, y0, x1, y1):
+    return np.array([[x0, y0, x1, y0], [x1, y0, x1, y1],
+                     [x1, y1, x0, y1], [x0, y1, x0, y0]])
+
+
+def test_square_coverage_is_exact():
+    cover = abag_raster.coverage(square(1.5, 1.5, 6.5, 6.5), 8, 8)
+    assert cover.sum() == pytest.approx(25.0)
+    assert cover[3, 3] == pytest.approx(1.0)
+    assert cover[1, 3] == pytest.approx(0.5)
+    assert cover[1, 1] == pytest.approx(0.25)
+    assert cover[0].sum() == 0 and cover[:, 7].sum() == 0
+
+
+def test_even_odd_hole():
+    edges = np.vstack((square(0, 0, 10, 10), square(3, 3, 7, 7)))
+    cover = abag_raster.coverage(edges, 10, 10)
+    assert cover.sum() == pytest.approx(100 - 16)
+    assert cover[5, 5] == 0
+
+
+def test_flattened_circle_area():
+    r = 20.0
+    outline = Outline.from_path([['M', [5.0, 25.0]],
+                                 ['A', [r, r, 0, 1, 1, 45.0, 25.0]],
+                                 ['A', [r, r, 0, 1, 1, 5.0, 25.0]],
+                                 ['Z', []]])
+    edges = abag_raster.flatten([outline], 0.05)
+    assert np.allclose(np.hypot(edges[:, 0] - 25, edges[:, 1] - 25), r)
+    x0, y0, x1, y1 = edges.T
+    polygon = 0.5 * abs(np.sum(x0 * y1 - x1 * y0))
+    assert polygon == pytest.approx(pi * r * r, rel=5e-3)
+    cover = abag_raster.coverage(edges, 50, 50, 16)
+    assert cover.sum() == pytest.approx(polygon, rel=1e-3)
+
+
+def test_png_structure():
+    img = np.zeros((5, 7, 3), dtype=np.uint8)
+    img[2, 3] = (1, 2, 3)
+    data = abag_raster.png_bytes(img)
+    assert data[:8] == b'\x89PNG\r\n\x1a\n'
+    assert data[12:16] == b'IHDR'
+    assert struct.unpack('>II', data[16:24]) == (7, 5)
+    length = struct.unpack('>I', data[33:37])[0]
+    assert data[37:41] == b'IDAT'
+    raw = zlib.decompress(data[41:41 + length])
+    assert len(raw) == 5 * (7 * 3 + 1)
+    assert raw[2 * 22 + 1 + 9:2 * 22 + 1 + 12] == b'\x01\x02\x03'
+    assert data.endswith(b'IEND\xaeB`\x82')
+
+
+@pytest.mark.parametrize('seams', [None, SEAMS])
+def test_thumbnail_fits_and_draws(seams):
+    m = PatternModel.from_dimensions(30.0, 8, 2, seam_allowances=seams)
+    img = abag_raster.thumbnail(m, 128)
+    assert max(img.shape[:2]) == 128 and img.shape[2] == 3
+    piece = np.all(img == abag_raster.PIECE_COLOUR, axis=2)
+    assert piece.any()
+    # The border is left empty
+    assert np.all(img[:, :1] == 255) and np.all(img[:1] == 255)
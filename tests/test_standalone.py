@@ -0,0 +1,48 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs a script with inkex and lxml made unimportable, as outside Inkscape
+BLOCKED = (
+    "import runpy, sys\n"
+    "class Block(object):\n"
+    "    def find_spec(self, name, path, target=None):\n"
+    "        if name.split('.')[0] in ('inkex', 'lxml'):\n"
+    "            raise ImportError(name)\n"
+    "sys.meta_path.insert(0, Block())\n"
+    "sys.argv = sys.argv[1:]\n"
+    "runpy.run_path(sys.argv[0], run_name='__main__')\n")
+
+
+def run_blocked(script, args, cwd):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    return subprocess.check_output(
+        [sys.executable, '-c', BLOCKED, os.path.join(ROOT, script)] + args,
+        cwd=cwd, env=env, stderr=subprocess.STDOUT)
+
+
+@pytest.mark.parametrize('script,args,output', [
+    ('abag_cutlist.py', ['--format=csv', '--output=cut.csv'], 'cut.csv'),
+    ('abag_tile.py', ['--seamAllowenceOuter=1', '--output=pages'],
+     'pages/page_1_1.svg'),
+    ('abag_raster.py', ['--seamAllowenceOuter=1', '--output=x.png'],
+     'x.png'),
+    ('abag_archive.py', ['--radii=10', '--segmentCounts=4,6'],
+     'catalogue.abag'),
+])
+def test_runs_without_inkex(tmp_path, script, args, output):
+    run_blocked(script, args, str(tmp_path))
+    assert os.path.getsize(str(tmp_path / output)) > 0
+
+
+def test_queue_works_without_inkex(tmp_path):
+    cwd = str(tmp_path)
+    run_blocked('abag_queue.py', ['submit', '--radii=10,12'], cwd)
+    out = run_blocked('abag_queue.py', ['work'], cwd)
+    assert int(out.split()[0]) == 2
+    run_blocked('abag_queue.py', ['archive'], cwd)
+    assert os.path.getsize(str(tmp_path / 'catalogue.abag')) > 0
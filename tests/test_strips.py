@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+abag_strips = pytest.importorskip('abag_strips')
+from abag_model import PatternModel
+from abag_notch import notch_marks
+from abag_utils import line_edge
+
+
+def cut_lengths(length, count, joins, join, left, right):
+    starts, ends = abag_strips.panel_bounds(length, count, joins)
+    cut = ends - starts
+    cut[:, 0] += left
+    cut += join
+    cut[np.arange(len(count)), count - 1] += right - join
+    cut[:, 1:] += np.where(np.isnan(joins), 0.0, join)
+    return cut
+
+
+def test_short_strips_are_not_split():
+    count, joins = abag_strips.plan_joins([50.0, 100.0], 140.0, 1.0, 1.0, 1.0)
+    assert count.tolist() == [1, 1]
+    assert joins.shape == (2, 0)
+
+
+def test_even_split_uses_fewest_panels():
+    length = np.array([150.0, 251.3, 376.99])
+    count, joins = abag_strips.plan_joins(length, 140.0, 1.5, 1.0, 1.0)
+    assert count.tolist() == [2, 2, 3]
+    cut = cut_lengths(length, count, joins, 1.5, 1.0, 1.0)
+    for row, n in zip(cut, count):
+        assert np.all(row[:n] <= 140.0 + 1e-9)
+        assert np.allclose(row[:n], row[0])
+
+
+def test_joins_go_on_the_marks():
+    length = np.array([188.5, 251.33, 376.99, 187.5])
+    step = np.array([62.83, 41.89, 62.83, 31.25])
+    count, joins = abag_strips.plan_joins(length, 140.0, 1.0, 1.0, 1.0, step,
+                                          [0.0, 0.0, 0.0, 1.0])
+    cut = cut_lengths(length, count, joins, 1.0, 1.0, 1.0)
+    offset = np.array([0.0, 0.0, 0.0, 1.0])
+    for i in range(len(length)):
+        t = joins[i, :count[i] - 1]
+        assert np.allclose((t + offset[i]) / step[i],
+                           np.round((t + offset[i]) / step[i]))
+        assert np.all(cut[i, :count[i]] <= 140.0 + 1e-9)
+
+
+def test_coarse_marks_fall_back_to_an_even_split():
+    count, joins = abag_strips.plan_joins(200.0, 140.0, step=190.0)
+    assert count.tolist() == [2]
+    assert joins[0].tolist() == [100.0]
+
+
+def test_grading_run_matches_one_size_at_a_time():
+    radii = np.linspace(10.0, 80.0, 15)
+    length = 2 * np.pi * radii
+    step = abag_strips.mark_step(radii, 2, 1)
+    count, joins = abag_strips.plan_joins(length, 140.0, 1.0, 0.5, 0.5, step)
+    for i in range(len(radii)):
+        c, j = abag_strips.plan_joins(length[i], 140.0, 1.0, 0.5, 0.5,
+                                      step[i])
+        assert c[0] == count[i]
+        assert np.allclose(j[0], joins[i, :c[0] - 1])
+
+
+def test_no_room_for_the_join():
+    with pytest.raises(ValueError):
+        abag_strips.plan_joins(300.0, 10.0, 5.0)
+
+
+def test_split_model_keeps_the_strips():
+    sa = {'inner': 0.5, 'outer': 0.5, 'end': 0.5, 'other': 1.0}
+    model = PatternModel.from_dimensions(40.0, 5, 2, seam_allowances=sa)
+    split = abag_strips.split_strips(model, 140.0, 1.5,
+                                     abag_strips.mark_step(40.0, 2, 1))
+    assert split.label[:3] == ['B1-1', 'B1-2', 'Z1-1']
+    assert split.name[1] == 'Body Strip 2 of 2'
+    assert split.label[-5:] == model.label[-5:]
+    for label in ('B1', 'Z1', 'Z2'):
+        panels = [i for i, l in enumerate(split.label)
+                  if l.startswith(label + '-')]
+        assert split.width[panels].sum() == pytest.approx(
+            model.width[model.label.index(label)])
+        x0, y0, x1, y1 = split.bounds()
+        assert np.all(x1[panels] - x0[panels] <= 140.0 + 1e-9)
+        assert split.seam_left[panels].tolist() == [1.0, 1.5]
+        assert split.seam_right[panels].tolist() == [1.5, 1.0]
+
+
+def test_panel_marks_line_up_with_the_whole_strip():
+    length, loop, repeats, notches = 376.99, 376.99, 3, 2
+    step = abag_strips.mark_step(loop / (2 * np.pi), repeats, notches)
+    count, joins = abag_strips.plan_joins(length, 140.0, 1.0, step=step)
+    starts, ends = abag_strips.panel_bounds(length, count, joins)
+    whole, e = notch_marks([line_edge(0.0, 0.0, 0.0, 1, 1.0, loop, repeats)],
+                           notches)
+    edges = [line_edge(s, 0.0, 0.0, 1, 1.0, loop, repeats, s, t - s)
+             for s, t in zip(starts[0, :count[0]], ends[0, :count[0]])]
+    parts, e = notch_marks(edges, notches)
+    # The marks at the joins are where the panels are sewn together
+    at_joins = np.isclose(whole[:, :1], joins[0][None, :]).any(axis=1)
+    assert np.allclose(parts, whole[~at_joins])
@@ -0,0 +1,88 @@
+import gzip
+import io
+import json
+import os
+import threading
+import time
+
+import pytest
+
+abag_svgz = pytest.importorskip('abag_svgz')
+import abag_archive
+import harness
+
+PARAMS = [{'radius': r, 'segments': s} for r in (10, 20, 30)
+          for s in (3, 8)]
+
+
+def test_compress_is_repeatable():
+    data = abag_archive.render_pattern({'radius': 20})
+    packed = abag_svgz.compress(data, 9)
+    assert packed == abag_svgz.compress(data, 9)
+    assert gzip.decompress(packed) == data
+    assert len(packed) < len(data) / 2
+    assert abag_svgz.is_svgz('a/Pattern.SVGZ')
+    assert not abag_svgz.is_svgz('pattern.svg')
+
+
+def test_compressor_keeps_the_order():
+    seen = []
+    lock = threading.Lock()
+
+    def pack(data):
+        # Later data finishes first
+        time.sleep(0.02 / len(data))
+        with lock:
+            seen.append(data)
+        return data.upper()
+
+    c = abag_svgz.Compressor(pack, threads=3, backlog=2)
+    done = []
+    for i in range(1, 9):
+        got = c.put(i, b'x' * i)
+        # Never more than the backlog waiting
+        assert len(c.pending) <= 2
+        done.extend(got)
+    done.extend(c.finish())
+    assert [tag for tag, data, packed in done] == list(range(1, 9))
+    assert all(packed == b'X' * tag for tag, data, packed in done)
+    assert c.bytes_in == c.bytes_out == 36 and c.count == 8
+    assert c.rate() > 0
+    assert c.report().startswith('8 files, 36 bytes of SVG')
+
+
+def test_threads_write_the_same_archive(tmp_path):
+    paths = [str(tmp_path / ('%i.abag' % t)) for t in (0, 2)]
+    for path, threads in zip(paths, (0, 2)):
+        assert abag_archive.write_archive(path, PARAMS, 6, threads) == \
+            len(PARAMS)
+    with open(paths[0], 'rb') as a, open(paths[1], 'rb') as b:
+        assert a.read() == b.read()
+
+
+def test_svgz_catalogue(tmp_path):
+    folder = str(tmp_path / 'cat')
+    writer = abag_archive.write_svgz(folder, PARAMS, 9, 2)
+    assert writer.compressor.count == len(PARAMS)
+    with open(os.path.join(folder, 'index.json')) as fh:
+        index = json.load(fh)
+    assert len(index) == len(PARAMS)
+    for entry in index:
+        with gzip.open(os.path.join(folder, entry['file'])) as fh:
+            assert fh.read() == abag_archive.render_pattern(entry['params'])
+
+
+def test_effect_writes_svgz(tmp_path):
+    import abag_domepat
+    plain = io.BytesIO()
+    abag_domepat.Domepat().run([harness.BLANK], output=plain)
+    path = str(tmp_path / 'dome.svgz')
+    copy = str(tmp_path / 'copy.svgz')
+    abag_domepat.Domepat().run(['--output=' + path, harness.BLANK])
+    abag_domepat.Domepat().run(['--fragment=true', '--svgzFile=' + copy,
+                                '--svgzLevel=1', harness.BLANK],
+                               output=io.BytesIO())
+    for f in (path, copy):
+        with gzip.open(f) as fh:
+            doc = fh.read()
+        assert doc.count(b'<path') == plain.getvalue().count(b'<path')
@@ -0,0 +1,63 @@
+import json
+import os
+
+import pytest
+from lxml import etree
+
+abag_tile = pytest.importorskip('abag_tile')
+from abag_model import PatternModel
+
+SEAMS = {'inner': 1.0, 'outer': 1.0, 'end': 1.0, 'other': 0.5}
+
+
+def model(radius=30.0):
+    return PatternModel.from_dimensions(radius, 8, 2, seam_allowances=SEAMS)
+
+
+def test_index_matches_brute_force():
+    m = model()
+    size = abag_tile.shelf_layout(m)
+    grid = abag_tile.PageGrid(size, 'letter')
+    bounds = m.bounds()
+    pages = grid.index(bounds)
+    x0, y0, x1, y1 = [b.tolist() for b in bounds]
+    for r in range(grid.rows):
+        for c in range(grid.cols):
+            tx0, ty0, tx1, ty1 = grid.tile(r, c)
+            expected = [i for i in range(len(m))
+                        if x0[i] < tx1 and x1[i] > tx0 and
+                        y0[i] < ty1 and y1[i] > ty0]
+            assert pages.get((r, c), []) == expected
+
+
+def test_layout_keeps_pieces_apart():
+    m = model()
+    abag_tile.shelf_layout(m)
+    x0, y0, x1, y1 = m.bounds()
+    assert x0.min() >= -1e-9 and y0.min() >= -1e-9
+    for i in range(len(m)):
+        for j in range(i + 1, len(m)):
+            assert (x1[i] <= x0[j] or x1[j] <= x0[i] or
+                    y1[i] <= y0[j] or y1[j] <= y0[i])
+
+
+def test_neighbours_share_registration_marks():
+    grid = abag_tile.PageGrid((100.0, 100.0))
+    a = grid.marks(0, 0)
+    assert a[1] == pytest.approx(grid.marks(0, 1)[0])
+    assert a[2] == pytest.approx(grid.marks(1, 0)[0])
+
+
+def test_write_tiles(tmpdir):
+    directory = str(tmpdir)
+    names = abag_tile.write_tiles(model(10.0), directory)
+    with open(os.path.join(directory, 'pages.json')) as fh:
+        index = json.load(fh)
+    assert [p['file'] for p in index['pages']] == names
+    assert len(names) <= index['rows'] * index['cols']
+    for page in index['pages']:
+        svg = etree.parse(os.path.join(directory, page['file'])).getroot()
+        assert svg.get('width') == '210mm'
+        texts = [t.text for t in svg.iter('{http://www.w3.org/2000/svg}text')]
+        for label in page['pieces']:
+            assert any(t.split()[0] == label for t in texts[1:])
@@ -0,0 +1,121 @@
+from math import pi
+
+import numpy as np
+import pytest
+
+from abag_utils import (DomePiece, DomeSeamPiece, RectPattern,
+                        RectSeamPattern, compose, format_path,
+                        format_transform, reflection, rotation,
+                        transform_path, translation)
+from abag_offset import ARC, Outline
+
+
+def edges(path):
+    return np.array(Outline.from_path(path).edges, dtype=float)
+
+
+def mapped(e, matrix):
+    """Edges of an outline with end points and centres mapped by matrix"""
+    a, b, c, d, tx, ty = matrix
+    out = e.copy()
+    arc = e[:, 0] == ARC
+    for i in (1, 3, 5):
+        x, y = e[:, i], e[:, i + 1]
+        out[:, i] = a * x + c * y + tx
+        out[:, i + 1] = b * x + d * y + ty
+    # Lines have no centre
+    out[~arc, 5:7] = 0
+    if a * d - b * c < 0:
+        out[:, 8] = -out[:, 8]
+    return out
+
+
+def seam_piece():
+    p = DomeSeamPiece(3, 0.7, 30.0, 4.0, outer=1.0, inner=1.0, end=0.5)
+    p.set_start_loc(100.0, 50.0)
+    return p
+
+
+@pytest.mark.parametrize('matrix', [
+    rotation(0.3, 10.0, -4.0),
+    rotation(pi / 2),
+    reflection(pi / 2, 100.0, 0.0),
+    compose(translation(3.0, 4.0), reflection(0.4, 1.0, 2.0)),
+])
+def test_transformed_arcs_match_mapped_outline(matrix):
+    p = seam_piece()
+    before = edges(p.path)
+    p.transform(matrix)
+    assert np.allclose(edges(p.path), mapped(before, matrix))
+
+
+def test_rect_rotation_and_relative_commands():
+    r = RectPattern(10.0, 4.0)
+    r.set_start_loc(5.0, 5.0)
+    r.rotate(pi / 2)
+    e = edges(r.path)
+    assert np.allclose(e[0, 1:5], [5, 5, 5, 15])
+    assert np.allclose(e[1, 1:5], [5, 15, 1, 15])
+
+
+def test_moves_reuse_local_outline():
+    p = seam_piece()
+    local = p.local_path
+    p.set_start_loc(7.0, 8.0)
+    p.translate(1.0, 1.0)
+    assert p.local_path is local
+    fresh = DomeSeamPiece(3, 0.7, 30.0, 4.0, outer=1.0, inner=1.0, end=0.5)
+    fresh.set_start_loc(8.0, 9.0)
+    fresh._build_path()
+    assert format_path(p.path) == format_path(fresh._path)
+
+
+def test_shape_changes_rebuild_outline():
+    r = RectSeamPattern(10.0, 4.0, seams=0.5)
+    r.path
+    r.set_seams(2.0)
+    r.set_start_loc(0.0, 0.0)
+    assert np.allclose(edges(r.path), edges(RectSeamPattern(
+        10.0, 4.0, seams=2.0).path))
+    r.bottom = 0
+    r.width = 6.0
+    fresh = RectSeamPattern(6.0, 4.0, seams=2.0)
+    fresh.bottom = 0
+    assert format_path(r.path) == format_path(fresh.path)
+    p = seam_piece()
+    p.path
+    p.set_seams({'end': 2.0})
+    fresh = DomeSeamPiece(3, 0.7, 30.0, 4.0, outer=1.0, inner=1.0, end=2.0)
+    assert format_path(p.local_path) == format_path(fresh.local_path)
+
+
+def test_mirror_twice_and_full_turn():
+    r = RectSeamPattern(10.0, 4.0, seams=0.5)
+    r.set_start_loc(2.0, 3.0)
+    d = format_path(r.path)
+    r.mirror(0.3).mirror(0.3)
+    assert format_path(r.path) == d
+    for i in range(4):
+        r.rotate(pi / 2, (0.0, 0.0))
+    assert np.allclose(edges(r.path), edges(RectSeamPattern(
+        10.0, 4.0, seams=0.5).translate(2.0, 3.0).path))
+
+
+def test_svg_transform():
+    p = DomePiece(2, 0.5, 10.0, 2.0)
+    assert p.svg_transform == ''
+    p.set_start_loc(3.0, 4.5)
+    assert p.svg_transform == 'translate(3,4.5)'
+    p.rotate(pi)
+    assert p.svg_transform == 'matrix(-1,0,0,-1,3,4.5)'
+    assert format_transform(rotation(pi / 2)) == 'matrix(0,1,-1,0,0,0)'
+
+
+def test_horizontal_and_vertical_lines():
+    path = [['M', [1.0, 1.0]], ['H', [4.0]], ['v', [2.0]], ['h', [-3.0]],
+            ['Z', []]]
+    out = transform_path(path, rotation(pi / 2))
+    assert [c for c, a in out] == ['M', 'L', 'l', 'l', 'Z']
+    e = edges(out)
+    assert np.allclose(e[:3, 1:5], [[-1, 1, -1, 4], [-1, 4, -3, 4],
+                                    [-3, 4, -3, 1]])
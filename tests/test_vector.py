@@ -0,0 +1,56 @@
+import pytest
+
+from abag_utils import Vec2, Vector2
+
+
+def test_vector2_set_length():
+    v = Vector2(3.0, 4.0)
+    v.set_length(10.0)
+    assert list(v) == [6.0, 8.0]
+    v.length = 2.5
+    assert list(v) == pytest.approx([1.5, 2.0])
+    # A zero vector has no direction, it stays zero
+    z = Vector2(0.0, 0.0)
+    z.set_length(5.0)
+    assert list(z) == [0.0, 0.0]
+    z.length = 1.0
+    assert not z
+
+
+def test_vector2_hash():
+    assert hash(Vector2(1, 2)) == hash(Vector2(1.0, 2.0)) == hash((1.0, 2.0))
+    seen = {Vector2(1.0, 2.0), Vector2(1.0, 2.0), Vector2(2.0, 1.0)}
+    assert len(seen) == 2
+    assert {Vector2(0.5, 0.5): 'a'}[Vector2(0.5, 0.5)] == 'a'
+
+
+def test_vec2_matches_vector2():
+    p1 = (536.95, 232.76)
+    p2 = (443.20, 399.63)
+    v = Vector2.from_points(p1, p2).perpendicular()
+    v.set_length(24.8)
+    w = Vec2.from_points(p1, p2).perpendicular_of_length(24.8)
+    assert isinstance(w, Vec2)
+    assert tuple(w) == pytest.approx(tuple(v))
+    assert w.length == pytest.approx(24.8)
+    assert tuple(Vec2.from_points(p1, p2).perpendicular().with_length(
+        24.8)) == pytest.approx(tuple(w))
+
+
+def test_vec2_operations():
+    a = Vec2(1.0, 2.0)
+    b = Vec2(3.0, 4.0)
+    assert (a + b) * 2.0 == Vec2(8.0, 12.0)
+    assert (a - b, b - (1, 1), (5, 5) - b) == ((-2, -2), (2, 3), (2, 1))
+    assert isinstance((5, 5) - b, Vec2) and isinstance(2 * a, Vec2)
+    assert b / 2 == (1.5, 2.0) and -a == (-1.0, -2.0)
+    assert a.dot(b) == 11.0 and a.cross(b) == -2.0
+    assert Vec2(3.0, 4.0).distance_to((0, 0)) == 5.0
+    assert (a.x, a.y) == (1.0, 2.0)
+    assert hash(a) == hash((1.0, 2.0))
+    zero = Vec2()
+    assert not zero and a
+    assert zero.with_length(3.0) == zero.normalised() == (0.0, 0.0)
+    assert zero.perpendicular_of_length(3.0) == (0.0, 0.0)
+    with pytest.raises(AttributeError):
+        a.x = 5.0
@@ -0,0 +1,52 @@
+import io
+import random
+import time
+
+import pytest
+
+import harness
+import abag_bagpat
+import inkex
+
+
+def render(args):
+    random.seed(0)
+    out = io.BytesIO()
+    abag_bagpat.Abagpat().run(args + [harness.BLANK], output=out)
+    return out.getvalue()
+
+
+@pytest.mark.parametrize('args', [
+    ['--segments=120'],
+    ['--segments=60', '--seams=2', '--addSeamAllowence=true',
+     '--seamAllowenceOuter=0.5', '--seamAllowenceInner=0.5',
+     '--seamAllowenceEnd=0.5', '--compoundPaths=true'],
+])
+def test_pool_output_matches_serial(args):
+    serial = render(args)
+    assert render(args + ['--workers=2']) == serial
+
+
+def test_pool_with_slow_unit_conversion(monkeypatch):
+    # Jobs made slowly, letting go of the interpreter lock, so the pool's
+    # feeder thread runs alongside the merge in the main thread
+    svg_cls = inkex.SvgDocumentElement
+    unittouu = svg_cls.unittouu
+
+    def slow(self, value):
+        time.sleep(0.0005)
+        return unittouu(self, value)
+
+    serial = render(['--segments=200'])
+    monkeypatch.setattr(svg_cls, 'unittouu', slow)
+    assert render(['--segments=200', '--workers=2']) == serial
+
+
+def test_compound_element_count_does_not_grow():
+    def count(segments):
+        svg = render(['--segments=%i' % segments, '--compoundPaths=true',
+                      '--addSeamAllowence=true', '--seamAllowenceOuter=0.5',
+                      '--seamAllowenceEnd=0.5'])
+        return svg.count(b'<path'), svg.count(b'<text')
+
+    assert count(10) == count(100)